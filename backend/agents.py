@@ -1,30 +1,71 @@
 import os
 import uuid
-from google import genai
-from google.genai import types
+import asyncio
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from pathlib import Path
 import json
-import PIL.Image
 import io
-from typing import Dict, Any
+import re
+import threading
+import aiofiles
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
 
-from .workflow import LlmAgent, SequentialAgent
+from .workflow import LlmAgent, SequentialAgent, ParallelAgent, FunctionAgent, get_gemini_semaphore
+from .llm_cache import LlmCache
+from .audio_store import audio_file_name, speech_audio_lock
+from .audio_encoding import AUDIO_FORMATS, audio_extension, save_audio_file
+from .images import model_input_path
+from .media import precompress
+from .resilience import call_gemini, stream_gemini, is_upstream_unavailable
+from .metrics import span
+from .models import AlbumRole
+
+if TYPE_CHECKING:
+    from google import genai
+
+# google.genai (and Pillow) are imported on first use, not with this module:
+# the SDK is the slowest import in the app
 
 # Load .env from the backend directory
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Optional: another Gemini endpoint, e.g. the offline stand-in in bench/fake_gemini.py
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
 MEDIA_DIR = "media"
-os.makedirs(MEDIA_DIR, exist_ok=True)
 
-client = None
-if GEMINI_API_KEY:
-    client = genai.Client(api_key=GEMINI_API_KEY)
-else:
-    print("WARNING: GEMINI_API_KEY not found in environment variables")
+# Cache of LLM responses so unchanged inputs don't trigger a new Gemini call
+llm_cache = None
+if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"):
+    llm_cache = LlmCache(
+        path=os.getenv("LLM_CACHE_PATH", "llm_cache.db"),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        max_memory_entries=int(os.getenv("LLM_CACHE_MAX_MEMORY_ENTRIES", "256")),
+        max_disk_entries=int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "5000"))
+    )
+
+_client: Optional["genai.Client"] = None
+_client_checked = False
+# The startup preload creates the client on a worker thread, possibly while a request asks for it
+_client_lock = threading.Lock()
+
+def get_client() -> Optional["genai.Client"]:
+    """The Gemini client, created on first use; None without GEMINI_API_KEY (generation returns mock output)."""
+    global _client, _client_checked
+    if not _client_checked:
+        with _client_lock:
+            if not _client_checked:
+                if GEMINI_API_KEY:
+                    from google import genai
+                    from google.genai import types
+                    http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+                    _client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+                else:
+                    print("WARNING: GEMINI_API_KEY not found in environment variables")
+                _client_checked = True
+    return _client
 
 SPEECH_SYSTEM_INSTRUCTION = """
 You are a speech and emotional-direction generator for a valedictorian speech.
@@ -84,17 +125,28 @@ Output STRICT JSON with:
     - `caption`: max 20 words
 """
 
-async def generate_speech(title: str, person: str, emotion: str, notes: str) -> SpeechOutput:
-    if not client:
-        return SpeechOutput(
-            emotion="(Voice: Neutral, mock generated)",
-            transcript="Gemini API Key not found. Mock speech generated."
-        )
-    
-    # Create the speech generation agent
-    speech_agent = LlmAgent(
+class AlbumPhotoLayout(BaseModel):
+    photo_id: int = Field(description="0-based index of the provided image.")
+    role: AlbumRole
+    caption: str = Field(description="Caption, at most 20 words.")
+
+class AlbumLayout(BaseModel):
+    page_title: str
+    page_description: str
+    photos: List[AlbumPhotoLayout] = []
+
+# Reply parsing patterns, compiled once
+_JSON_CODE_BLOCK = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+_VOICE_DIRECTION = re.compile(r'^\s*\(Voice:\s*(.*?)\)', re.DOTALL | re.IGNORECASE)
+_TRANSCRIPT_KEY = re.compile(r'"transcript"\s*:\s*"')
+
+def _speech_agent() -> LlmAgent:
+    """Create the speech generation agent."""
+    from google.genai import types
+
+    return LlmAgent(
         name="SpeechGenerator",
-        client=client,
+        client=get_client(),
         model='gemini-2.5-flash-lite',
         system_instruction=SPEECH_SYSTEM_INSTRUCTION,
         prompt_template="""
@@ -114,92 +166,297 @@ Example Output:
 ```
 """,
         output_key="speech",
-        tools=[types.Tool(google_search=types.GoogleSearch())]
+        tools=[types.Tool(google_search=types.GoogleSearch())],
+        cache=llm_cache
     )
+
+def _album_agent() -> LlmAgent:
+    """Create the album layout agent."""
+    return LlmAgent(
+        name="AlbumLayoutGenerator",
+        client=get_client(),
+        model='gemini-2.5-flash-lite',
+        system_instruction=ALBUM_SYSTEM_INSTRUCTION,
+        output_model=AlbumLayout,
+        output_key="album_layout",
+        cache=llm_cache
+    )
+
+# Optional: directory of system instruction overrides, one `<agent name>.txt` per agent
+AGENT_INSTRUCTIONS_DIR = os.getenv("AGENT_INSTRUCTIONS_DIR")
+
+# Prebuilt agents, shared by all requests (an LlmAgent holds no per-request state)
+_AGENT_FACTORIES: Dict[str, Callable[[], LlmAgent]] = {
+    "speech": _speech_agent,
+    "album": _album_agent,
+}
+_agents: Dict[str, LlmAgent] = {}
+
+def _instruction_override_path(agent: LlmAgent) -> Optional[str]:
+    if not AGENT_INSTRUCTIONS_DIR:
+        return None
+    path = os.path.join(AGENT_INSTRUCTIONS_DIR, f"{agent.name}.txt")
+    return path if os.path.isfile(path) else None
+
+def _build_agent(key: str) -> Tuple[LlmAgent, str]:
+    """Build a registered agent, applying any instruction override; returns (agent, instruction source)."""
+    agent = _AGENT_FACTORIES[key]()
+    path = _instruction_override_path(agent)
+    if path is None:
+        return agent, "builtin"
+    with open(path, encoding="utf-8") as f:
+        return agent.with_system_instruction(f.read()), path
+
+def init_agents():
+    """Build all registered agents now; otherwise `get_agent` builds each on first use."""
+    for key in _AGENT_FACTORIES:
+        get_agent(key)
+
+def preload():
+    """Import the SDK and Pillow, create the client and build the agents ahead of the first generation (STARTUP_PRELOAD)."""
+    import PIL.Image  # noqa: F401
+
+    get_client()
+    init_agents()
+
+def get_agent(key: str) -> LlmAgent:
+    """The prebuilt agent registered under `key` ("speech" or "album")."""
+    agent = _agents.get(key)
+    if agent is None:
+        agent = _agents[key] = _build_agent(key)[0]
+    return agent
+
+def reload_agent_instructions() -> Dict[str, str]:
+    """
+    Rebuild every agent with the current system instructions from
+    AGENT_INSTRUCTIONS_DIR (or the built-in ones) and swap them in.
+    
+    Runs already in progress finish with the agent they started with. A
+    changed instruction also changes the LLM cache key, so no stale reply is
+    served. Returns the instruction source per agent name. Raises (keeping
+    the current agents) if an override cannot be read.
+    """
+    rebuilt = {key: _build_agent(key) for key in _AGENT_FACTORIES}
+    _agents.update({key: agent for key, (agent, _) in rebuilt.items()})
+    return {agent.name: source for agent, source in rebuilt.values()}
+
+def parse_speech_output(response_text: str) -> SpeechOutput:
+    """Parse the speech model's reply: JSON (optionally fenced), "(Voice: ...)" text, or plain text."""
+    # Try to parse as JSON
+    try:
+        # Check for code blocks first
+        json_match = _JSON_CODE_BLOCK.search(response_text)
+        if json_match:
+            json_text = json_match.group(1).strip()
+        else:
+            json_text = response_text
+        
+        data = json.loads(json_text)
+        return SpeechOutput(**data)
+    except Exception:
+        # Fallback: Parse text format "(Voice: ...)\nTranscript..."
+        voice_match = _VOICE_DIRECTION.search(response_text)
+        if voice_match:
+            emotion = f"(Voice: {voice_match.group(1)})"
+            # Transcript is everything after the voice direction
+            transcript = response_text[voice_match.end():].strip()
+            return SpeechOutput(emotion=emotion, transcript=transcript)
+        
+        # If all else fails, return as transcript with default emotion
+        return SpeechOutput(
+            emotion="(Voice: Neutral)",
+            transcript=response_text
+        )
+
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+def _decode_partial_json_string(body: str) -> str:
+    """Decode the start of a JSON string literal (opening quote already stripped), stopping at its end or at a cut-off escape."""
+    out = []
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if ch == '"':
+            break
+        if ch != "\\":
+            out.append(ch)
+            i += 1
+            continue
+        if i + 1 >= len(body):
+            break
+        esc = body[i + 1]
+        if esc == "u":
+            if i + 6 > len(body):
+                break
+            try:
+                out.append(chr(int(body[i + 2:i + 6], 16)))
+            except ValueError:
+                pass
+            i += 6
+            continue
+        out.append(_JSON_ESCAPES.get(esc, esc))
+        i += 2
+    return "".join(out)
+
+def partial_transcript(response_text: str) -> Optional[str]:
+    """
+    Best-effort transcript from an incomplete speech reply, for live display.
+    
+    Returns None while the transcript cannot be located yet (e.g. the JSON
+    "emotion" field is still streaming). `parse_speech_output` on the full
+    reply remains authoritative.
+    """
+    key_match = _TRANSCRIPT_KEY.search(response_text)
+    if key_match:
+        return _decode_partial_json_string(response_text[key_match.end():])
+    voice_match = _VOICE_DIRECTION.search(response_text)
+    if voice_match:
+        return response_text[voice_match.end():].lstrip()
+    stripped = response_text.lstrip()
+    if stripped and stripped[0] not in "{`(":
+        return stripped
+    return None
+
+async def generate_speech(title: str, person: str, emotion: str, notes: str, bypass_cache: bool = False) -> SpeechOutput:
+    if not get_client():
+        return SpeechOutput(
+            emotion="(Voice: Neutral, mock generated)",
+            transcript="Gemini API Key not found. Mock speech generated."
+        )
+    
+    speech_agent = get_agent("speech")
     
     # Initialize state with input parameters
     state: Dict[str, Any] = {
         "title": title,
         "person": person,
         "emotion": emotion,
-        "notes": notes
+        "notes": notes,
+        "bypass_cache": bypass_cache
     }
     
     try:
         # Run the agent
         result_state = await speech_agent.run(state)
-        response_text = result_state["speech"]
-        
-        # Try to parse as JSON
-        try:
-            # Check for code blocks first
-            import re
-            json_match = re.search(r'```(?:json)?\s*(.*?)```', response_text, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(1).strip()
-            else:
-                json_text = response_text
-            
-            data = json.loads(json_text)
-            return SpeechOutput(**data)
-        except Exception:
-            # Fallback: Parse text format "(Voice: ...)\nTranscript..."
-            voice_match = re.search(r'^\s*\(Voice:\s*(.*?)\)', response_text, re.DOTALL | re.IGNORECASE)
-            if voice_match:
-                emotion = f"(Voice: {voice_match.group(1)})"
-                # Transcript is everything after the voice direction
-                transcript = response_text[voice_match.end():].strip()
-                return SpeechOutput(emotion=emotion, transcript=transcript)
-            
-            # If all else fails, return as transcript with default emotion
-            return SpeechOutput(
-                emotion="(Voice: Neutral)",
-                transcript=response_text
-            )
+        return parse_speech_output(result_state["speech"])
 
     except Exception as e:
+        # Retries are exhausted or the circuit is open: fail the job (which backs
+        # off and re-queues) instead of storing a placeholder in the story
+        if is_upstream_unavailable(e):
+            raise
         print(f"Error generating speech: {repr(e)}")
         return SpeechOutput(
             emotion="(Voice: Error)",
             transcript="Error generating speech."
         )
 
-import wave
+async def stream_speech(
+    title: str, person: str, emotion: str, notes: str, bypass_cache: bool = False
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Generate a speech with a streaming request.
+    
+    Yields ("transcript", delta) events with new transcript text as it is
+    produced, then a final ("done", SpeechOutput). Errors propagate.
+    """
+    if not get_client():
+        yield "done", await generate_speech(title, person, emotion, notes)
+        return
+    
+    state: Dict[str, Any] = {
+        "title": title,
+        "person": person,
+        "emotion": emotion,
+        "notes": notes,
+        "bypass_cache": bypass_cache
+    }
+    
+    response_text = ""
+    sent = ""
+    async for chunk in get_agent("speech").stream(state):
+        response_text += chunk
+        transcript = partial_transcript(response_text)
+        # The partial transcript only grows; a mismatch means the format guess changed
+        if transcript and transcript.startswith(sent) and len(transcript) > len(sent):
+            yield "transcript", transcript[len(sent):]
+            sent = transcript
+    
+    yield "done", parse_speech_output(state["speech"])
 
-def save_wave_file(filename, pcm, channels=1, rate=24000, sample_width=2):
-    """Save PCM data to a WAV file."""
-    with wave.open(filename, "wb") as wf:
-        wf.setnchannels(channels)
-        wf.setsampwidth(sample_width)
-        wf.setframerate(rate)
-        wf.writeframes(pcm)
+TTS_MODEL = 'gemini-2.5-flash-preview-tts'
+TTS_VOICE_NAME = "Despina"
+
+# Gemini 2.5 Flash TTS config; the same for every request, built on first use
+_tts_config = None
+
+def _get_tts_config():
+    global _tts_config
+    if _tts_config is None:
+        from google.genai import types
+
+        _tts_config = types.GenerateContentConfig(
+            response_modalities=["AUDIO"],
+            speech_config=types.SpeechConfig(
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                        voice_name=TTS_VOICE_NAME
+                    )
+                )
+            )
+        )
+    return _tts_config
+
+# Output container for generated speech: "wav", "opus" (OGG) or "mp3"
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "wav").lower()
+if AUDIO_FORMAT not in AUDIO_FORMATS:
+    print(f"WARNING: Unsupported AUDIO_FORMAT '{AUDIO_FORMAT}', falling back to wav")
+    AUDIO_FORMAT = "wav"
+
+def speech_audio_path(speech_text: str, voice_direction: Optional[str] = None) -> str:
+    """Content-addressed media path of the audio for (model, voice, voice direction, text)."""
+    filename = audio_file_name(
+        TTS_MODEL, TTS_VOICE_NAME, voice_direction, speech_text, ext=audio_extension(AUDIO_FORMAT)
+    )
+    return os.path.join(MEDIA_DIR, filename)
+
+def _tts_request(speech_text: str, voice_direction: Optional[str]) -> Dict[str, Any]:
+    # Construct prompt with voice direction if available
+    prompt_text = f"Read the following text clearly: '{speech_text}'"
+    if voice_direction:
+        prompt_text = f"{voice_direction} Read the following text: '{speech_text}'"
+
+    return dict(model=TTS_MODEL, contents=prompt_text, config=_get_tts_config())
 
 async def generate_speech_audio(speech_text: str, voice_direction: str = None) -> str:
-    """Generate audio file from speech text using GenAI SDK with Gemini 2.5 Flash TTS."""
-    if not client:
+    """
+    Generate audio file from speech text using GenAI SDK with Gemini 2.5 Flash TTS.
+    
+    Files are content-addressed by (model, voice, voice direction, text), so a
+    request that was already synthesized returns the existing file without
+    calling Gemini. A reused file is not referenced until the caller commits
+    it, and may be released before then: call again after the commit to
+    synthesize it anew if so.
+    """
+    if not get_client():
         return ""
     
+    file_path = speech_audio_path(speech_text, voice_direction)
+    
+    async with speech_audio_lock(file_path):
+        if os.path.exists(file_path):
+            return file_path
+        return await _synthesize_speech_audio(speech_text, voice_direction, file_path)
+
+async def _synthesize_speech_audio(speech_text: str, voice_direction: Optional[str], file_path: str) -> str:
     try:
-        # Use Gemini 2.5 Flash TTS with audio response modality
-        # Construct prompt with voice direction if available
-        prompt_text = f"Read the following text clearly: '{speech_text}'"
-        if voice_direction:
-            prompt_text = f"{voice_direction} Read the following text: '{speech_text}'"
-
-        response = client.models.generate_content(
-            model='gemini-2.5-flash-preview-tts',
-            contents=prompt_text,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name="Despina"
-                        )
-                    )
-                )
+        request = _tts_request(speech_text, voice_direction)
+        with span("tts"):
+            response = await call_gemini(
+                TTS_MODEL,
+                lambda: get_client().aio.models.generate_content(**request),
+                semaphore=get_gemini_semaphore()
             )
-        )
         
         # Get audio bytes from the response
         if hasattr(response, 'candidates') and response.candidates:
@@ -207,37 +464,134 @@ async def generate_speech_audio(speech_text: str, voice_direction: str = None) -
                 if hasattr(part, 'inline_data') and part.inline_data:
                     audio_bytes = part.inline_data.data
                     
-                    # Generate unique filename
-                    filename = f"{uuid.uuid4()}.wav"
-                    file_path = os.path.join(MEDIA_DIR, filename)
-                    
-                    # Save audio file using wave module
-                    save_wave_file(file_path, audio_bytes)
+                    # Encode and save off the event loop, renaming into place
+                    # so readers never see a partial file
+                    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+                    with span("audio_write"):
+                        await asyncio.to_thread(save_audio_file, tmp_path, audio_bytes, AUDIO_FORMAT)
+                        os.replace(tmp_path, file_path)
+                        await asyncio.to_thread(precompress, file_path)
                     
                     return file_path
         
         print("No audio data found in response")
         return ""
     except Exception as e:
+        if is_upstream_unavailable(e):
+            raise
         print(f"Error generating speech audio: {e}")
         return ""
 
-async def generate_album_layout(title: str, person: str, emotion: str, notes: str, image_paths: list[str]) -> str:
-    if not client:
-        return json.dumps({
-            "page_title": title,
-            "page_description": "Mock description due to missing API key.",
-            "photos": []
-        })
+# Marks the end of a streamed synthesis in its chunk queue
+_STREAM_END = object()
+# Running streamed syntheses (the event loop only keeps weak references to tasks)
+_stream_tasks: set = set()
 
-    # Create the album layout agent
-    album_agent = LlmAgent(
-        name="AlbumLayoutGenerator",
-        client=client,
-        model='gemini-2.5-flash-lite',
-        system_instruction=ALBUM_SYSTEM_INSTRUCTION,
-        output_key="album_layout"
-    )
+async def stream_speech_audio(speech_text: str, voice_direction: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Yield raw 24 kHz mono 16-bit PCM as Gemini streams it.
+    
+    Gemini is read by a background task, so the audio lock and the Gemini
+    slot are held only as long as synthesis takes, however slowly the caller
+    consumes the chunks. A caller that stops early leaves the task to finish
+    and cache the file. Errors propagate to the caller.
+    """
+    chunks: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(_synthesize_stream(speech_text, voice_direction, chunks))
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+
+    while (item := await chunks.get()) is not _STREAM_END:
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+async def _synthesize_stream(speech_text: str, voice_direction: Optional[str], chunks: asyncio.Queue):
+    """
+    Stream TTS into `chunks`, ending with _STREAM_END or the exception raised.
+    
+    The PCM is teed to a temporary file; once the stream completes it is
+    encoded to AUDIO_FORMAT at `speech_audio_path`, so the next request is
+    served from disk. A failed stream leaves nothing behind.
+    """
+    file_path = speech_audio_path(speech_text, voice_direction)
+    pcm_path = f"{file_path}.{uuid.uuid4().hex}.pcm.tmp"
+    try:
+        request = _tts_request(speech_text, voice_direction)
+        async with speech_audio_lock(file_path):
+            complete = False
+            try:
+                async with aiofiles.open(pcm_path, "wb") as pcm_file:
+                    async for response in stream_gemini(
+                        TTS_MODEL,
+                        lambda: get_client().aio.models.generate_content_stream(**request),
+                        semaphore=get_gemini_semaphore()
+                    ):
+                        for part in _response_parts(response):
+                            if part.inline_data and part.inline_data.data:
+                                await pcm_file.write(part.inline_data.data)
+                                chunks.put_nowait(part.inline_data.data)
+                complete = True
+            finally:
+                if complete:
+                    with span("audio_write"):
+                        await asyncio.to_thread(_encode_pcm_file, pcm_path, file_path)
+                if os.path.exists(pcm_path):
+                    os.remove(pcm_path)
+    except BaseException as e:
+        # The caller may have stopped reading already
+        print(f"Error streaming speech audio: {e!r}")
+        chunks.put_nowait(e)
+        if not isinstance(e, Exception):
+            raise
+    else:
+        chunks.put_nowait(_STREAM_END)
+
+def _response_parts(response) -> list:
+    if not response.candidates or not response.candidates[0].content:
+        return []
+    return response.candidates[0].content.parts or []
+
+def _encode_pcm_file(pcm_path: str, file_path: str):
+    with open(pcm_path, "rb") as f:
+        pcm = f.read()
+    if not pcm:
+        return
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    save_audio_file(tmp_path, pcm, AUDIO_FORMAT)
+    os.replace(tmp_path, file_path)
+    precompress(file_path)
+
+def _load_album_images(image_paths: list[str]) -> list:
+    """Open and decode the photos for the album prompt, skipping unreadable ones. Blocking."""
+    import PIL.Image
+
+    images = []
+    for path in image_paths:
+        try:
+            # Prefer the downscaled upload variant to cut payload and tokens
+            img = PIL.Image.open(model_input_path(path))
+            img.load()
+            images.append(img)
+        except Exception as e:
+            print(f"Could not load image {path}: {e}")
+    return images
+
+async def generate_album_layout(
+    title: str, person: str, emotion: str, notes: str, image_paths: list[str]
+) -> Optional[AlbumLayout]:
+    """
+    Generate the album page layout; `photo_id`s index into `image_paths`.
+
+    Returns None if no valid layout could be generated.
+    """
+    if not get_client():
+        return AlbumLayout(
+            page_title=title,
+            page_description="Mock description due to missing API key."
+        )
+
+    album_agent = get_agent("album")
     
     # Prepare text prompt with explicit image count
     num_images = len(image_paths)
@@ -250,14 +604,10 @@ IMAGES PROVIDED: {num_images} images (photo_id range: 0 to {num_images - 1})
 
 Generate the album layout JSON using ONLY the {num_images} images provided."""
     
-    # Build contents list with text and images
+    # Build contents list with text and images, decoded off the event loop
     contents = [text_prompt]
-    for path in image_paths:
-        try:
-            img = PIL.Image.open(path)
-            contents.append(img)
-        except Exception as e:
-            print(f"Could not load image {path}: {e}")
+    with span("image_load"):
+        contents.extend(await asyncio.to_thread(_load_album_images, image_paths))
     
     # Initialize state
     state: Dict[str, Any] = {
@@ -267,27 +617,86 @@ Generate the album layout JSON using ONLY the {num_images} images provided."""
     try:
         # Run the agent
         result_state = await album_agent.run(state)
-        layout_json = result_state["album_layout"]
+        layout: AlbumLayout = result_state["album_layout"]
         
-        # Post-process: Validate and filter photo IDs
-        try:
-            layout_data = json.loads(layout_json)
-            if "photos" in layout_data:
-                valid_photos = []
-                for photo in layout_data["photos"]:
-                    photo_id = photo.get("photo_id")
-                    if isinstance(photo_id, int) and 0 <= photo_id < num_images:
-                        valid_photos.append(photo)
-                    else:
-                        print(f"Warning: Filtered out invalid photo_id {photo_id} (valid range: 0-{num_images-1})")
-                
-                layout_data["photos"] = valid_photos
-                return json.dumps(layout_data)
-        except json.JSONDecodeError:
-            # If we can't parse it, return as-is
-            pass
-        
-        return layout_json
+        # Post-process: drop entries for images that were not provided
+        valid_photos = []
+        for photo in layout.photos:
+            if 0 <= photo.photo_id < num_images:
+                valid_photos.append(photo)
+            else:
+                print(f"Warning: Filtered out invalid photo_id {photo.photo_id} (valid range: 0-{num_images-1})")
+        layout.photos = valid_photos
+        return layout
     except Exception as e:
+        if is_upstream_unavailable(e):
+            raise
         print(f"Error generating album layout: {e}")
-        return json.dumps({"error": "Failed to generate layout"})
+        return None
+
+
+async def generate_story_content(
+    title: str,
+    person: str,
+    emotion: str,
+    notes: str,
+    image_paths: list[str],
+    progress: Optional[Callable[[str, str], Awaitable[None]]] = None
+) -> Dict[str, Any]:
+    """
+    Run the full story generation pipeline.
+    
+    The album layout does not depend on the speech, so it runs in parallel
+    with the speech -> TTS chain. Returns the final state with `speech`
+    (SpeechOutput), `audio_file_path` and `album` (AlbumLayout or None) keys.
+    
+    If `progress` is given it is awaited as progress(stage, status) when the
+    "speech", "audio" and "album" stages start ("running") and finish ("done").
+    """
+    async def report(stage: str, status: str):
+        if progress:
+            await progress(stage, status)
+
+    async def run_speech(state: Dict[str, Any]) -> SpeechOutput:
+        await report("speech", "running")
+        speech = await generate_speech(state["title"], state["person"], state["emotion"], state["notes"])
+        await report("speech", "done")
+        return speech
+
+    async def run_audio(state: Dict[str, Any]) -> str:
+        speech = state["speech"]
+        await report("audio", "running")
+        audio_path = await generate_speech_audio(speech.transcript, voice_direction=speech.emotion)
+        await report("audio", "done")
+        return audio_path
+
+    async def run_album(state: Dict[str, Any]) -> Optional[AlbumLayout]:
+        await report("album", "running")
+        album = await generate_album_layout(
+            state["title"], state["person"], state["emotion"], state["notes"], state["image_paths"]
+        )
+        await report("album", "done")
+        return album
+
+    pipeline = ParallelAgent(
+        name="StoryPipeline",
+        sub_agents=[
+            SequentialAgent(
+                name="SpeechAndAudio",
+                sub_agents=[
+                    FunctionAgent(name="SpeechGenerator", func=run_speech, output_key="speech"),
+                    FunctionAgent(name="SpeechAudio", func=run_audio, output_key="audio_file_path"),
+                ]
+            ),
+            FunctionAgent(name="AlbumLayoutGenerator", func=run_album, output_key="album"),
+        ]
+    )
+
+    state: Dict[str, Any] = {
+        "title": title,
+        "person": person,
+        "emotion": emotion,
+        "notes": notes,
+        "image_paths": image_paths
+    }
+    return await pipeline.run(state)
@@ -0,0 +1,47 @@
+"""
+Album layouts as rows.
+
+The album agent refers to photos by their 0-based position in the list of
+images it was shown; `album_page_from_layout` maps those positions onto
+`Photo.id`s so the stored layout stays correct when photos are added or
+removed later.
+"""
+
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from .agents import AlbumLayout
+from .models import AlbumPage, AlbumPhoto, Story
+
+
+def album_page_from_layout(layout: AlbumLayout, photo_ids: List[int]) -> AlbumPage:
+    """Build an AlbumPage; `photo_ids` are the ids of the images in the order they were sent."""
+    page = AlbumPage(page_title=layout.page_title, page_description=layout.page_description)
+    for position, entry in enumerate(
+        entry for entry in layout.photos if 0 <= entry.photo_id < len(photo_ids)
+    ):
+        page.photos.append(AlbumPhoto(
+            photo_id=photo_ids[entry.photo_id],
+            position=position,
+            role=entry.role,
+            caption=entry.caption
+        ))
+    return page
+
+
+def set_story_album(db: Session, story_id: int, page: Optional[AlbumPage]):
+    """
+    Replace a story's album page (None removes it).
+
+    Sync, since replacing loads the old page; from an AsyncSession use
+    `await db.run_sync(set_story_album, story_id, page)` inside
+    `db.write_transaction()`, since replacing flushes before the commit.
+    """
+    story = db.get(Story, story_id)
+    if story.album is not None:
+        # Delete first: the unit of work would insert the new page before
+        # removing the orphan, violating the one-page-per-story constraint
+        db.delete(story.album)
+        db.flush()
+    story.album = page
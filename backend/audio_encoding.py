@@ -0,0 +1,88 @@
+"""
+Encoding of raw TTS PCM into on-disk audio files.
+
+Gemini TTS returns 24 kHz, mono, 16-bit little-endian PCM. WAV stores that
+as-is (~48 KB/s); Opus (in OGG) and MP3 are encoded through libsndfile via
+the optional `soundfile` package, feeding the PCM in fixed-size chunks so
+memory stays flat regardless of speech length.
+"""
+
+import struct
+import wave
+
+# format name -> (file extension, libsndfile (format, subtype) or None for WAV)
+AUDIO_FORMATS = {
+    "wav": ("wav", None),
+    "opus": ("ogg", ("OGG", "OPUS")),
+    "mp3": ("mp3", ("MP3", "MPEG_LAYER_III")),
+}
+
+ENCODE_CHUNK_FRAMES = 4096
+
+
+def audio_extension(audio_format: str) -> str:
+    """File extension used for `audio_format`."""
+    return AUDIO_FORMATS[audio_format][0]
+
+
+def wav_stream_header(channels=1, rate=24000, sample_width=2) -> bytes:
+    """
+    WAV header for PCM of unknown length, for streaming to a browser.
+    
+    The RIFF and data chunk sizes are set to the maximum, which players
+    treat as "read until the connection closes".
+    """
+    byte_rate = rate * channels * sample_width
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, rate, byte_rate, channels * sample_width, sample_width * 8)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+def save_wave_file(filename, pcm, channels=1, rate=24000, sample_width=2):
+    """Save PCM data to a WAV file."""
+    with wave.open(filename, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+
+
+def save_audio_file(filename, pcm, audio_format="wav", channels=1, rate=24000, sample_width=2):
+    """
+    Save PCM data to `filename` in the requested format.
+    
+    Args:
+        filename: Destination path (extension is not used to pick the format)
+        pcm: Raw 16-bit little-endian PCM bytes
+        audio_format: One of AUDIO_FORMATS ("wav", "opus", "mp3")
+        channels: Number of interleaved channels
+        rate: Sample rate in Hz
+        sample_width: Bytes per sample (only 2 is supported for compressed formats)
+    """
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format: {audio_format}")
+
+    container = AUDIO_FORMATS[audio_format][1]
+    if container is None:
+        save_wave_file(filename, pcm, channels=channels, rate=rate, sample_width=sample_width)
+        return
+
+    if sample_width != 2:
+        raise ValueError("Compressed audio output requires 16-bit PCM")
+
+    # Optional dependency, only needed for compressed output
+    import soundfile
+
+    sf_format, sf_subtype = container
+    chunk_bytes = ENCODE_CHUNK_FRAMES * channels * sample_width
+    with soundfile.SoundFile(
+        filename, "w",
+        samplerate=rate,
+        channels=channels,
+        format=sf_format,
+        subtype=sf_subtype
+    ) as f:
+        for offset in range(0, len(pcm), chunk_bytes):
+            f.buffer_write(pcm[offset:offset + chunk_bytes], dtype="int16")
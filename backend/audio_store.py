@@ -0,0 +1,111 @@
+"""
+Content-addressed storage for synthesized speech audio.
+
+TTS output is deterministic enough for our purposes that the same text read
+with the same voice and direction can be reused, so audio files are named
+after a hash of their inputs. Several stories may then point at the same
+file; the number of stories referencing a path is its reference count and a
+file is only removed from disk once that count drops to zero.
+
+Synthesis, reuse and release of a file all happen under its
+`speech_audio_lock`, so a story that committed a reference to a reused file
+can re-check it under the lock and synthesize it again if a release that
+counted references before that commit removed it.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .media import referenced_paths, remove_precompressed
+from .models import Story
+
+AUDIO_FILE_PREFIX = "tts-"
+
+# One lock per audio file, kept only while some task holds or waits for it
+_audio_locks: Dict[str, asyncio.Lock] = {}
+_audio_lock_users: Dict[str, int] = {}
+
+
+def audio_file_name(model: str, voice_name: str, voice_direction: Optional[str], text: str, ext: str = "wav") -> str:
+    """Return the content-addressed file name for a TTS request."""
+    payload = json.dumps([model, voice_name, voice_direction or "", text], ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{AUDIO_FILE_PREFIX}{digest[:32]}.{ext}"
+
+
+@asynccontextmanager
+async def speech_audio_lock(file_path: str) -> AsyncIterator[None]:
+    """Hold the lock of `file_path`, which is held while the file is being synthesized or released."""
+    lock = _audio_locks.setdefault(file_path, asyncio.Lock())
+    _audio_lock_users[file_path] = _audio_lock_users.get(file_path, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _audio_lock_users[file_path] -= 1
+        if not _audio_lock_users[file_path]:
+            del _audio_lock_users[file_path]
+            del _audio_locks[file_path]
+
+
+@asynccontextmanager
+async def speech_audio_locks(file_paths: Iterable[Optional[str]]) -> AsyncIterator[None]:
+    """Hold the locks of all `file_paths`, taken in sorted order."""
+    async with AsyncExitStack() as stack:
+        for file_path in sorted({path for path in file_paths if path}):
+            await stack.enter_async_context(speech_audio_lock(file_path))
+        yield
+
+
+def count_audio_references(db: Session, file_path: str) -> int:
+    """Number of stories whose audio_file_path points at `file_path`."""
+    return db.query(Story).filter(Story.audio_file_path == file_path).count()
+
+
+def referenced_audio_paths(db: Session, file_paths: Iterable[str]) -> Set[str]:
+    """The subset of `file_paths` that some story's audio still points at."""
+    return referenced_paths(db, Story.audio_file_path, file_paths)
+
+
+def release_audio_files(db: Session, file_paths: Iterable[Optional[str]]) -> List[str]:
+    """
+    Batch version of `release_audio_file`. Returns the paths that were removed.
+
+    Hold `speech_audio_locks` of the paths while calling this.
+    """
+    candidates = {path for path in file_paths if path}
+    removed = []
+    for file_path in sorted(candidates - referenced_audio_paths(db, candidates)):
+        remove_precompressed(file_path)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            removed.append(file_path)
+    if removed:
+        print(f"Deleted {len(removed)} audio files")
+    return removed
+
+
+def release_audio_file(db: Session, file_path: Optional[str]) -> bool:
+    """
+    Delete `file_path` from disk if no story references it any more.
+    
+    Call this after the referencing story has been deleted or re-pointed
+    (and the change flushed), holding `speech_audio_lock(file_path)`.
+    Returns True if the file was removed.
+    """
+    if not file_path:
+        return False
+    if count_audio_references(db, file_path) > 0:
+        return False
+    remove_precompressed(file_path)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+        print(f"Deleted audio file: {file_path}")
+        return True
+    return False
@@ -0,0 +1,147 @@
+"""
+Bulk story import: manifest parsing and photo extraction.
+
+A manifest is either JSON (a list of story objects, or `{"stories": [...]}`)
+or CSV with a header row. Every entry has `title`, `person`, `emotion`,
+`notes` and optional `photos`: file names inside the accompanying zip
+(separated by ";" in CSV). Referenced photos are streamed out of the zip
+into the same content-addressed media store as regular uploads.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import zipfile
+import zlib
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from .models import BulkImportRow
+from .uploads import (
+    MAX_UPLOAD_FILE_BYTES,
+    UPLOAD_CHUNK_BYTES,
+    store_content_addressed,
+    temp_upload_path,
+)
+
+MAX_MANIFEST_BYTES = 5 * 1024 * 1024
+MAX_BULK_IMPORT_ROWS = int(os.getenv("MAX_BULK_IMPORT_ROWS", "500"))
+MAX_BULK_IMPORT_BYTES = int(os.getenv("MAX_BULK_IMPORT_BYTES", str(500 * 1024 * 1024)))
+
+
+def parse_manifest(filename: Optional[str], data: bytes) -> List[Any]:
+    """Decode a JSON or CSV manifest into a list of raw entries."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Manifest must be UTF-8 encoded")
+
+    is_json = (filename or "").lower().endswith(".json") or text.lstrip().startswith(("[", "{"))
+    if is_json:
+        try:
+            entries = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON manifest: {e}")
+        if isinstance(entries, dict):
+            entries = entries.get("stories")
+        if not isinstance(entries, list):
+            raise HTTPException(status_code=400, detail="JSON manifest must be a list of stories")
+    else:
+        entries = []
+        for row in csv.DictReader(io.StringIO(text)):
+            entry = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            entry["photos"] = [name.strip() for name in entry.get("photos", "").split(";") if name.strip()]
+            entries.append(entry)
+
+    if len(entries) > MAX_BULK_IMPORT_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Manifest has {len(entries)} stories; the limit is {MAX_BULK_IMPORT_ROWS}"
+        )
+    return entries
+
+
+def validate_entry(entry: Any) -> Tuple[Optional[BulkImportRow], Optional[str]]:
+    """Return the parsed row, or None and a readable error."""
+    if not isinstance(entry, dict):
+        return None, "Entry must be an object"
+    try:
+        return BulkImportRow.model_validate(entry), None
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+
+
+def _index_members(archive: zipfile.ZipFile) -> Dict[str, zipfile.ZipInfo]:
+    """Map member names, and base names where unambiguous, to zip entries."""
+    members: Dict[str, zipfile.ZipInfo] = {}
+    by_basename: Dict[str, List[zipfile.ZipInfo]] = {}
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.startswith("__MACOSX/"):
+            continue
+        members[info.filename] = info
+        by_basename.setdefault(os.path.basename(info.filename), []).append(info)
+    for name, infos in by_basename.items():
+        if len(infos) == 1:
+            members.setdefault(name, infos[0])
+    return members
+
+
+def _extract_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_file_bytes: int) -> str:
+    tmp_path = temp_upload_path()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with archive.open(info) as src, open(tmp_path, "wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                # Count real bytes; the size in the zip header can lie
+                size += len(chunk)
+                if size > max_file_bytes:
+                    raise ValueError(f"exceeds the {max_file_bytes} byte file limit")
+                digest.update(chunk)
+                out.write(chunk)
+        return store_content_addressed(tmp_path, digest.hexdigest(), info.filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def extract_photos(
+    zip_file: BinaryIO,
+    names: Iterable[str],
+    max_file_bytes: int = MAX_UPLOAD_FILE_BYTES
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Copy the named photos out of a zip into media/.
+
+    Blocking; run in a worker thread. Returns (media path by name, error by
+    name); every requested name ends up in exactly one of the two.
+    """
+    try:
+        archive = zipfile.ZipFile(zip_file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Photos must be uploaded as a zip archive")
+
+    paths: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    with archive:
+        members = _index_members(archive)
+        for name in names:
+            info = members.get(name)
+            if info is None:
+                errors[name] = f"{name}: not found in zip"
+            elif info.file_size > max_file_bytes:
+                errors[name] = f"{name}: exceeds the {max_file_bytes} byte file limit"
+            else:
+                try:
+                    paths[name] = _extract_member(archive, info, max_file_bytes)
+                except (ValueError, RuntimeError, EOFError, zlib.error, zipfile.BadZipFile, NotImplementedError) as e:
+                    # Oversized, encrypted (RuntimeError), truncated or corrupt member
+                    errors[name] = f"{name}: {e}"
+    return paths, errors
@@ -0,0 +1,103 @@
+"""
+Set-based story operations.
+
+Resetting, marking and deleting many stories each run as a few SQL
+statements, however many rows they touch, instead of loading every ORM
+object. Because these statements bypass the session's flush, each one
+records its story revisions explicitly (see revisions.py).
+
+Deleting rows does not delete files: the delete functions return the
+photo and audio paths they orphaned, and `release_media_files` removes
+those still unreferenced afterwards, typically as a background task.
+"""
+
+import asyncio
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from .audio_store import release_audio_files, speech_audio_locks
+from .database import SessionLocal
+from .models import AlbumPage, AlbumPhoto, Photo, Story
+from .revisions import record_story_changes
+from .uploads import release_photo_files
+
+# Bulk statements below do not keep loaded session objects in sync
+NO_SYNC = {"synchronize_session": False}
+
+
+def set_used_in_presentation(db: Session, used: bool, story_ids: Optional[Iterable[int]] = None) -> List[int]:
+    """
+    Set `used_in_presentation` on the given stories (all stories if None)
+    in one UPDATE. Returns the ids that actually changed. Not committed.
+    """
+    stmt = update(Story).where(Story.used_in_presentation.is_not(used))
+    if story_ids is not None:
+        stmt = stmt.where(Story.id.in_(list(story_ids)))
+    changed = list(db.scalars(
+        stmt.values(used_in_presentation=used).returning(Story.id).execution_options(**NO_SYNC)
+    ))
+    record_story_changes(db.connection(), changed)
+    return changed
+
+
+def delete_stories(db: Session, story_ids: Iterable[int]) -> Tuple[List[int], Set[str], Set[str]]:
+    """
+    Delete stories with their photos and album pages. Not committed.
+
+    Returns (deleted story ids, photo paths, audio paths); pass the paths
+    to `release_media_files` after committing.
+    """
+    story_ids = list(set(story_ids))
+    story_photo_ids = select(Photo.id).where(Photo.story_id.in_(story_ids))
+    story_page_ids = select(AlbumPage.id).where(AlbumPage.story_id.in_(story_ids))
+
+    db.execute(
+        delete(AlbumPhoto)
+        .where(or_(AlbumPhoto.page_id.in_(story_page_ids), AlbumPhoto.photo_id.in_(story_photo_ids)))
+        .execution_options(**NO_SYNC)
+    )
+    db.execute(delete(AlbumPage).where(AlbumPage.story_id.in_(story_ids)).execution_options(**NO_SYNC))
+    photo_paths = set(db.scalars(
+        delete(Photo).where(Photo.story_id.in_(story_ids)).returning(Photo.file_path).execution_options(**NO_SYNC)
+    ))
+    deleted = db.execute(
+        delete(Story).where(Story.id.in_(story_ids))
+        .returning(Story.id, Story.audio_file_path)
+        .execution_options(**NO_SYNC)
+    ).all()
+
+    record_story_changes(db.connection(), deleted=[story_id for story_id, _ in deleted])
+    return [story_id for story_id, _ in deleted], photo_paths, {path for _, path in deleted if path}
+
+
+def delete_photos(db: Session, photo_ids: Iterable[int]) -> Tuple[List[int], Set[str]]:
+    """
+    Delete photos and their album entries. Not committed.
+
+    Returns (deleted photo ids, photo paths) for `release_media_files`.
+    """
+    photo_ids = list(set(photo_ids))
+    db.execute(delete(AlbumPhoto).where(AlbumPhoto.photo_id.in_(photo_ids)).execution_options(**NO_SYNC))
+    deleted = db.execute(
+        delete(Photo).where(Photo.id.in_(photo_ids))
+        .returning(Photo.id, Photo.story_id, Photo.file_path)
+        .execution_options(**NO_SYNC)
+    ).all()
+
+    record_story_changes(db.connection(), [story_id for _, story_id, _ in deleted])
+    return [photo_id for photo_id, _, _ in deleted], {path for _, _, path in deleted}
+
+
+def _release_media_files(photo_paths: Iterable[str], audio_paths: Iterable[str]):
+    with SessionLocal() as db:
+        release_photo_files(db, photo_paths)
+        release_audio_files(db, audio_paths)
+
+
+async def release_media_files(photo_paths: Iterable[str] = (), audio_paths: Iterable[str] = ()):
+    """Remove files no row references any more, with one reference query per batch."""
+    audio_paths = list(audio_paths)
+    async with speech_audio_locks(audio_paths):
+        await asyncio.to_thread(_release_media_files, photo_paths, audio_paths)
@@ -0,0 +1,91 @@
+"""
+Response compression for the API.
+
+`CompressionMiddleware` extends Starlette's GZipMiddleware with Brotli,
+used when the client accepts `br` and the optional `brotli` package is
+installed. Starlette's rules still apply: bodies under the size threshold,
+already-encoded responses (e.g. precompressed media), partial content and
+incompressible or streamed types (images, audio, Server-Sent Events) are
+passed through untouched.
+"""
+
+import os
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    # Optional dependency; gzip only without it
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("API_COMPRESSION_MIN_BYTES", "1000"))
+# Dynamic responses: favour speed over the last few percent of size
+GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", "4"))
+
+
+def accepts_encoding(accept_encoding: str, token: str) -> bool:
+    """Whether an Accept-Encoding header value allows `token` (q > 0)."""
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == token:
+            params = params.replace(" ", "")
+            if params.startswith("q="):
+                try:
+                    return float(params[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+    return False
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int, thread_minimum_size: int, **kwargs):
+        super().__init__(app, minimum_size, **kwargs)
+        self.compressor = brotli.Compressor(quality=quality)
+        self.thread_minimum_size = thread_minimum_size
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # Large bodies are compressed in a worker thread, as GZipResponder does
+        if len(body) >= self.thread_minimum_size:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZip middleware that prefers Brotli when both sides support it."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        compresslevel: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+        **kwargs
+    ):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel, **kwargs)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and brotli is not None:
+            if accepts_encoding(Headers(scope=scope).get("accept-encoding", ""), "br"):
+                responder = BrotliResponder(
+                    self.app,
+                    self.minimum_size,
+                    self.brotli_quality,
+                    self.thread_minimum_size,
+                    exclude_content_types=self.exclude_content_types
+                )
+                await responder(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
@@ -1,13 +1,117 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import time
+import weakref
+from .metrics import STAGE_SECONDS
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./stories.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./stories.db"
+
+# SQLite tuning, applied to every new connection
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer (and vice versa)
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # Safe with WAL; only fsyncs at checkpoints
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Wait for locks instead of failing with "database is locked"
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    # Memory-map the database file for cheaper reads
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+}
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+)
+
+# Async engine (aiosqlite) for the async route handlers, same file and tuning
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
 )
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+# One commit lock per event loop, created on first use: a lock built at import
+# time would be shared by every loop that imports this module (e.g. in tests)
+_commit_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+def _commit_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _commit_locks.get(loop)
+    if lock is None:
+        lock = _commit_locks[loop] = asyncio.Lock()
+    return lock
+
+class SerializedCommitAsyncSession(AsyncSession):
+    """
+    AsyncSession whose commits take turns on the event loop.
+    
+    SQLite has a single writer. Without this, concurrent async writers sit in
+    SQLite's busy handler (sleeping with back-off) while the lock holder waits
+    for its next event-loop turn. Routes should not flush explicitly before
+    commit, so that all writes of a transaction happen inside the commit;
+    a transaction that must flush early (e.g. to learn generated ids) runs
+    inside `write_transaction()` instead.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_write_lock = False
+
+    async def commit(self):
+        if self._holds_write_lock:
+            await super().commit()
+            return
+        started = time.perf_counter()
+        async with _commit_lock():
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="db_commit_wait")
+            await super().commit()
+
+    @asynccontextmanager
+    async def write_transaction(self):
+        """Hold the commit lock for a whole flush ... commit sequence."""
+        async with _commit_lock():
+            self._holds_write_lock = True
+            try:
+                yield self
+            finally:
+                self._holds_write_lock = False
+
+# Time every commit (flush + COMMIT), sync and async sessions alike
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="db_commit")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=SerializedCommitAsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 Base = declarative_base()
 
@@ -17,3 +121,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,118 @@
+"""
+Upload-time image preprocessing.
+
+Every uploaded photo is kept byte-for-byte as the original. Next to it we
+write two derived variants:
+
+- `<name>.model.jpg`: longest edge MODEL_MAX_EDGE, sent to the album agent
+  and used for the album preview
+- `<name>.thumb.webp`: longest edge THUMB_MAX_EDGE, used for photo lists
+
+Decoding and resizing is CPU-bound, so it runs in a process pool rather than
+on the event loop.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from .metrics import span
+
+MODEL_MAX_EDGE = int(os.getenv("IMAGE_MODEL_MAX_EDGE", "1024"))
+THUMB_MAX_EDGE = int(os.getenv("IMAGE_THUMB_MAX_EDGE", "320"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# variant name -> (file suffix, PIL format, save options)
+IMAGE_VARIANTS = {
+    "model": (".model.jpg", "JPEG", {"quality": 85, "optimize": True}),
+    "thumb": (".thumb.webp", "WEBP", {"quality": 80}),
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def variant_path(file_path: str, variant: str) -> str:
+    """Path of the derived `variant` for an original upload."""
+    root, _ = os.path.splitext(file_path)
+    return root + IMAGE_VARIANTS[variant][0]
+
+
+def existing_variant_path(file_path: Optional[str], variant: str) -> Optional[str]:
+    """Derived variant path if it has been generated, else None."""
+    if not file_path:
+        return None
+    path = variant_path(file_path, variant)
+    return path if os.path.exists(path) else None
+
+
+def model_input_path(file_path: str) -> str:
+    """Image to send to the model: the downscaled variant when available."""
+    return existing_variant_path(file_path, "model") or file_path
+
+
+def _make_variants(file_path: str) -> dict:
+    """Write all variants for `file_path` (runs in a worker process)."""
+    import PIL.Image
+    import PIL.ImageOps
+
+    edges = {"model": MODEL_MAX_EDGE, "thumb": THUMB_MAX_EDGE}
+    written = {}
+    with PIL.Image.open(file_path) as img:
+        img = PIL.ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        for variant, (_, fmt, options) in IMAGE_VARIANTS.items():
+            resized = img.copy()
+            resized.thumbnail((edges[variant], edges[variant]))
+            out_path = variant_path(file_path, variant)
+            tmp_path = out_path + ".tmp"
+            resized.save(tmp_path, format=fmt, **options)
+            os.replace(tmp_path, out_path)
+            written[variant] = out_path
+    return written
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, IMAGE_WORKERS))
+    return _executor
+
+
+async def preprocess_images(file_paths: list[str]):
+    """Generate variants for each upload in the process pool; failures are logged, not raised."""
+    # Deduplicated uploads may already have their variants
+    pending = [
+        path for path in dict.fromkeys(file_paths)
+        if not all(os.path.exists(variant_path(path, v)) for v in IMAGE_VARIANTS)
+    ]
+    if not pending:
+        return
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    with span("image_variants"):
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, _make_variants, path) for path in pending),
+            return_exceptions=True
+        )
+    for path, result in zip(pending, results):
+        if isinstance(result, Exception):
+            print(f"Could not preprocess image {path}: {result}")
+
+
+def delete_variants(file_path: str):
+    """Remove any derived variants of an original upload."""
+    for variant in IMAGE_VARIANTS:
+        path = variant_path(file_path, variant)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def shutdown_executor():
+    """Stop the worker processes (called on app shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,400 @@
+"""
+In-process background job queue for story generation.
+
+Long-running Gemini work (speech, TTS, album layout) is recorded as a row in
+the `jobs` table and executed by a small pool of asyncio workers, so HTTP
+handlers can return `202 Accepted` with a job id immediately. Clients poll
+`GET /api/jobs/{id}` (or subscribe to its SSE stream) for per-stage progress.
+
+Job starts are paced: workers keep at least JOB_START_INTERVAL_SECONDS
+between starts, and a job that fails because Gemini is unavailable (rate
+limited or down after the per-call retries in resilience.py, or circuit
+open) pauses all workers for a cool-down before it is re-queued, so a large
+bulk import drains at the rate the API allows instead of failing en masse.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import AsyncSessionLocal
+from .models import Job, Photo, Story
+from .agents import generate_speech, generate_speech_audio, generate_story_content
+from .resilience import is_upstream_unavailable
+from .audio_store import release_audio_file, speech_audio_lock
+from .albums import album_page_from_layout, set_story_album
+from .metrics import Gauge, JOB_SECONDS, JOBS, JOBS_RUNNING
+
+logger = logging.getLogger("backend.jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_START_INTERVAL_SECONDS = float(os.getenv("JOB_START_INTERVAL_SECONDS", "0"))
+JOB_RATE_LIMIT_COOLDOWN_SECONDS = float(os.getenv("JOB_RATE_LIMIT_COOLDOWN_SECONDS", "30"))
+JOB_RATE_LIMIT_RETRIES = int(os.getenv("JOB_RATE_LIMIT_RETRIES", "5"))
+
+CREATE_STORY_STAGES = ["speech", "audio", "album"]
+
+ProgressCallback = Callable[[str, str], Awaitable[None]]
+JobHandler = Callable[[AsyncSession, Job, ProgressCallback], Awaitable[Dict[str, Any]]]
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+_queue: Optional[asyncio.Queue] = None
+_workers: list[asyncio.Task] = []
+
+# Pacing state: event-loop time before which no job may start
+_next_start = 0.0
+_pace_lock: Optional[asyncio.Lock] = None
+_rate_limit_attempts: Dict[str, int] = {}
+
+# New stories waiting to be inserted with their jobs, and the task inserting them
+_pending_story_jobs: List[Tuple[Story, str, List[str], asyncio.Future]] = []
+_insert_tasks: set = set()
+
+JOBS_QUEUED = Gauge(
+    "jobs_queued", "Job ids waiting in the worker queue.", callback=lambda: _queue.qsize() if _queue else 0
+)
+
+
+def job_handler(kind: str):
+    """Register a coroutine as the handler for jobs of the given kind."""
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def new_job(
+    kind: str,
+    story_id: Optional[int] = None,
+    params: Optional[Dict[str, Any]] = None,
+    stages: Iterable[str] = (),
+    batch_id: Optional[str] = None
+) -> Job:
+    """Build a queued Job row. Add it to a session, commit, then `submit_jobs` it."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    return Job(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        story_id=story_id,
+        batch_id=batch_id,
+        status=JOB_QUEUED,
+        stages=json.dumps({stage: "pending" for stage in stages}),
+        params=json.dumps(params or {})
+    )
+
+
+def submit_jobs(job_ids: Iterable[str]):
+    """
+    Hand committed jobs to the worker pool.
+    
+    If the workers are not running yet the jobs stay queued in the database
+    and are picked up by `start_workers`.
+    """
+    if _queue is None:
+        return
+    for job_id in job_ids:
+        _queue.put_nowait(job_id)
+
+
+async def enqueue_job(
+    db: AsyncSession,
+    kind: str,
+    story_id: Optional[int] = None,
+    params: Optional[Dict[str, Any]] = None,
+    stages: Iterable[str] = ()
+) -> Job:
+    """Persist a new job and hand it to the worker pool."""
+    job = new_job(kind, story_id=story_id, params=params, stages=stages)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    submit_jobs([job.id])
+    return job
+
+
+async def enqueue_story_job(story: Story, kind: str, stages: Iterable[str] = ()) -> Job:
+    """
+    Insert a new story (with its photos) and a job for it, and hand the job to the worker pool.
+    
+    Concurrent calls are batched into one transaction: stories arriving while
+    an insert waits for the commit lock go in with it, so a burst of creates
+    takes the lock once per batch instead of twice per story.
+    """
+    future = asyncio.get_running_loop().create_future()
+    _pending_story_jobs.append((story, kind, list(stages), future))
+    if len(_pending_story_jobs) == 1:
+        # Runs in its own task and session, so the batch survives a cancelled caller
+        task = asyncio.create_task(_insert_pending_story_jobs())
+        _insert_tasks.add(task)
+        task.add_done_callback(_insert_tasks.discard)
+    return await asyncio.shield(future)
+
+
+async def _insert_pending_story_jobs():
+    async with AsyncSessionLocal() as db:
+        # Flushing for story ids opens the write transaction early, so hold the commit lock throughout
+        async with db.write_transaction():
+            batch = _pending_story_jobs[:]
+            _pending_story_jobs.clear()
+            try:
+                db.add_all(story for story, _, _, _ in batch)
+                await db.flush()
+                jobs = [new_job(kind, story_id=story.id, stages=stages) for story, kind, stages, _ in batch]
+                db.add_all(jobs)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                for *_, future in batch:
+                    # A waiter may have cancelled its future; it needs no outcome
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+    submit_jobs(job.id for job in jobs)
+    for (*_, future), job in zip(batch, jobs):
+        if not future.done():
+            future.set_result(job)
+
+
+async def retry_job(db: AsyncSession, job: Job) -> Job:
+    """Reset a failed job to queued, with its stages back to pending, and resubmit it."""
+    stages = json.loads(job.stages or "{}")
+    job.stages = json.dumps({stage: "pending" for stage in stages})
+    job.status = JOB_QUEUED
+    job.error = None
+    job.result = None
+    await db.commit()
+    await db.refresh(job)
+
+    submit_jobs([job.id])
+    return job
+
+
+async def start_workers(num_workers: int = JOB_WORKERS):
+    """Start the worker pool and re-queue jobs left unfinished by a previous process."""
+    global _queue, _pace_lock, _next_start
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue()
+    _pace_lock = asyncio.Lock()
+    _next_start = 0.0
+
+    async with AsyncSessionLocal() as db:
+        pending = (await db.scalars(
+            select(Job)
+            .where(Job.status.in_([JOB_QUEUED, JOB_RUNNING]))
+            .order_by(Job.created_at)
+        )).all()
+        for job in pending:
+            job.status = JOB_QUEUED
+            _queue.put_nowait(job.id)
+        await db.commit()
+        if pending:
+            logger.info(f"Re-queued {len(pending)} unfinished jobs")
+
+    for i in range(max(1, num_workers)):
+        _workers.append(asyncio.create_task(_worker(i)))
+
+
+async def stop_workers():
+    """Cancel all workers. Jobs still in flight remain `running` and are re-queued on next start."""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _rate_limit_attempts.clear()
+    _queue = None
+
+
+async def _wait_for_start_slot():
+    """Block until pacing allows another job to start, then reserve the slot."""
+    global _next_start
+    loop = asyncio.get_running_loop()
+    async with _pace_lock:
+        # A rate-limit cool-down may push _next_start back while we sleep
+        while (delay := _next_start - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        _next_start = loop.time() + JOB_START_INTERVAL_SECONDS
+
+
+def _back_off(job_id: str) -> bool:
+    """
+    Pause job starts after Gemini was unavailable and re-queue the job later.
+    
+    Returns False once the job has used up its retries.
+    """
+    global _next_start
+    attempts = _rate_limit_attempts.get(job_id, 0) + 1
+    if attempts > JOB_RATE_LIMIT_RETRIES or _queue is None:
+        _rate_limit_attempts.pop(job_id, None)
+        logger.error(f"Job {job_id} still cannot reach Gemini after {JOB_RATE_LIMIT_RETRIES} retries")
+        return False
+    _rate_limit_attempts[job_id] = attempts
+
+    loop = asyncio.get_running_loop()
+    cooldown = JOB_RATE_LIMIT_COOLDOWN_SECONDS * attempts
+    _next_start = max(_next_start, loop.time() + cooldown)
+    loop.call_later(cooldown, _queue.put_nowait, job_id)
+    logger.warning(f"Job {job_id} could not reach Gemini; retrying in {cooldown:g}s")
+    return True
+
+
+async def _worker(index: int):
+    queue = _queue
+    while True:
+        job_id = await queue.get()
+        try:
+            await _wait_for_start_slot()
+            await _run_job(job_id)
+        except Exception:
+            logger.exception(f"Worker {index} crashed while running job {job_id}")
+        finally:
+            queue.task_done()
+
+
+async def _run_job(job_id: str):
+    # Async session: a sync commit waiting on the SQLite write lock would
+    # block the event loop, including the request currently holding the lock
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None or job.status not in (JOB_QUEUED, JOB_RUNNING):
+            return
+
+        job.status = JOB_RUNNING
+        await db.commit()
+        kind = job.kind
+
+        # Parallel pipeline stages report concurrently; a session allows one operation at a time
+        progress_lock = asyncio.Lock()
+
+        async def progress(stage: str, status: str):
+            async with progress_lock:
+                stages = json.loads(job.stages or "{}")
+                stages[stage] = status
+                job.stages = json.dumps(stages)
+                await db.commit()
+
+        try:
+            with JOBS_RUNNING.track(kind=kind), JOB_SECONDS.time(kind=kind):
+                result = await JOB_HANDLERS[kind](db, job, progress)
+        except Exception as e:
+            # Log before rollback, which expires the job's loaded attributes
+            if not is_upstream_unavailable(e):
+                logger.exception(f"Job {job_id} ({kind}) failed")
+            await db.rollback()
+            if is_upstream_unavailable(e) and _back_off(job_id):
+                JOBS.inc(kind=kind, status="requeued")
+                job.status = JOB_QUEUED
+                job.error = repr(e)
+                await db.commit()
+                return
+            JOBS.inc(kind=kind, status=JOB_FAILED)
+            job.status = JOB_FAILED
+            job.error = repr(e)
+            await db.commit()
+            return
+
+        _rate_limit_attempts.pop(job_id, None)
+        JOBS.inc(kind=kind, status=JOB_DONE)
+        job.error = None
+        job.result = json.dumps(result or {})
+        job.status = JOB_DONE
+        await db.commit()
+
+
+async def _get_story(db: AsyncSession, job: Job) -> Story:
+    story = await db.get(Story, job.story_id)
+    if story is None:
+        raise ValueError(f"Story {job.story_id} not found")
+    return story
+
+
+@job_handler("create_story")
+async def run_create_story(db: AsyncSession, job: Job, progress: ProgressCallback) -> Dict[str, Any]:
+    story = await _get_story(db, job)
+    photos = (await db.execute(
+        select(Photo.id, Photo.file_path).where(Photo.story_id == story.id).order_by(Photo.id)
+    )).all()
+
+    result = await generate_story_content(
+        story.title, story.person, story.emotion, story.notes, [photo.file_path for photo in photos],
+        progress=progress
+    )
+    speech_output = result["speech"]
+    story.generated_speech = speech_output.transcript
+    story.generated_voice_direction = speech_output.emotion
+    story.audio_file_path = result["audio_file_path"]
+    album = result["album"]
+    page = album_page_from_layout(album, [photo.id for photo in photos]) if album else None
+    # Replacing an album flushes the delete early, so hold the commit lock from there to the commit
+    async with db.write_transaction():
+        await db.run_sync(set_story_album, story.id, page)
+        await db.commit()
+
+    if result["audio_file_path"]:
+        # Now referenced; brings the file back if it was reused and released before the commit
+        await generate_speech_audio(speech_output.transcript, voice_direction=speech_output.emotion)
+
+    return {"story_id": story.id}
+
+
+@job_handler("regenerate_transcript")
+async def run_regenerate_transcript(db: AsyncSession, job: Job, progress: ProgressCallback) -> Dict[str, Any]:
+    story = await _get_story(db, job)
+
+    await progress("speech", "running")
+    # Regenerating means the user wants a new sample, not the cached one
+    speech_output = await generate_speech(
+        story.title, story.person, story.emotion, story.notes, bypass_cache=True
+    )
+    await progress("speech", "done")
+
+    story.generated_speech = speech_output.transcript
+    story.generated_voice_direction = speech_output.emotion
+    await db.commit()
+
+    return {
+        "generated_speech": speech_output.transcript,
+        "generated_voice_direction": speech_output.emotion
+    }
+
+
+@job_handler("regenerate_audio")
+async def run_regenerate_audio(db: AsyncSession, job: Job, progress: ProgressCallback) -> Dict[str, Any]:
+    story = await _get_story(db, job)
+    text_to_use = json.loads(job.params or "{}").get("speech_text")
+    old_audio_path = story.audio_file_path
+
+    await progress("audio", "running")
+    audio_path = await generate_speech_audio(text_to_use, voice_direction=story.generated_voice_direction)
+    await progress("audio", "done")
+
+    story.audio_file_path = audio_path
+    await db.commit()
+
+    if audio_path:
+        # Now referenced; brings the file back if it was reused and released before the commit
+        await generate_speech_audio(text_to_use, voice_direction=story.generated_voice_direction)
+
+    # Drop the previous file only if no other story still uses it
+    if old_audio_path and old_audio_path != audio_path:
+        async with speech_audio_lock(old_audio_path):
+            await db.run_sync(release_audio_file, old_audio_path)
+
+    return {"audio_file_path": audio_path}
@@ -0,0 +1,201 @@
+"""
+Content-addressed cache for LLM responses.
+
+Responses are keyed on a SHA-256 of everything that determines the model
+output: model name, system instruction, rendered contents (with images
+reduced to their content-addressed file name, or a digest of the file) and
+the generation config. Entries
+live in a small in-memory LRU tier backed by an on-disk SQLite tier, both
+bounded in size and expired after a TTL.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from .media import content_digest
+
+logger = logging.getLogger("backend.llm_cache")
+
+
+def _stable_value(value: Any) -> Any:
+    """Convert request parts into a JSON-serialisable, deterministic form."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return {"bytes_sha256": hashlib.sha256(value).hexdigest()}
+    if isinstance(value, Mapping):
+        return {str(k): _stable_value(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_stable_value(v) for v in value]
+    if isinstance(value, BaseModel):
+        return _stable_value(value.model_dump(mode="json", exclude_none=True))
+    if hasattr(value, "tobytes") and hasattr(value, "size") and hasattr(value, "mode"):
+        # PIL.Image; size and mode also tell apart variants re-made with other settings
+        return {**_image_identity(value), "size": list(value.size), "mode": value.mode}
+    return repr(value)
+
+
+def _image_identity(image: Any) -> Dict[str, str]:
+    """Identify an image by its file rather than by hashing its decoded pixels."""
+    path = getattr(image, "filename", None)
+    if not path:
+        # Built in memory
+        return {"image_sha256": hashlib.sha256(image.tobytes()).hexdigest()}
+    file_name = os.path.basename(path)
+    if content_digest(file_name):
+        # Uploads and their variants are named by the SHA-256 of the original upload
+        return {"image_file": file_name}
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return {"file_sha256": digest.hexdigest()}
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def canonical_config(config: Mapping[str, Any]) -> str:
+    """Deterministic JSON of a generation config; compute it once per config and pass it to `make_cache_key`."""
+    return _canonical_json(_stable_value(config))
+
+
+def make_cache_key(
+    model: str,
+    system_instruction: Optional[str],
+    contents: Any,
+    config: Union[Mapping[str, Any], str]
+) -> str:
+    """Hash the inputs of a generate_content call into a cache key; `config` may be its `canonical_config`."""
+    config_json = config if isinstance(config, str) else canonical_config(config)
+    # The canonical JSON of {model, system_instruction, contents, config}, keys in sorted order
+    encoded = (
+        f'{{"config":{config_json},"contents":{_canonical_json(_stable_value(contents))},'
+        f'"model":{_canonical_json(model)},"system_instruction":{_canonical_json(system_instruction)}}}'
+    ).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LlmCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of LLM response text.
+
+    Disk access runs in a worker thread so cache lookups never block the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = "llm_cache.db",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 5000
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file for the disk tier (None disables the disk tier)
+            ttl_seconds: Age after which entries are treated as missing
+            max_memory_entries: Capacity of the in-memory LRU tier
+            max_disk_entries: Capacity of the disk tier (oldest entries evicted first)
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "bypasses": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_created_at ON llm_cache (created_at)")
+            self._conn.commit()
+        return self._conn
+
+    def _expired(self, created_at: float) -> bool:
+        return time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: str):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT created_at, value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def _disk_set(self, key: str, created_at: float, value: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, created_at)
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+            conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response text for `key`, or None."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            created_at, value = entry
+            if not self._expired(created_at):
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        if self.path:
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row is not None and not self._expired(row[0]):
+                self._remember(key, row[0], row[1])
+                self.stats["disk_hits"] += 1
+                return row[1]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """Store response text under `key` in both tiers."""
+        created_at = time.time()
+        self._remember(key, created_at, value)
+        if self.path:
+            await asyncio.to_thread(self._disk_set, key, created_at, value)
+        self.stats["writes"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current memory tier size."""
+        return {**self.stats, "memory_entries": len(self._memory)}
@@ -0,0 +1,170 @@
+"""
+Logging setup: level, text or JSON records, and a non-blocking handler.
+
+`configure_logging()` installs a QueueHandler on the root logger; a
+QueueListener thread formats records and writes them to stderr, so a slow
+terminal or log collector never stalls the event loop. Fields passed with
+`extra=` are kept as structured data: top-level keys in JSON records,
+`key=value` pairs in text records.
+
+Prompts and responses are never dumped in full. `payload_summary` reduces
+them to their length, a short hash and a truncated preview, computed by
+the listener thread when the record is formatted. Verbose records are only
+built when `verbose_enabled` says so (DEBUG enabled and the record picked
+by LOG_VERBOSE_SAMPLE_RATE), so the logging cost on the request path does
+not grow with prompt size.
+
+Settings: LOG_LEVEL (default INFO), LOG_FORMAT (`text` or `json`),
+LOG_PAYLOAD_PREVIEW_CHARS (default 200), LOG_VERBOSE_SAMPLE_RATE (0-1,
+default 1).
+"""
+
+import atexit
+import copy
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+try:
+    # Optional dependency; the standard json module is used without it
+    import orjson
+except ImportError:
+    orjson = None
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_PAYLOAD_PREVIEW_CHARS = int(os.getenv("LOG_PAYLOAD_PREVIEW_CHARS", "200"))
+LOG_VERBOSE_SAMPLE_RATE = float(os.getenv("LOG_VERBOSE_SAMPLE_RATE", "1"))
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """The structured fields attached to a record with `extra=`."""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class PayloadSummary:
+    """Length, short SHA-256 and truncated preview of a text, worked out only when formatted."""
+    __slots__ = ("text", "preview_chars")
+
+    def __init__(self, text: str, preview_chars: int = LOG_PAYLOAD_PREVIEW_CHARS):
+        self.text = text
+        self.preview_chars = preview_chars
+
+    def as_dict(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "chars": len(self.text),
+            "sha256": hashlib.sha256(self.text.encode("utf-8", "replace")).hexdigest()[:16],
+            "preview": self.text[:self.preview_chars],
+        }
+        if len(self.text) > self.preview_chars:
+            summary["truncated"] = True
+        return summary
+
+    def __str__(self) -> str:
+        return _dumps(self.as_dict())
+
+
+def payload_summary(text: Optional[str]) -> Optional[PayloadSummary]:
+    """Summary of a prompt or response for a log record (None stays None)."""
+    return None if text is None else PayloadSummary(text)
+
+
+def verbose_enabled(logger: logging.Logger) -> bool:
+    """Whether to build a verbose DEBUG record: DEBUG is on and this record is sampled."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    return LOG_VERBOSE_SAMPLE_RATE >= 1 or random.random() < LOG_VERBOSE_SAMPLE_RATE
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, PayloadSummary):
+        return value.as_dict()
+    return str(value)
+
+
+def _dumps(data: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default).decode()
+    return json.dumps(data, default=_json_default, ensure_ascii=False)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields and exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        data.update(record_fields(record))
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return _dumps(data)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, followed by any extra fields as key=value."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = record_fields(record)
+        if not fields:
+            return text
+        pairs = (f"{key}={_dumps(value) if isinstance(value, (dict, list)) else value}" for key, value in fields.items())
+        return f"{text} {' '.join(pairs)}"
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener with args merged, keeping the traceback apart from the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks cannot cross the queue; render them here
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT):
+    """Route all records through a queue to a stderr handler with the chosen format."""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    # Write out whatever is still queued when the process exits
+    atexit.register(_listener.stop)
@@ -1,22 +1,71 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from .database import engine, Base
-from .routers import stories
-import os
+from contextlib import asynccontextmanager
+from .database import engine, async_engine
+from .migrations import run_migrations
+from .routers import stories, jobs as jobs_router
+from . import jobs, images
+from .uploads import MAX_UPLOAD_REQUEST_BYTES
+from .bulk_import import MAX_BULK_IMPORT_BYTES, MAX_MANIFEST_BYTES
+from .agents import MEDIA_DIR, llm_cache, preload, reload_agent_instructions
+from .media import MediaFiles
+from .compression import CompressionMiddleware
+from . import metrics
+from .logs import configure_logging
+import asyncio
 import logging
+import os
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s'
-)
+# LOG_LEVEL / LOG_FORMAT; records are written by a background thread
+configure_logging()
+logger = logging.getLogger("backend.main")
+
+# Import the Gemini SDK, create the client and build the LLM agents on a worker
+# thread at startup, instead of on the event loop in the first generation request
+STARTUP_PRELOAD = os.getenv("STARTUP_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+def _log_preload_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Startup preload failed; the client and agents are created on first use", exc_info=task.exception())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    # Bring the database schema up to date
+    run_migrations(engine)
+    # Not awaited, so the server accepts requests while the SDK loads
+    warmup = asyncio.create_task(asyncio.to_thread(preload)) if STARTUP_PRELOAD else None
+    if warmup is not None:
+        warmup.add_done_callback(_log_preload_failure)
+    # Background workers for story generation jobs
+    await jobs.start_workers()
+    yield
+    if warmup is not None:
+        await asyncio.wait([warmup])
+    await jobs.stop_workers()
+    images.shutdown_executor()
+    # aiosqlite runs each pooled connection on its own thread
+    await async_engine.dispose()
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+app = FastAPI(title="Valedictory Storytelling App", lifespan=lifespan)
 
-app = FastAPI(title="Valedictory Storytelling App")
+# Compress JSON responses; media, audio and SSE streams pass through.
+# Added first so it sits innermost and sees whole response bodies (the
+# http middleware below re-streams them, which would defeat the size threshold)
+app.add_middleware(CompressionMiddleware)
+
+# Reject oversized uploads before the multipart body is read
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    max_bytes = MAX_UPLOAD_REQUEST_BYTES
+    if request.url.path == "/api/stories/bulk":
+        max_bytes = MAX_BULK_IMPORT_BYTES + MAX_MANIFEST_BYTES
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
 
 # CORS
 app.add_middleware(
@@ -25,14 +74,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[stories.NEXT_CURSOR_HEADER, "ETag"],
 )
-
-# Mount media directory
-os.makedirs("media", exist_ok=True)
-app.mount("/media", StaticFiles(directory="media"), name="media")
+# Outermost, so request latency includes every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+# Mount media directory (created in lifespan)
+app.mount("/media", MediaFiles(directory=MEDIA_DIR, check_dir=False), name="media")
 
 # Include routers
 app.include_router(stories.router, prefix="/api")
+app.include_router(jobs_router.router, prefix="/api")
 
 @app.get("/")
 def read_root():
@@ -51,3 +102,24 @@ def verify_password(request: PasswordRequest):
         return {"success": True}
     else:
         return {"success": False, "message": "Incorrect password"}
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # Formatted only here, when scraped
+    if not metrics.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Metrics are disabled"})
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.post("/api/agents/reload")
+def reload_agents():
+    # Pick up edited system instructions (AGENT_INSTRUCTIONS_DIR) without a restart
+    try:
+        return {"agents": reload_agent_instructions()}
+    except OSError as e:
+        return JSONResponse(status_code=500, content={"detail": f"Could not read instructions: {e}"})
+
+@app.get("/api/llm-cache/stats")
+def read_llm_cache_stats():
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.get_stats()}
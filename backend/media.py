@@ -0,0 +1,145 @@
+"""
+Static serving of the media directory.
+
+Uploads and their variants are named after a hash of their content (see
+uploads.py), so a URL never changes meaning. `MediaFiles` serves those
+with `Cache-Control: immutable` and an ETag derived from the name, letting
+browsers skip the request entirely on repeat visits. TTS audio is named
+after a hash of the synthesis inputs, not of the bytes written (see
+audio_store.py), so it is revalidated like any other file, with an ETag
+from its size and modification time. Byte ranges for audio seeking come
+from Starlette's FileResponse.
+
+Compressible files (uncompressed WAV audio) get pre-generated `.gz` and,
+when the optional `brotli` package is installed, `.br` siblings, which are
+served to clients that accept them. Range requests always get the
+identity encoding so seeking offsets stay valid.
+
+Photos and audio files are shared between rows and reference-counted by
+the rows pointing at them; `referenced_paths` is the bulk check both
+stores use before deleting files.
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+from typing import Iterable, Optional, Set
+
+from sqlalchemy.orm import InstrumentedAttribute, Session
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .compression import accepts_encoding
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# <sha>.<ext>, <sha>.model.jpg, <sha>.thumb.webp (not tts-<sha>.<ext>, which hashes the request)
+CONTENT_ADDRESSED_NAME = re.compile(r"^(?P<digest>[0-9a-f]{32})(?:\.[a-z]+)*\.[a-z0-9]+$")
+
+PRECOMPRESSED_EXTENSIONS = {"wav"}
+# Encodings in order of preference: (Accept-Encoding token, file suffix)
+PRECOMPRESSED_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+# Keep a compressed sibling only if it is at least this much smaller
+MIN_COMPRESSION_SAVING = 0.05
+# Paths per IN (...) query when checking references in bulk
+REFERENCE_QUERY_CHUNK = 500
+
+
+def content_digest(file_name: str) -> Optional[str]:
+    """The content hash embedded in a media file name, or None for other names."""
+    match = CONTENT_ADDRESSED_NAME.match(file_name)
+    return match.group("digest") if match else None
+
+
+def referenced_paths(db: Session, column: InstrumentedAttribute, file_paths: Iterable[str]) -> Set[str]:
+    """The subset of `file_paths` that some row still points at through `column`, e.g. Photo.file_path."""
+    file_paths = list(file_paths)
+    referenced = set()
+    for start in range(0, len(file_paths), REFERENCE_QUERY_CHUNK):
+        chunk = file_paths[start:start + REFERENCE_QUERY_CHUNK]
+        referenced.update(path for (path,) in db.query(column).filter(column.in_(chunk)).distinct())
+    return referenced
+
+
+def _compress_brotli(data: bytes) -> Optional[bytes]:
+    try:
+        # Optional dependency; gzip alone is used without it
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=9)
+
+
+def precompress(file_path: str):
+    """Write .gz / .br siblings of a compressible media file, where they pay off."""
+    if file_path.rsplit(".", 1)[-1].lower() not in PRECOMPRESSED_EXTENSIONS:
+        return
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    for suffix, compress in ((".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0)), (".br", _compress_brotli)):
+        compressed = compress(data)
+        if compressed is None or len(compressed) > len(data) * (1 - MIN_COMPRESSION_SAVING):
+            continue
+        tmp_path = f"{file_path}{suffix}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, file_path + suffix)
+
+
+def remove_precompressed(file_path: str):
+    """Delete any precompressed siblings of `file_path`."""
+    for _, suffix in PRECOMPRESSED_ENCODINGS:
+        if os.path.exists(file_path + suffix):
+            os.remove(file_path + suffix)
+
+
+class MediaFiles(StaticFiles):
+    """StaticFiles with immutable caching, name-based ETags and precompressed variants."""
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        file_name = os.path.basename(full_path)
+        digest = content_digest(file_name)
+        compressible = file_name.rsplit(".", 1)[-1].lower() in PRECOMPRESSED_EXTENSIONS
+
+        headers = {
+            "cache-control": IMMUTABLE_CACHE_CONTROL if digest else REVALIDATE_CACHE_CONTROL
+        }
+        if compressible:
+            headers["vary"] = "Accept-Encoding"
+
+        path, encoding = str(full_path), None
+        if compressible and status_code == 200 and "range" not in request_headers:
+            accept_encoding = request_headers.get("accept-encoding", "")
+            for token, suffix in PRECOMPRESSED_ENCODINGS:
+                if accepts_encoding(accept_encoding, token) and os.path.exists(path + suffix):
+                    path, encoding = path + suffix, token
+                    stat_result = os.stat(path)
+                    headers["content-encoding"] = token
+                    break
+
+        if digest:
+            # Strong validator per representation; the name already pins the content
+            headers["etag"] = f'"{digest}-{stat_result.st_size}{"-" + encoding if encoding else ""}"'
+
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+            stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,317 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters, gauges and histograms are plain dictionaries of numbers updated
+under a lock; nothing is formatted until `/metrics` is scraped, so
+recording costs a dictionary update per observation. `span(stage)` times
+one step of the generation pipeline (agent runs, TTS, image loads, upload
+writes, DB commits) into `pipeline_stage_duration_seconds`.
+
+Set METRICS_ENABLED=false to turn recording and the endpoint off.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond commits up to multi-minute TTS
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelValues = Tuple[str, ...]
+
+_registry: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, names, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield "", values, self.labelnames, value
+
+
+class Gauge(Metric):
+    """A value that goes up and down; `callback` gauges are read at scrape time."""
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def inc(self, amount: float = 1, **labels: str):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str):
+        """Count the enclosed block as in flight."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        if self.callback is not None:
+            yield "", (), (), self.callback()
+            return
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield "", values, self.labelnames, value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)..., sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(values, list(counts)) for values, counts in self._values.items()]
+        bucket_names = self.labelnames + ("le",)
+        for values, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", values + (_format_value(bound),), bucket_names, cumulative
+            yield "_sum", values, self.labelnames, counts[-1]
+            yield "_count", values, self.labelnames, cumulative
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# HTTP -------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is sent.", ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled.")
+
+# Pipeline ---------------------------------------------------------------
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Duration of generation pipeline steps (agents, TTS, image loads, upload writes, DB commits).",
+    ("stage",)
+)
+STAGE_ERRORS = Counter("pipeline_stage_errors_total", "Pipeline steps that raised.", ("stage",))
+STAGE_IN_FLIGHT = Gauge("pipeline_stage_in_flight", "Pipeline steps currently running.", ("stage",))
+
+
+@contextmanager
+def span(stage: str):
+    """Time one pipeline step; usable around sync and async code alike."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+
+
+# Gemini -----------------------------------------------------------------
+
+GEMINI_REQUESTS = Counter("gemini_requests_total", "Gemini calls by model and outcome.", ("model", "outcome"))
+GEMINI_CALL_SECONDS = Histogram(
+    "gemini_call_duration_seconds", "Gemini call latency per attempt, excluding queueing.", ("model",)
+)
+GEMINI_IN_FLIGHT = Gauge("gemini_requests_in_flight", "Gemini calls holding a concurrency slot.", ("model",))
+GEMINI_TOKENS = Counter("gemini_tokens_total", "Tokens from Gemini usage metadata.", ("model", "type"))
+GEMINI_RESPONSE_BYTES = Counter(
+    "gemini_response_bytes_total", "Bytes of text and inline data received from Gemini.", ("model",)
+)
+
+
+def record_gemini_response(model: str, response):
+    """Count tokens (usage metadata) and payload bytes of one Gemini response or stream chunk."""
+    if not METRICS_ENABLED or response is None:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        for token_type, attribute in (("prompt", "prompt_token_count"), ("output", "candidates_token_count")):
+            count = getattr(usage, attribute, None)
+            if count:
+                GEMINI_TOKENS.inc(count, model=model, type=token_type)
+    size = 0
+    for candidate in getattr(response, "candidates", None) or []:
+        for part in (candidate.content.parts if candidate.content else None) or []:
+            if part.text:
+                size += len(part.text)
+            elif part.inline_data and part.inline_data.data:
+                size += len(part.inline_data.data)
+    if size:
+        GEMINI_RESPONSE_BYTES.inc(size, model=model)
+
+
+def gemini_outcome(exc: Optional[BaseException]) -> str:
+    """Outcome label: "ok", the HTTP status of an API error, or the exception class name."""
+    if exc is None:
+        return "ok"
+    code = getattr(exc, "code", None)
+    return str(code) if isinstance(code, int) else type(exc).__name__
+
+
+# Jobs -------------------------------------------------------------------
+
+JOBS = Counter("jobs_total", "Finished background jobs by kind and status.", ("kind", "status"))
+JOB_SECONDS = Histogram("job_duration_seconds", "Background job run time.", ("kind",))
+JOBS_RUNNING = Gauge("jobs_running", "Background jobs currently running.", ("kind",))
+
+
+def route_label(scope) -> str:
+    """
+    The matched route as a template, e.g. /api/stories/{story_id}, so label
+    cardinality stays bounded. Mounted apps (/media) are labelled with their
+    mount path and requests no route matched with "unmatched".
+    """
+    route = scope.get("route")
+    if route is None:
+        return scope.get("root_path") or "unmatched"
+    # FastAPI matches routers included with a prefix through a wrapper, so their
+    # route.path lacks the include prefix (/api); the effective route has the full template
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(context, "path", None) or route.path
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts, latency and in-flight requests per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route_path = route_label(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route_path)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route_path, status=status)
@@ -0,0 +1,145 @@
+"""
+Lightweight schema migrations for the SQLite database.
+
+The applied schema version is stored in SQLite's `PRAGMA user_version`.
+Each entry in MIGRATIONS upgrades the schema by one version and must be
+idempotent, because databases created before versioning start at 0 even
+though their tables already exist. To change the schema, append a new
+function; never edit one that has shipped.
+"""
+
+import json
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from .database import Base
+
+logger = logging.getLogger("backend.migrations")
+
+
+def _create_tables(conn: Connection):
+    """Create any missing tables (and their indexes) from the models."""
+    from . import models  # noqa: F401  (registers tables on Base.metadata)
+    Base.metadata.create_all(bind=conn)
+
+
+def _add_lookup_indexes(conn: Connection):
+    """Indexes for per-story photo lookups and presentation filters on pre-existing tables."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_photos_story_id ON photos (story_id)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_stories_used_in_presentation ON stories (used_in_presentation)"
+    ))
+
+
+def _add_job_batch_id(conn: Connection):
+    """Group jobs created by one bulk import."""
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(jobs)"))}
+    if "batch_id" not in columns:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN batch_id VARCHAR"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_batch_id ON jobs (batch_id)"))
+
+
+def _album_tables(conn: Connection):
+    """
+    Move album layouts from the stories.album_json text blob into album_pages /
+    album_photos rows, mapping 0-based image indices onto photo ids. The old
+    column is left in place (unused) so a downgrade does not lose data.
+    """
+    from .models import AlbumPage, AlbumPhoto
+    Base.metadata.create_all(bind=conn, tables=[AlbumPage.__table__, AlbumPhoto.__table__])
+
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(stories)"))}
+    if "album_json" not in columns:
+        return
+
+    rows = conn.execute(text("SELECT id, album_json FROM stories WHERE album_json IS NOT NULL")).all()
+    converted = 0
+    for story_id, album_json in rows:
+        try:
+            layout = json.loads(album_json)
+        except json.JSONDecodeError:
+            continue
+        # Failed generations were stored as {"error": ...}
+        if not isinstance(layout, dict) or "page_title" not in layout:
+            continue
+        if conn.execute(text("SELECT 1 FROM album_pages WHERE story_id = :id"), {"id": story_id}).first():
+            continue
+
+        photo_ids = [row[0] for row in conn.execute(
+            text("SELECT id FROM photos WHERE story_id = :id ORDER BY id"), {"id": story_id}
+        )]
+        page_id = conn.execute(
+            text(
+                "INSERT INTO album_pages (story_id, page_title, page_description) "
+                "VALUES (:story_id, :title, :description)"
+            ),
+            {
+                "story_id": story_id,
+                "title": str(layout.get("page_title") or ""),
+                "description": str(layout.get("page_description") or "")
+            }
+        ).lastrowid
+        converted += 1
+
+        position = 0
+        for entry in layout.get("photos") or []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get("photo_id"))
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= index < len(photo_ids):
+                continue
+            conn.execute(
+                text(
+                    "INSERT INTO album_photos (page_id, photo_id, position, role, caption) "
+                    "VALUES (:page_id, :photo_id, :position, :role, :caption)"
+                ),
+                {
+                    "page_id": page_id,
+                    "photo_id": photo_ids[index],
+                    "position": position,
+                    "role": str(entry.get("role") or "side"),
+                    "caption": str(entry.get("caption") or "")
+                }
+            )
+            position += 1
+
+    logger.info(f"Converted {converted} album layouts to album tables")
+
+
+def _story_revisions(conn: Connection):
+    """Revision counter for ETags and the change feed; existing stories start at revision 1."""
+    from .models import RevisionCounter, StoryRevision
+    Base.metadata.create_all(bind=conn, tables=[RevisionCounter.__table__, StoryRevision.__table__])
+    conn.execute(text("INSERT OR IGNORE INTO revision_counter (id, value) VALUES (1, 1)"))
+    conn.execute(text(
+        "INSERT OR IGNORE INTO story_revisions (story_id, revision, deleted) SELECT id, 1, 0 FROM stories"
+    ))
+
+
+MIGRATIONS = [
+    _create_tables,
+    _add_lookup_indexes,
+    _add_job_batch_id,
+    _album_tables,
+    _story_revisions,
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def run_migrations(engine: Engine):
+    """Apply all pending migrations in order, each in its own transaction."""
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
+
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with engine.begin() as conn:
+            migration(conn)
+            conn.execute(text(f"PRAGMA user_version = {target}"))
+        logger.info(f"Applied migration {target}: {migration.__name__}")
@@ -2,9 +2,11 @@ from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateT
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
-from pydantic import BaseModel
-from typing import List, Optional
+from .images import existing_variant_path
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
+import json
 
 # SQLAlchemy Models
 
@@ -19,22 +21,95 @@ class Story(Base):
     notes = Column(Text)
     generated_speech = Column(Text, nullable=True)
     generated_voice_direction = Column(Text, nullable=True)
-    album_json = Column(Text, nullable=True)
     audio_file_path = Column(String, nullable=True)
-    used_in_presentation = Column(Boolean, default=False)
+    used_in_presentation = Column(Boolean, default=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     photos = relationship("Photo", back_populates="story")
+    album = relationship("AlbumPage", back_populates="story", uselist=False, cascade="all, delete-orphan")
 
 class Photo(Base):
     __tablename__ = "photos"
 
     id = Column(Integer, primary_key=True, index=True)
-    story_id = Column(Integer, ForeignKey("stories.id"))
+    story_id = Column(Integer, ForeignKey("stories.id"), index=True)
     file_path = Column(String)
 
     story = relationship("Story", back_populates="photos")
+    # Layout entries showing this photo go with it
+    album_entries = relationship("AlbumPhoto", back_populates="photo", cascade="all, delete-orphan")
+
+    @property
+    def model_path(self):
+        return existing_variant_path(self.file_path, "model")
+
+    @property
+    def thumbnail_path(self):
+        return existing_variant_path(self.file_path, "thumb")
+
+class AlbumPage(Base):
+    """Generated album page of a story (at most one per story)."""
+    __tablename__ = "album_pages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    story_id = Column(Integer, ForeignKey("stories.id"), unique=True, index=True)
+    page_title = Column(String)
+    page_description = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    story = relationship("Story", back_populates="album")
+    photos = relationship(
+        "AlbumPhoto", back_populates="page", order_by="AlbumPhoto.position", cascade="all, delete-orphan"
+    )
+
+class AlbumPhoto(Base):
+    """Placement of one of the story's photos on its album page."""
+    __tablename__ = "album_photos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    page_id = Column(Integer, ForeignKey("album_pages.id"), index=True)
+    photo_id = Column(Integer, ForeignKey("photos.id"), index=True)
+    position = Column(Integer, default=0)
+    role = Column(String)  # main | side | background
+    caption = Column(Text)
+
+    page = relationship("AlbumPage", back_populates="photos")
+    photo = relationship("Photo", back_populates="album_entries")
+
+class StoryRevision(Base):
+    """
+    Revision at which a story last changed. Rows of deleted stories stay
+    behind as tombstones so the change feed can report the deletion.
+    """
+    __tablename__ = "story_revisions"
+
+    story_id = Column(Integer, primary_key=True)
+    revision = Column(Integer, index=True)
+    deleted = Column(Boolean, default=False)
+
+class RevisionCounter(Base):
+    """Single-row table holding the global, monotonic story revision."""
+    __tablename__ = "revision_counter"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    kind = Column(String)
+    story_id = Column(Integer, index=True, nullable=True)
+    batch_id = Column(String, index=True, nullable=True)  # Bulk import the job belongs to
+    status = Column(String, default="queued", index=True)
+    stages = Column(Text, nullable=True)  # JSON: {stage_name: pending|running|done}
+    params = Column(Text, nullable=True)  # JSON: handler-specific input
+    result = Column(Text, nullable=True)  # JSON: handler-specific output
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 # Pydantic Schemas
 
@@ -44,6 +119,8 @@ class PhotoBase(BaseModel):
 class PhotoRead(PhotoBase):
     id: int
     story_id: int
+    model_path: Optional[str] = None
+    thumbnail_path: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -58,11 +135,76 @@ class StoryBase(BaseModel):
 class StoryCreate(StoryBase):
     pass
 
+class BulkImportRow(StoryCreate):
+    """One manifest entry of a bulk import; `photos` are file names inside the zip."""
+    photos: List[str] = []
+
+class BulkImportItem(BaseModel):
+    index: int
+    title: Optional[str] = None
+    status: str  # queued | invalid
+    story_id: Optional[int] = None
+    job_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkImportRead(BaseModel):
+    batch_id: str
+    items: List[BulkImportItem]
+
+AlbumRole = Literal["main", "side", "background"]
+
+class AlbumPhotoRead(BaseModel):
+    id: int
+    photo_id: int  # Photo.id
+    role: str
+    caption: str
+
+    class Config:
+        from_attributes = True
+
+class AlbumRead(BaseModel):
+    page_title: str
+    page_description: str
+    photos: List[AlbumPhotoRead] = []
+
+    class Config:
+        from_attributes = True
+
+def _reject_null(value):
+    # Omit a field to leave it unchanged; null would store a value AlbumRead cannot serialize
+    if value is None:
+        raise ValueError("must not be null")
+    return value
+
+class AlbumUpdate(BaseModel):
+    page_title: Optional[str] = None
+    page_description: Optional[str] = None
+
+    _not_null = field_validator("page_title", "page_description")(_reject_null)
+
+class AlbumPhotoUpdate(BaseModel):
+    role: Optional[AlbumRole] = None
+    caption: Optional[str] = None
+
+    _not_null = field_validator("role", "caption")(_reject_null)
+
+class StorySummary(BaseModel):
+    """Lightweight listing row without transcript, album layout or photos."""
+    id: int
+    title: str
+    person: str
+    emotion: str
+    used_in_presentation: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class StoryRead(StoryBase):
     id: int
     generated_speech: Optional[str] = None
     generated_voice_direction: Optional[str] = None
-    album_json: Optional[str] = None
+    album: Optional[AlbumRead] = None
     audio_file_path: Optional[str] = None
     used_in_presentation: bool
     created_at: datetime
@@ -70,3 +212,45 @@ class StoryRead(StoryBase):
 
     class Config:
         from_attributes = True
+
+# Ids per bulk mark/delete request
+MAX_BULK_IDS = 5000
+
+class BulkIds(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=MAX_BULK_IDS)
+
+class StoryChanges(BaseModel):
+    """Stories created or updated, and ids deleted, since a revision."""
+    revision: int
+    stories: List[StoryRead] = []
+    deleted: List[int] = []
+
+class StorySummaryChanges(BaseModel):
+    revision: int
+    stories: List[StorySummary] = []
+    deleted: List[int] = []
+
+class JobRead(BaseModel):
+    id: str
+    kind: str
+    story_id: Optional[int] = None
+    batch_id: Optional[str] = None
+    status: str
+    stages: Dict[str, str] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator("stages", "result", mode="before")
+    @classmethod
+    def parse_json_text(cls, value, info):
+        # Stored as JSON text in the jobs table
+        if isinstance(value, str):
+            return json.loads(value)
+        if value is None and info.field_name == "stages":
+            return {}
+        return value
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,351 @@
+"""
+Resilience layer for Gemini calls.
+
+Every model call made through `call_gemini` is
+  1. held back by a per-model token bucket (requests per minute),
+  2. bounded by the shared concurrency semaphore and a per-call timeout,
+  3. retried with exponential back-off and jitter on retryable errors
+     (429, 5xx, timeouts, connection failures), and
+  4. guarded by a per-model circuit breaker that fails fast with
+     CircuitOpenError while the upstream keeps failing (5xx, timeouts,
+     connection errors; a 429 means the upstream is up but throttling).
+
+Settings are read from the environment on first use, after agents.py has
+loaded backend/.env.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from .metrics import (
+    GEMINI_CALL_SECONDS,
+    GEMINI_IN_FLIGHT,
+    GEMINI_REQUESTS,
+    gemini_outcome,
+    record_gemini_response,
+)
+
+logger = logging.getLogger("backend.resilience")
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit breaker is open."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Circuit open for {model}; retry in {retry_after:.0f}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+def _api_error_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of a google.genai APIError, else None."""
+    # Looked up rather than imported: the SDK loads on first use, and until
+    # then nothing can have raised one of its errors
+    errors = sys.modules.get("google.genai.errors")
+    if errors is not None and isinstance(exc, errors.APIError):
+        return exc.code
+    return None
+
+
+def _is_transport_error(exc: BaseException) -> bool:
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(exc, httpx.TransportError)
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Errors worth retrying: rate limits, server errors, timeouts and dropped connections."""
+    code = _api_error_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, asyncio.TimeoutError) or _is_transport_error(exc)
+
+
+def is_upstream_unavailable(exc: BaseException) -> bool:
+    """Transient upstream failures that remain after retries (or an open circuit)."""
+    return isinstance(exc, CircuitOpenError) or is_retryable_error(exc)
+
+
+def _is_outage_error(exc: BaseException) -> bool:
+    return is_retryable_error(exc) and _api_error_code(exc) != 429
+
+
+def _parse_duration(value) -> Optional[float]:
+    # Protobuf JSON durations look like "37s" or "0.5s"
+    try:
+        return float(str(value).rstrip("s"))
+    except ValueError:
+        return None
+
+
+def server_retry_delay(exc: BaseException) -> Optional[float]:
+    """The retry delay Gemini suggests in a 429's RetryInfo detail, if any."""
+    details = getattr(exc, "details", None)
+    if not isinstance(details, dict):
+        return None
+    for detail in details.get("error", {}).get("details", []) or []:
+        if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("RetryInfo"):
+            return _parse_duration(detail.get("retryDelay"))
+    return None
+
+
+class TokenBucket:
+    """Async token bucket; `rate_per_minute <= 0` disables limiting."""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        # Default burst: one second's worth of requests, at least one
+        self.capacity = float(burst or max(1, int(rate_per_minute // 60)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # Waiters are served in order; the lock is held while sleeping for a token
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`; then lets a single trial call through (half-open) and
+    closes again if it succeeds.
+    """
+
+    def __init__(self, model: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        retry_after = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(self.model, retry_after)
+
+    def release_trial(self):
+        """Forget an abandoned (cancelled) half-open trial so another can run."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.model} closed")
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._trial_in_flight:
+                logger.warning(f"Circuit for {self.model} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class ResiliencePolicy:
+    """Per-model limiters and breakers plus the retry/timeout settings."""
+
+    def __init__(
+        self,
+        default_rpm: float = 0,
+        model_rpm: Optional[Dict[str, float]] = None,
+        timeout_seconds: float = 120.0,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0
+    ):
+        self.default_rpm = default_rpm
+        self.model_rpm = model_rpm or {}
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResiliencePolicy":
+        # GEMINI_RATE_LIMITS="gemini-2.5-flash-lite=60,gemini-2.5-flash-preview-tts=10"
+        model_rpm = {}
+        for item in os.getenv("GEMINI_RATE_LIMITS", "").split(","):
+            if "=" in item:
+                model, rpm = item.split("=", 1)
+                model_rpm[model.strip()] = float(rpm)
+        return cls(
+            default_rpm=float(os.getenv("GEMINI_DEFAULT_RPM", "0")),
+            model_rpm=model_rpm,
+            timeout_seconds=float(os.getenv("GEMINI_TIMEOUT_SECONDS", "120")),
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "3")),
+            base_delay=float(os.getenv("GEMINI_RETRY_BASE_DELAY_SECONDS", "1")),
+            max_delay=float(os.getenv("GEMINI_RETRY_MAX_DELAY_SECONDS", "30")),
+            failure_threshold=int(os.getenv("GEMINI_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_seconds=float(os.getenv("GEMINI_CIRCUIT_RESET_SECONDS", "30"))
+        )
+
+    def bucket(self, model: str) -> TokenBucket:
+        if model not in self._buckets:
+            self._buckets[model] = TokenBucket(self.model_rpm.get(model, self.default_rpm))
+        return self._buckets[model]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.reset_seconds)
+        return self._breakers[model]
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential back-off for the given retry attempt (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+_policy: Optional[ResiliencePolicy] = None
+
+
+def get_resilience_policy() -> ResiliencePolicy:
+    """Return the process-wide policy, built from the environment on first use."""
+    global _policy
+    if _policy is None:
+        _policy = ResiliencePolicy.from_env()
+    return _policy
+
+
+async def call_gemini(
+    model: str,
+    call: Callable[[], Awaitable[T]],
+    semaphore: asyncio.Semaphore,
+    policy: Optional[ResiliencePolicy] = None
+) -> T:
+    """
+    Run `call` (a fresh request per invocation) under the resilience policy.
+
+    Non-retryable errors propagate immediately. Retryable errors are retried
+    up to `max_retries` times, then re-raised.
+    """
+    policy = policy or get_resilience_policy()
+    breaker = policy.breaker(model)
+    bucket = policy.bucket(model)
+
+    attempt = 0
+    while True:
+        breaker.before_call()
+        await bucket.acquire()
+        try:
+            async with semaphore:
+                with GEMINI_IN_FLIGHT.track(model=model), GEMINI_CALL_SECONDS.time(model=model):
+                    result = await asyncio.wait_for(call(), timeout=policy.timeout_seconds)
+        except asyncio.CancelledError:
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            GEMINI_REQUESTS.inc(model=model, outcome=gemini_outcome(e))
+            if _is_outage_error(e):
+                breaker.record_failure()
+            else:
+                # The upstream answered; a bad request or a quota rejection says it is up
+                breaker.record_success()
+            if not is_retryable_error(e) or attempt >= policy.max_retries:
+                raise
+            delay = max(policy.backoff_delay(attempt), server_retry_delay(e) or 0)
+            attempt += 1
+            logger.warning(f"Retrying {model} in {delay:.1f}s (attempt {attempt}) after {e!r}")
+            await asyncio.sleep(delay)
+        else:
+            GEMINI_REQUESTS.inc(model=model, outcome="ok")
+            record_gemini_response(model, result)
+            breaker.record_success()
+            return result
+
+
+async def stream_gemini(
+    model: str,
+    open_stream: Callable[[], Awaitable[AsyncIterator[T]]],
+    semaphore: asyncio.Semaphore,
+    policy: Optional[ResiliencePolicy] = None
+) -> AsyncIterator[T]:
+    """
+    Streaming counterpart of `call_gemini`.
+
+    Opening the stream is retried like a regular call until the first chunk
+    has been yielded; after that a failure propagates, since the consumer
+    has already used part of the response. Each chunk must arrive within
+    the per-call timeout. The semaphore slot is held for the whole stream.
+    """
+    policy = policy or get_resilience_policy()
+    breaker = policy.breaker(model)
+    bucket = policy.bucket(model)
+
+    attempt = 0
+    while True:
+        breaker.before_call()
+        await bucket.acquire()
+        yielded = False
+        try:
+            # The in-flight gauge and call time cover the whole stream, like the semaphore slot
+            async with semaphore:
+                with GEMINI_IN_FLIGHT.track(model=model), GEMINI_CALL_SECONDS.time(model=model):
+                    stream = await asyncio.wait_for(open_stream(), timeout=policy.timeout_seconds)
+                    chunks = stream.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=policy.timeout_seconds)
+                        except StopAsyncIteration:
+                            break
+                        record_gemini_response(model, chunk)
+                        yielded = True
+                        yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            GEMINI_REQUESTS.inc(model=model, outcome=gemini_outcome(e))
+            if _is_outage_error(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if yielded or not is_retryable_error(e) or attempt >= policy.max_retries:
+                raise
+            delay = max(policy.backoff_delay(attempt), server_retry_delay(e) or 0)
+            attempt += 1
+            logger.warning(f"Retrying {model} stream in {delay:.1f}s (attempt {attempt}) after {e!r}")
+            await asyncio.sleep(delay)
+        else:
+            GEMINI_REQUESTS.inc(model=model, outcome="ok")
+            breaker.record_success()
+            return
@@ -0,0 +1,87 @@
+"""
+Fast JSON responses for large listings.
+
+`FastJSONResponse` renders with orjson when it is installed (falling back
+to the standard library), and `story_payload` builds the listing dicts
+straight from ORM rows, so list endpoints skip the per-row Pydantic
+validation that dominates serialization time for a few hundred stories.
+Album pages are fetched as plain rows by `album_payloads`, which is
+several times cheaper than materializing a page and its entries as ORM
+objects for every story.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import AlbumPage, AlbumPhoto, AlbumPhotoRead, AlbumRead, PhotoRead, Story, StoryRead, StorySummary
+
+try:
+    # Optional dependency; the standard json module is used without it
+    import orjson
+except ImportError:
+    orjson = None
+
+# Field lists come from the response schemas so the fast path cannot drift from them
+STORY_FIELDS = [name for name in StoryRead.model_fields if name not in ("photos", "album")]
+PHOTO_FIELDS = list(PhotoRead.model_fields)
+ALBUM_FIELDS = [name for name in AlbumRead.model_fields if name != "photos"]
+ALBUM_PHOTO_FIELDS = list(AlbumPhotoRead.model_fields)
+
+# Story ids per IN (...) query, like SQLAlchemy's selectinload batches
+ALBUM_QUERY_CHUNK = 500
+SUMMARY_FIELDS = list(StorySummary.model_fields)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serialized with orjson; datetimes become ISO 8601 strings."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def album_payloads(db: Session, story_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """`AlbumRead`-shaped dicts keyed by story id, for the stories that have an album."""
+    story_ids = list(story_ids)
+    albums: Dict[int, Dict[str, Any]] = {}
+    for start in range(0, len(story_ids), ALBUM_QUERY_CHUNK):
+        chunk = story_ids[start:start + ALBUM_QUERY_CHUNK]
+        pages = db.execute(
+            select(AlbumPage.story_id, *(getattr(AlbumPage, name) for name in ALBUM_FIELDS))
+            .where(AlbumPage.story_id.in_(chunk))
+        )
+        for story_id, *values in pages:
+            albums[story_id] = {**dict(zip(ALBUM_FIELDS, values)), "photos": []}
+
+        entries = db.execute(
+            select(AlbumPage.story_id, *(getattr(AlbumPhoto, name) for name in ALBUM_PHOTO_FIELDS))
+            .join(AlbumPhoto.page)
+            .where(AlbumPage.story_id.in_(chunk))
+            .order_by(AlbumPhoto.page_id, AlbumPhoto.position)
+        )
+        for story_id, *values in entries:
+            albums[story_id]["photos"].append(dict(zip(ALBUM_PHOTO_FIELDS, values)))
+    return albums
+
+
+def story_payload(story: Story, album: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """A `StoryRead`-shaped dict for a story with its photos loaded; `album` from `album_payloads`."""
+    payload = {name: getattr(story, name) for name in STORY_FIELDS}
+    payload["photos"] = [
+        {name: getattr(photo, name) for name in PHOTO_FIELDS} for photo in story.photos
+    ]
+    payload["album"] = album
+    return payload
+
+
+def summary_payloads(stories: List[Story]) -> List[Dict[str, Any]]:
+    """`StorySummary`-shaped dicts for summary rows."""
+    return [{name: getattr(story, name) for name in SUMMARY_FIELDS} for story in stories]
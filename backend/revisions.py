@@ -0,0 +1,104 @@
+"""
+Story revisions: a global, monotonic change counter.
+
+Every flush that touches a story, its photos or its album takes the next
+value of the counter and stamps it on each affected story in
+`story_revisions`. Listings use the current revision as their ETag, so
+an unchanged poll is answered with `304 Not Modified`, and
+`GET /api/stories/changes?since=<rev>` returns only the stories stamped
+after `rev`.
+
+Recording happens in an `after_flush` hook on all sessions (sync and
+async), registered when this module is imported. Set-based statements
+(`UPDATE`/`DELETE` without loading objects) bypass the hook and must call
+`record_story_changes` themselves.
+"""
+
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import AlbumPage, AlbumPhoto, Photo, RevisionCounter, Story, StoryRevision
+
+COUNTER_ID = 1
+
+
+def current_revision(db: Session) -> int:
+    """The latest committed revision (0 before the first change)."""
+    return db.scalar(select(RevisionCounter.value).where(RevisionCounter.id == COUNTER_ID)) or 0
+
+
+def revision_etag(revision: int) -> str:
+    # Weak: gzip/br/identity encodings of a listing are equivalent
+    return f'W/"rev-{revision}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def record_story_changes(
+    connection: Connection,
+    changed: Iterable[int] = (),
+    deleted: Iterable[int] = ()
+) -> Optional[int]:
+    """Stamp the given story ids with a new revision in the current transaction."""
+    rows = {story_id: False for story_id in changed if story_id is not None}
+    rows.update({story_id: True for story_id in deleted if story_id is not None})
+    if not rows:
+        return None
+
+    revision = connection.execute(
+        update(RevisionCounter)
+        .where(RevisionCounter.id == COUNTER_ID)
+        .values(value=RevisionCounter.value + 1)
+        .returning(RevisionCounter.value)
+    ).scalar_one()
+
+    stmt = sqlite_insert(StoryRevision)
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[StoryRevision.story_id],
+            set_={"revision": stmt.excluded.revision, "deleted": stmt.excluded.deleted}
+        ),
+        [{"story_id": story_id, "revision": revision, "deleted": is_deleted} for story_id, is_deleted in rows.items()]
+    )
+    return revision
+
+
+def _flushed_story_ids(session: Session) -> Tuple[set, set]:
+    changed, deleted, page_ids = set(), set(), set()
+    for obj in session.deleted:
+        if isinstance(obj, Story):
+            deleted.add(obj.id)
+        elif isinstance(obj, (Photo, AlbumPage)):
+            changed.add(obj.story_id)
+        elif isinstance(obj, AlbumPhoto):
+            page_ids.add(obj.page_id)
+    for obj in list(session.new) + [obj for obj in session.dirty if session.is_modified(obj)]:
+        if isinstance(obj, Story):
+            changed.add(obj.id)
+        elif isinstance(obj, (Photo, AlbumPage)):
+            changed.add(obj.story_id)
+        elif isinstance(obj, AlbumPhoto):
+            page_ids.add(obj.page_id)
+
+    if page_ids:
+        changed.update(session.connection().scalars(
+            select(AlbumPage.story_id).where(AlbumPage.id.in_(page_ids))
+        ))
+    return changed - deleted, deleted
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_changes(session: Session, flush_context):
+    changed, deleted = _flushed_story_ids(session)
+    if changed or deleted:
+        record_story_changes(session.connection(), changed, deleted)
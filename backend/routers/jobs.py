@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List
+import asyncio
+from ..database import get_db, get_async_db, AsyncSessionLocal
+from ..models import Job, JobRead
+from ..jobs import JOB_DONE, JOB_FAILED, retry_job
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"]
+)
+
+SSE_POLL_INTERVAL = 0.5
+
+@router.get("/", response_model=List[JobRead])
+def read_batch_jobs(batch_id: str, db: Session = Depends(get_db)):
+    # Per-item status of a bulk import
+    return db.query(Job).filter(Job.batch_id == batch_id).order_by(Job.story_id).all()
+
+@router.get("/{job_id}", response_model=JobRead)
+def read_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    if await db.get(Job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_payload = None
+        while True:
+            async with AsyncSessionLocal() as session:
+                job = await session.get(Job, job_id)
+                if job is None:
+                    return
+                payload = JobRead.model_validate(job).model_dump_json()
+                finished = job.status in (JOB_DONE, JOB_FAILED)
+
+            if payload != last_payload:
+                yield f"data: {payload}\n\n"
+                last_payload = payload
+            if finished:
+                return
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.post("/{job_id}/retry", response_model=JobRead, status_code=202)
+async def retry_failed_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JOB_FAILED:
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be retried (job is {job.status})")
+    return await retry_job(db, job)
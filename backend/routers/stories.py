@@ -1,12 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import shutil
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
+from typing import List, Optional, Union
+import asyncio
+import json
 import os
 import uuid
-from ..database import get_db
-from ..models import Story, Photo, StoryRead
-from ..agents import generate_speech, generate_album_layout, generate_speech_audio
+from ..database import get_db, get_async_db, AsyncSessionLocal
+from .. import agents
+from ..audio_encoding import wav_stream_header
+from ..resilience import is_upstream_unavailable
+from ..responses import FastJSONResponse, album_payloads, story_payload, summary_payloads
+from ..models import (
+    Story, Photo, AlbumPage, AlbumPhoto, StoryRead, StorySummary, JobRead, BulkImportItem, BulkImportRead,
+    AlbumRead, AlbumUpdate, AlbumPhotoRead, AlbumPhotoUpdate, StoryRevision, StoryChanges, StorySummaryChanges,
+    BulkIds
+)
+from ..bulk_ops import delete_photos, delete_stories, release_media_files, set_used_in_presentation
+from ..revisions import current_revision, etag_matches, revision_etag
+from ..jobs import CREATE_STORY_STAGES, enqueue_job, enqueue_story_job, new_job, submit_jobs
+from ..bulk_import import MAX_BULK_IMPORT_BYTES, MAX_MANIFEST_BYTES, extract_photos, parse_manifest, validate_entry
+from ..images import preprocess_images
+from ..uploads import UploadBudget, held_uploads, save_upload, release_photo_files, settle_uploads
 
 router = APIRouter(
     prefix="/stories",
@@ -14,75 +31,301 @@ router = APIRouter(
 )
 
 MEDIA_DIR = "media"
-os.makedirs(MEDIA_DIR, exist_ok=True)
 
-@router.post("/", response_model=StoryRead)
+MAX_PAGE_SIZE = 500
+# Columns behind StorySummary; transcripts and albums stay in the DB
+SUMMARY_COLUMNS = (
+    Story.id, Story.title, Story.person, Story.emotion,
+    Story.used_in_presentation, Story.created_at
+)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def paginate_stories(
+    query,
+    response: Response,
+    limit: Optional[int],
+    cursor: Optional[int],
+    used_in_presentation: Optional[bool],
+    person: Optional[str],
+    emotion: Optional[str]
+) -> List[Story]:
+    """
+    Apply listing filters and keyset pagination ordered by id.
+    
+    `cursor` is the last id of the previous page. When more rows remain, the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    if used_in_presentation is not None:
+        query = query.filter(Story.used_in_presentation == used_in_presentation)
+    if person is not None:
+        query = query.filter(Story.person == person)
+    if emotion is not None:
+        query = query.filter(Story.emotion == emotion)
+    if cursor is not None:
+        query = query.filter(Story.id > cursor)
+    query = query.order_by(Story.id)
+
+    if limit is None:
+        return query.all()
+
+    stories = query.limit(limit + 1).all()
+    if len(stories) > limit:
+        stories = stories[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(stories[-1].id)
+    return stories
+
+# Let clients keep responses but revalidate them (If-None-Match) on every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+def listing_response(payload: list, response: Response, etag: str) -> FastJSONResponse:
+    """Render a listing with orjson, keeping the pagination header set on `response`."""
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+    return FastJSONResponse(payload, headers=headers)
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already has the representation tagged `etag`."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL})
+    return None
+
+async def save_uploads(files: List[UploadFile], db: AsyncSession) -> List[str]:
+    """Stream all uploads of a request to media/, cleaning up if any limit is hit."""
+    budget = UploadBudget()
+    saved_paths = []
+    try:
+        for file in files:
+            saved_paths.append(await save_upload(file, budget))
+    except HTTPException:
+        settle_uploads(saved_paths)
+        await db.run_sync(release_photo_files, saved_paths)
+        raise
+    return saved_paths
+
+async def get_story_or_404(db: AsyncSession, story_id: int) -> Story:
+    story = await db.get(Story, story_id)
+    if story is None:
+        raise HTTPException(status_code=404, detail="Story not found")
+    return story
+
+@router.post("/", response_model=JobRead, status_code=202)
 async def create_story(
     title: str = Form(...),
     person: str = Form(...),
     emotion: str = Form(...),
     notes: str = Form(...),
     files: List[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # 1. Save Story Metadata
-    new_story = Story(
-        title=title,
-        person=person,
-        emotion=emotion,
-        notes=notes
-    )
-    db.add(new_story)
-    db.commit()
-    db.refresh(new_story)
+    # 1. Stream uploads to disk first so a rejected upload leaves no story row
+    saved_photo_paths = await save_uploads(files, db) if files else []
 
-    # 2. Save Photos
-    saved_photo_paths = []
-    if files:
-        for file in files:
-            # Generate unique filename
-            ext = file.filename.split(".")[-1]
-            filename = f"{uuid.uuid4()}.{ext}"
-            file_path = os.path.join(MEDIA_DIR, filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            photo = Photo(story_id=new_story.id, file_path=file_path)
-            db.add(photo)
-            saved_photo_paths.append(file_path)
-        db.commit()
-
-    # 3. Run Agents
-    # Speech
-    # Speech
-    speech_output = await generate_speech(title, person, emotion, notes)
-    new_story.generated_speech = speech_output.transcript
-    new_story.generated_voice_direction = speech_output.emotion
+    try:
+        with held_uploads(saved_photo_paths):
+            # Model-sized and thumbnail variants, built in the process pool before the job can start
+            if saved_photo_paths:
+                await preprocess_images(saved_photo_paths)
+
+            # 2. Save Story Metadata and Photos
+            new_story = Story(
+                title=title,
+                person=person,
+                emotion=emotion,
+                notes=notes
+            )
+            new_story.photos = [Photo(file_path=file_path) for file_path in saved_photo_paths]
+
+            # 3. Queue generation (speech -> audio in parallel with album layout) in the same transaction
+            return await enqueue_story_job(new_story, "create_story", stages=CREATE_STORY_STAGES)
+    except Exception:
+        await db.run_sync(release_photo_files, saved_photo_paths)
+        raise
+
+@router.post("/bulk", response_model=BulkImportRead, status_code=202)
+async def bulk_import_stories(
+    manifest: UploadFile = File(...),
+    photos: UploadFile = File(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Import many stories at once from a JSON/CSV manifest and a zip of photos.
     
-    # Generate audio from speech
-    audio_path = await generate_speech_audio(speech_output.transcript, voice_direction=speech_output.emotion)
-    new_story.audio_file_path = audio_path
+    Valid entries are inserted in one transaction and each gets its own
+    `create_story` job (sharing a batch id); invalid entries are reported
+    per item and nothing is stored for them.
+    """
+    manifest_data = await manifest.read(MAX_MANIFEST_BYTES + 1)
+    if len(manifest_data) > MAX_MANIFEST_BYTES:
+        raise HTTPException(status_code=413, detail=f"Manifest exceeds {MAX_MANIFEST_BYTES} bytes")
+    entries = parse_manifest(manifest.filename, manifest_data)
 
-    # Album
-    album_json = await generate_album_layout(title, person, emotion, notes, saved_photo_paths)
-    new_story.album_json = album_json
+    items: List[BulkImportItem] = []
+    rows = []
+    for index, entry in enumerate(entries):
+        row, error = validate_entry(entry)
+        title = entry.get("title") if isinstance(entry, dict) else None
+        if not isinstance(title, str):
+            # Echoed back as-is only when it is text; validate_entry reports the bad value
+            title = None
+        items.append(BulkImportItem(index=index, title=title, status="invalid", error=error))
+        rows.append(row)
 
-    db.commit()
-    db.refresh(new_story)
+    # Pull only the referenced photos out of the zip, off the event loop
+    wanted = list(dict.fromkeys(name for row in rows if row for name in row.photos))
+    photo_paths, photo_errors = {}, {}
+    if wanted and photos is not None:
+        if photos.size is not None and photos.size > MAX_BULK_IMPORT_BYTES:
+            raise HTTPException(status_code=413, detail=f"Photo zip exceeds {MAX_BULK_IMPORT_BYTES} bytes")
+        photo_paths, photo_errors = await asyncio.to_thread(extract_photos, photos.file, wanted)
+
+    accepted = []
+    for item, row in zip(items, rows):
+        if row is None:
+            continue
+        missing = [name for name in row.photos if name not in photo_paths]
+        if missing:
+            item.error = "; ".join(photo_errors.get(name, f"{name}: no photo zip uploaded") for name in missing)
+            continue
+        accepted.append((item, row))
+
+    batch_id = uuid.uuid4().hex
+    new_stories = []
+    new_jobs = []
+    try:
+        with held_uploads(photo_paths.values()):
+            # Flushing for story ids opens the write transaction early, so hold the commit lock throughout
+            async with db.write_transaction():
+                for _, row in accepted:
+                    story = Story(title=row.title, person=row.person, emotion=row.emotion, notes=row.notes)
+                    story.photos = [Photo(file_path=photo_paths[name]) for name in row.photos]
+                    db.add(story)
+                    new_stories.append(story)
+                await db.flush()
 
-    return new_story
+                for story in new_stories:
+                    new_jobs.append(new_job(
+                        "create_story",
+                        story_id=story.id,
+                        stages=CREATE_STORY_STAGES,
+                        batch_id=batch_id
+                    ))
+                db.add_all(new_jobs)
+                await db.commit()
+    except Exception:
+        await db.rollback()
+        await db.run_sync(release_photo_files, photo_paths.values())
+        raise
+
+    used_paths = {photo_paths[name] for _, row in accepted for name in row.photos}
+    # Photos extracted for entries that were then rejected
+    await db.run_sync(release_photo_files, set(photo_paths.values()) - used_paths)
+    if used_paths:
+        await preprocess_images(sorted(used_paths))
+
+    for (item, _), story, job in zip(accepted, new_stories, new_jobs):
+        item.status = "queued"
+        item.story_id = story.id
+        item.job_id = job.id
+    # Workers start them at the pace the job queue allows
+    submit_jobs(job.id for job in new_jobs)
+
+    return BulkImportRead(batch_id=batch_id, items=items)
 
 @router.get("/", response_model=List[StoryRead])
-def read_stories(db: Session = Depends(get_db)):
-    stories = db.query(Story).all()
-    return stories
+def read_stories(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    used_in_presentation: Optional[bool] = None,
+    person: Optional[str] = None,
+    emotion: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    # Read before the rows: a write in between gets a newer revision, so the
+    # next poll refetches rather than missing it
+    etag = revision_etag(current_revision(db))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    # Load all photos in one extra query instead of one per story
+    query = db.query(Story).options(selectinload(Story.photos))
+    stories = paginate_stories(query, response, limit, cursor, used_in_presentation, person, emotion)
+    albums = album_payloads(db, [story.id for story in stories])
+    # Skip response_model validation; the payload is built to the StoryRead schema
+    return listing_response([story_payload(story, albums.get(story.id)) for story in stories], response, etag)
+
+@router.get("/summaries", response_model=List[StorySummary])
+def read_story_summaries(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    used_in_presentation: Optional[bool] = None,
+    person: Optional[str] = None,
+    emotion: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    etag = revision_etag(current_revision(db))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    # Only select the summary columns
+    query = db.query(Story).options(load_only(*SUMMARY_COLUMNS))
+    stories = paginate_stories(query, response, limit, cursor, used_in_presentation, person, emotion)
+    return listing_response(summary_payloads(stories), response, etag)
+
+@router.get("/changes", response_model=Union[StoryChanges, StorySummaryChanges])
+def read_story_changes(
+    since: int = Query(0, ge=0),
+    summary: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Stories created or updated, and ids deleted, after revision `since`.
+
+    Pass the returned `revision` as `since` on the next call; `since=0`
+    returns every story. With `summary=true` stories are `StorySummary` rows.
+    """
+    # Read first: stories written meanwhile are returned again next time, never missed
+    revision = current_revision(db)
+    deleted = list(db.scalars(
+        select(StoryRevision.story_id)
+        .where(StoryRevision.revision > since, StoryRevision.deleted.is_(True))
+        .order_by(StoryRevision.story_id)
+    ))
+
+    query = (
+        db.query(Story)
+        .join(StoryRevision, StoryRevision.story_id == Story.id)
+        .filter(StoryRevision.revision > since)
+        .order_by(Story.id)
+    )
+    if summary:
+        payload = summary_payloads(query.options(load_only(*SUMMARY_COLUMNS)).all())
+    else:
+        stories = query.options(selectinload(Story.photos)).all()
+        albums = album_payloads(db, [story.id for story in stories])
+        payload = [story_payload(story, albums.get(story.id)) for story in stories]
+
+    return FastJSONResponse({"revision": revision, "stories": payload, "deleted": deleted})
 
 @router.get("/{story_id}", response_model=StoryRead)
-def read_story(story_id: int, db: Session = Depends(get_db)):
+def read_story(story_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    revision = db.scalar(
+        select(StoryRevision.revision)
+        .where(StoryRevision.story_id == story_id, StoryRevision.deleted.is_(False))
+    )
+    etag = revision_etag(revision or 0)
+    if revision is not None and (cached := not_modified(request, etag)) is not None:
+        return cached
+
     story = db.query(Story).filter(Story.id == story_id).first()
     if story is None:
         raise HTTPException(status_code=404, detail="Story not found")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
     return story
 
 @router.put("/{story_id}", response_model=StoryRead)
@@ -92,13 +335,46 @@ def update_story(story_id: int, story_update: dict, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Story not found")
     
     for key, value in story_update.items():
-        if hasattr(story, key):
+        # Photos and the album have their own endpoints
+        if hasattr(story, key) and key not in ("id", "photos", "album"):
             setattr(story, key, value)
     
     db.commit()
     db.refresh(story)
     return story
 
+@router.patch("/{story_id}/album", response_model=AlbumRead)
+def update_album(story_id: int, album_update: AlbumUpdate, db: Session = Depends(get_db)):
+    page = db.query(AlbumPage).filter(AlbumPage.story_id == story_id).first()
+    if page is None:
+        raise HTTPException(status_code=404, detail="Album not found")
+
+    for key, value in album_update.model_dump(exclude_unset=True).items():
+        setattr(page, key, value)
+
+    db.commit()
+    db.refresh(page)
+    return page
+
+@router.patch("/{story_id}/album/photos/{entry_id}", response_model=AlbumPhotoRead)
+def update_album_photo(story_id: int, entry_id: int, entry_update: AlbumPhotoUpdate, db: Session = Depends(get_db)):
+    """Change one photo's role or caption without touching the rest of the layout."""
+    entry = (
+        db.query(AlbumPhoto)
+        .join(AlbumPage)
+        .filter(AlbumPhoto.id == entry_id, AlbumPage.story_id == story_id)
+        .first()
+    )
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Album photo not found")
+
+    for key, value in entry_update.model_dump(exclude_unset=True).items():
+        setattr(entry, key, value)
+
+    db.commit()
+    db.refresh(entry)
+    return entry
+
 @router.post("/{story_id}/mark_used")
 def mark_story_used(story_id: int, db: Session = Depends(get_db)):
     story = db.query(Story).filter(Story.id == story_id).first()
@@ -108,34 +384,37 @@ def mark_story_used(story_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"status": "success"}
 
+@router.post("/mark_used")
+def mark_stories_used(request: BulkIds, db: Session = Depends(get_db)):
+    """Mark many stories as presented in one UPDATE."""
+    changed = set_used_in_presentation(db, True, request.ids)
+    db.commit()
+    return {"status": "success", "updated": changed}
+
 @router.delete("/{story_id}")
-def delete_story(story_id: int, db: Session = Depends(get_db)):
-    story = db.query(Story).filter(Story.id == story_id).first()
-    if story is None:
+def delete_story(story_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    deleted, photo_paths, audio_paths = delete_stories(db, [story_id])
+    if not deleted:
         raise HTTPException(status_code=404, detail="Story not found")
-    
-    # Delete associated photos from filesystem
-    photos = db.query(Photo).filter(Photo.story_id == story_id).all()
-    for photo in photos:
-        if os.path.exists(photo.file_path):
-            os.remove(photo.file_path)
-            print(f"Deleted photo file: {photo.file_path}")
-    
-    # Delete audio file from filesystem
-    if story.audio_file_path and os.path.exists(story.audio_file_path):
-        os.remove(story.audio_file_path)
-        print(f"Deleted audio file: {story.audio_file_path}")
-    
-    # Delete story (cascade will delete photos from DB)
-    db.delete(story)
     db.commit()
+
+    # Delete files once no other story shares them, after the response is sent
+    background_tasks.add_task(release_media_files, photo_paths, audio_paths)
     return {"status": "deleted", "id": story_id}
 
+@router.post("/delete")
+def delete_many_stories(request: BulkIds, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Delete many stories with their photos and albums; unknown ids are ignored."""
+    deleted, photo_paths, audio_paths = delete_stories(db, request.ids)
+    db.commit()
+
+    background_tasks.add_task(release_media_files, photo_paths, audio_paths)
+    return {"status": "deleted", "ids": deleted}
+
 @router.post("/reset")
 def reset_stories(db: Session = Depends(get_db)):
-    stories = db.query(Story).all()
-    for story in stories:
-        story.used_in_presentation = False
+    # One UPDATE of the presented stories instead of loading every story
+    set_used_in_presentation(db, False)
     db.commit()
     return {"status": "reset complete"}
 
@@ -144,75 +423,180 @@ def reset_stories(db: Session = Depends(get_db)):
 async def add_photos_to_story(
     story_id: int,
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    story = db.query(Story).filter(Story.id == story_id).first()
-    if story is None:
-        raise HTTPException(status_code=404, detail="Story not found")
+    await get_story_or_404(db, story_id)
 
+    saved_paths = await save_uploads(files, db)
     saved_photos = []
-    for file in files:
-        ext = file.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{ext}"
-        file_path = os.path.join(MEDIA_DIR, filename)
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        photo = Photo(story_id=story_id, file_path=file_path)
-        db.add(photo)
-        saved_photos.append(photo)
+    with held_uploads(saved_paths):
+        # Variants first, so the revision bumped by the commit already includes their paths
+        await preprocess_images(saved_paths)
 
-    db.commit()
+        for file_path in saved_paths:
+            photo = Photo(story_id=story_id, file_path=file_path)
+            db.add(photo)
+            saved_photos.append(photo)
 
-    for photo in saved_photos:
-        db.refresh(photo)
+        await db.commit()
 
     return {"status": "success", "photos": [
-        {"id": p.id, "story_id": p.story_id, "file_path": p.file_path} for p in saved_photos
+        {
+            "id": p.id,
+            "story_id": p.story_id,
+            "file_path": p.file_path,
+            "model_path": p.model_path,
+            "thumbnail_path": p.thumbnail_path
+        } for p in saved_photos
     ]}
 
 
 @router.delete("/photos/{photo_id}")
-def delete_photo(photo_id: int, db: Session = Depends(get_db)):
-    photo = db.query(Photo).filter(Photo.id == photo_id).first()
-    if photo is None:
+def delete_photo(photo_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    deleted, photo_paths = delete_photos(db, [photo_id])
+    if not deleted:
         raise HTTPException(status_code=404, detail="Photo not found")
+    db.commit()
 
-    if os.path.exists(photo.file_path):
-        os.remove(photo.file_path)
+    # Other stories may share the same content-addressed file
+    background_tasks.add_task(release_media_files, photo_paths)
 
-    db.delete(photo)
+    return {"status": "deleted", "id": photo_id}
+
+@router.post("/photos/delete")
+def delete_many_photos(request: BulkIds, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Delete many photos and their album entries; unknown ids are ignored."""
+    deleted, photo_paths = delete_photos(db, request.ids)
     db.commit()
 
-    return {"status": "deleted", "id": photo_id}
+    background_tasks.add_task(release_media_files, photo_paths)
+    return {"status": "deleted", "ids": deleted}
 
 
-@router.post("/{story_id}/regenerate_transcript")
-async def regenerate_transcript(story_id: int, db: Session = Depends(get_db)):
-    story = db.query(Story).filter(Story.id == story_id).first()
-    if story is None:
-        raise HTTPException(status_code=404, detail="Story not found")
+async def _record_story_audio(story_id: int, speech_text: str, voice_direction: Optional[str], audio_path: str):
+    """Point the story at freshly synthesized audio, unless it changed meanwhile."""
+    async with AsyncSessionLocal() as db:
+        story = await db.get(Story, story_id)
+        if story is None or story.generated_speech != speech_text:
+            return
+        if story.audio_file_path and os.path.exists(story.audio_file_path):
+            return
+        story.audio_file_path = audio_path
+        await db.commit()
+
+    # Now referenced; brings the file back if it was released before the commit
+    await agents.generate_speech_audio(speech_text, voice_direction)
+
+@router.get("/{story_id}/audio")
+async def stream_story_audio(story_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Play a story's speech, synthesizing it on the fly if needed.
     
-    # Regenerate transcript using the story's metadata
-    speech_output = await generate_speech(story.title, story.person, story.emotion, story.notes)
-    story.generated_speech = speech_output.transcript
-    story.generated_voice_direction = speech_output.emotion
+    Existing audio is served from disk. Otherwise TTS output is streamed as
+    WAV while it is generated (playback starts with the first chunk), and
+    the encoded file is cached and recorded on the story once complete.
+    """
+    story = await get_story_or_404(db, story_id)
+    if story.audio_file_path and os.path.exists(story.audio_file_path):
+        return FileResponse(story.audio_file_path)
+
+    speech_text = story.generated_speech
+    voice_direction = story.generated_voice_direction
+    if not speech_text:
+        raise HTTPException(status_code=404, detail="No speech text available")
+
+    audio_path = agents.speech_audio_path(speech_text, voice_direction)
+    # If it is already being synthesized (e.g. by a job), wait for the file
+    async with agents.speech_audio_lock(audio_path):
+        pass
+    if os.path.exists(audio_path):
+        await _record_story_audio(story_id, speech_text, voice_direction, audio_path)
+        return FileResponse(audio_path)
+
+    if not agents.get_client():
+        raise HTTPException(status_code=503, detail="Speech synthesis is not configured")
+
+    # Wait for the first chunk before committing to a 200, so failures get a proper status
+    pcm_stream = agents.stream_speech_audio(speech_text, voice_direction)
+    try:
+        first_chunk = await anext(pcm_stream, b"")
+    except Exception as e:
+        if is_upstream_unavailable(e):
+            raise HTTPException(status_code=503, detail="Speech synthesis is temporarily unavailable")
+        raise
+
+    async def wav_stream():
+        yield wav_stream_header() + first_chunk
+        async for pcm in pcm_stream:
+            yield pcm
+        if os.path.exists(audio_path):
+            await _record_story_audio(story_id, speech_text, voice_direction, audio_path)
+
+    return StreamingResponse(wav_stream(), media_type="audio/wav", headers={"Cache-Control": "no-store"})
+
+@router.post("/{story_id}/regenerate_transcript", response_model=JobRead, status_code=202)
+async def regenerate_transcript(story_id: int, db: AsyncSession = Depends(get_async_db)):
+    await get_story_or_404(db, story_id)
     
-    db.commit()
-    db.refresh(story)
+    # Regenerate transcript using the story's metadata in the background
+    job = await enqueue_job(db, "regenerate_transcript", story_id=story_id, stages=["speech"])
+    return job
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/{story_id}/regenerate_transcript/stream")
+async def stream_regenerate_transcript(story_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Regenerate the transcript, streaming it as Server-Sent Events.
     
-    return {
-        "status": "success",
-        "generated_speech": speech_output.transcript,
-        "generated_voice_direction": speech_output.emotion
-    }
-
-@router.post("/{story_id}/regenerate_audio")
-async def regenerate_audio(story_id: int, speech_text: str = Form(None), db: Session = Depends(get_db)):
-    story = db.query(Story).filter(Story.id == story_id).first()
-    if story is None:
-        raise HTTPException(status_code=404, detail="Story not found")
+    Emits `transcript` events ({"delta": text}) as the model produces the
+    transcript and a final `done` event with the parsed speech and voice
+    direction, which are also saved to the story. A failure after the
+    stream started is reported as an `error` event.
+    """
+    story = await get_story_or_404(db, story_id)
+
+    # Regenerating means the user wants a new sample, not the cached one
+    events = agents.stream_speech(
+        story.title, story.person, story.emotion, story.notes, bypass_cache=True
+    )
+    # Wait for the first event before committing to a 200, so failures get a proper status
+    try:
+        first_event = await anext(events)
+    except Exception as e:
+        if is_upstream_unavailable(e):
+            raise HTTPException(status_code=503, detail="Speech generation is temporarily unavailable")
+        raise
+
+    async def event_stream():
+        try:
+            event = first_event
+            while True:
+                kind, payload = event
+                if kind == "transcript":
+                    yield sse_event("transcript", {"delta": payload})
+                else:
+                    async with AsyncSessionLocal() as session:
+                        story = await session.get(Story, story_id)
+                        if story is not None:
+                            story.generated_speech = payload.transcript
+                            story.generated_voice_direction = payload.emotion
+                            await session.commit()
+                    yield sse_event("done", {
+                        "generated_speech": payload.transcript,
+                        "generated_voice_direction": payload.emotion
+                    })
+                    return
+                event = await anext(events)
+        except Exception as e:
+            yield sse_event("error", {"detail": repr(e)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-store"})
+
+@router.post("/{story_id}/regenerate_audio", response_model=JobRead, status_code=202)
+async def regenerate_audio(story_id: int, speech_text: str = Form(None), db: AsyncSession = Depends(get_async_db)):
+    story = await get_story_or_404(db, story_id)
     
     # Use provided speech_text or fall back to story's generated_speech
     text_to_use = speech_text if speech_text else story.generated_speech
@@ -220,16 +604,11 @@ async def regenerate_audio(story_id: int, speech_text: str = Form(None), db: Ses
     if not text_to_use:
         raise HTTPException(status_code=400, detail="No speech text available")
     
-    # Delete old audio file if it exists
-    if story.audio_file_path and os.path.exists(story.audio_file_path):
-        os.remove(story.audio_file_path)
-        print(f"Deleted old audio file: {story.audio_file_path}")
-    
-    # Generate new audio from speech text
-    audio_path = await generate_speech_audio(text_to_use, voice_direction=story.generated_voice_direction)
-    story.audio_file_path = audio_path
-    
-    db.commit()
-    db.refresh(story)
-    
-    return {"status": "success", "audio_file_path": audio_path}
+    # Generate new audio from speech text in the background
+    job = await enqueue_job(
+        db, "regenerate_audio",
+        story_id=story_id,
+        params={"speech_text": text_to_use},
+        stages=["audio"]
+    )
+    return job
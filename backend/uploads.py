@@ -0,0 +1,202 @@
+"""
+Streaming, content-addressed photo uploads.
+
+Uploads are copied to a temporary file in fixed-size chunks with aiofiles,
+hashing with SHA-256 as they go and enforcing per-file and per-request byte
+limits. The finished file is atomically renamed to `media/<sha256>.<ext>`,
+so the same photo attached to several stories is stored once; the number of
+Photo rows pointing at a path is its reference count.
+
+A stored upload has no reference until its Photo row commits, so it is held
+against `release_photo_files` from `store_content_addressed` until the
+caller settles it (`held_uploads`); reusing an existing file and deleting it
+are serialized under one lock.
+"""
+
+import hashlib
+import itertools
+import os
+import re
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from .images import delete_variants
+from .media import referenced_paths
+from .metrics import span
+from .models import Photo
+
+MEDIA_DIR = "media"
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_BYTES", str(20 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(80 * 1024 * 1024)))
+# Extensions are taken from client-supplied filenames; anything else becomes "bin"
+SAFE_EXTENSION = re.compile(r"[a-z0-9]{1,8}")
+
+# Taken by upload and release threads alike; never held across a query or an await
+_files_lock = threading.Lock()
+# Stored uploads whose Photo rows are not committed yet: path -> count
+_unsettled: Counter = Counter()
+# Paths a release is checking references for: path -> that release's token
+_releasing: Dict[str, int] = {}
+_release_tokens = itertools.count()
+
+
+class UploadBudget:
+    """Tracks bytes written across all files of one request."""
+
+    def __init__(self, max_request_bytes: int = MAX_UPLOAD_REQUEST_BYTES):
+        self.max_request_bytes = max_request_bytes
+        self.used = 0
+
+    def consume(self, size: int):
+        self.used += size
+        if self.used > self.max_request_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {self.max_request_bytes} byte request limit"
+            )
+
+
+def _extension(filename: Optional[str]) -> str:
+    if filename and "." in filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if SAFE_EXTENSION.fullmatch(extension):
+            return extension
+    return "bin"
+
+
+def temp_upload_path() -> str:
+    """Fresh temporary path in media/ for a file being written."""
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    return os.path.join(MEDIA_DIR, f".upload-{uuid.uuid4().hex}.tmp")
+
+
+def store_content_addressed(tmp_path: str, sha256_hex: str, filename: Optional[str]) -> str:
+    """
+    Move a fully written temporary file to its content-addressed path and return it.
+
+    The path is held against `release_photo_files` until `settle_uploads`
+    is called for it.
+    """
+    file_path = os.path.join(MEDIA_DIR, f"{sha256_hex[:32]}.{_extension(filename)}")
+    with _files_lock:
+        if os.path.exists(file_path):
+            # Identical photo already stored; reuse it
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, file_path)
+        _unsettled[file_path] += 1
+        # A release still checking this path's references must now leave it alone
+        _releasing.pop(file_path, None)
+    return file_path
+
+
+def settle_uploads(file_paths: Iterable[str]):
+    """
+    Drop the hold `store_content_addressed` put on each path, once per call.
+
+    Settle after the Photo rows are committed, or before releasing uploads
+    that were abandoned.
+    """
+    with _files_lock:
+        for file_path in file_paths:
+            _unsettled[file_path] -= 1
+            if _unsettled[file_path] <= 0:
+                del _unsettled[file_path]
+
+
+@contextmanager
+def held_uploads(file_paths: Iterable[str]) -> Iterator[None]:
+    """Settle stored uploads when the block, which commits their Photo rows, exits."""
+    file_paths = list(file_paths)
+    try:
+        yield
+    finally:
+        settle_uploads(file_paths)
+
+
+async def save_upload(
+    file: UploadFile,
+    budget: UploadBudget,
+    max_file_bytes: int = MAX_UPLOAD_FILE_BYTES
+) -> str:
+    """
+    Stream `file` into media/ and return its content-addressed path.
+    
+    Raises HTTPException(413) as soon as a limit is exceeded; the partial
+    temporary file is removed.
+    """
+    tmp_path = temp_upload_path()
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with span("upload_write"):
+            async with aiofiles.open(tmp_path, "wb") as out:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_file_bytes:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"{file.filename} exceeds the {max_file_bytes} byte file limit"
+                        )
+                    budget.consume(len(chunk))
+                    digest.update(chunk)
+                    await out.write(chunk)
+        return store_content_addressed(tmp_path, digest.hexdigest(), file.filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def referenced_photo_paths(db: Session, file_paths: Iterable[str]) -> Set[str]:
+    """The subset of `file_paths` that some Photo row still points at."""
+    return referenced_paths(db, Photo.file_path, file_paths)
+
+
+def release_photo_files(db: Session, file_paths: Iterable[Optional[str]]) -> List[str]:
+    """
+    Delete photos and their variants from disk once no Photo row references
+    them, with one reference query per chunk of paths.
+
+    Call after the referencing rows have been deleted and committed; paths
+    still held by an unsettled upload are kept. Returns the paths that were
+    removed.
+    """
+    with _files_lock:
+        token = next(_release_tokens)
+        candidates = {path for path in file_paths if path and path not in _unsettled}
+        for file_path in candidates:
+            _releasing[file_path] = token
+
+    unreferenced: Set[str] = set()
+    try:
+        unreferenced = candidates - referenced_photo_paths(db, candidates)
+    finally:
+        removed = []
+        with _files_lock:
+            for file_path in sorted(candidates):
+                if _releasing.get(file_path) != token:
+                    # Uploaded again, or handed to a later release, meanwhile
+                    continue
+                del _releasing[file_path]
+                if file_path in unreferenced:
+                    delete_variants(file_path)
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                        removed.append(file_path)
+    if removed:
+        print(f"Deleted {len(removed)} photo files")
+    return removed
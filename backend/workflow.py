@@ -1,20 +1,48 @@
 """
 Workflow Agents for orchestrating multi-step AI processes.
 
-This module provides a framework for building sequential agent pipelines
-that maintain state across steps, enabling more coherent multi-step processes.
+This module provides a framework for building sequential and parallel agent
+pipelines that maintain state across steps, enabling more coherent multi-step
+processes.
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Type
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, Type
 from pydantic import BaseModel
-from google import genai
-from google.genai import types
+from .llm_cache import LlmCache, canonical_config, make_cache_key
+from .resilience import call_gemini, stream_gemini
+from .metrics import span
+from .logs import payload_summary, verbose_enabled
+import asyncio
+import copy
 import logging
+import os
+import re
+
+if TYPE_CHECKING:
+    from google import genai
 
 # Create logger for LlmAgent
 logger = logging.getLogger("backend.workflow.LlmAgent")
 
+# JSON in a markdown code block (optional json tag), or else the outermost object
+_JSON_CODE_BLOCK = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+_JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+# Shared limiter for in-flight Gemini requests, created on first use so that
+# GEMINI_MAX_CONCURRENCY can come from the .env loaded by agents.py
+_gemini_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_gemini_semaphore() -> asyncio.Semaphore:
+    """Return the process-wide semaphore bounding concurrent Gemini calls."""
+    global _gemini_semaphore
+    if _gemini_semaphore is None:
+        limit = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+        _gemini_semaphore = asyncio.Semaphore(max(1, limit))
+    return _gemini_semaphore
+
 
 class Agent(ABC):
     """Abstract base class for all agents."""
@@ -43,12 +71,17 @@ class LlmAgent(Agent):
     
     This agent can access previous outputs from the state and save its
     output to a specified key for downstream agents.
+    
+    The request config (including the output model's JSON schema) is built
+    once at construction; agents keep no per-request state, so one instance
+    can serve every request. Treat an agent as immutable and derive changed
+    copies with `with_system_instruction`.
     """
     
     def __init__(
         self,
         name: str,
-        client: genai.Client,
+        client: "genai.Client",
         model: str = "gemini-2.5-flash-lite",
         system_instruction: Optional[str] = None,
         prompt_template: Optional[str] = None,
@@ -56,7 +89,9 @@ class LlmAgent(Agent):
         output_model: Optional[Type[BaseModel]] = None,
         response_mime_type: str = "application/json",
         config_overrides: Optional[Dict[str, Any]] = None,
-        tools: Optional[list] = None
+        tools: Optional[list] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        cache: Optional[LlmCache] = None
     ):
         """
         Initialize an LLM agent.
@@ -72,6 +107,9 @@ class LlmAgent(Agent):
             response_mime_type: MIME type for response
             config_overrides: Additional config parameters
             tools: List of tools (e.g., google_search) available to the agent
+            semaphore: Concurrency limiter for model calls (defaults to the shared Gemini limiter);
+                calls also go through the rate limiter, retries and circuit breaker in resilience.py
+            cache: Response cache; set state["bypass_cache"] to force a fresh sample
         """
         super().__init__(name, output_key)
         self.client = client
@@ -82,17 +120,16 @@ class LlmAgent(Agent):
         self.response_mime_type = response_mime_type
         self.config_overrides = config_overrides or {}
         self.tools = tools
+        self.semaphore = semaphore
+        self.cache = cache
+        self._build_config()
     
-    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute the LLM agent."""
-        # Build prompt from template and state
-        if self.prompt_template:
-            prompt = self.prompt_template.format(**state)
-        else:
-            prompt = state.get("prompt", "")
+    def _build_config(self):
+        """Precompute the config params (read-only view) and the GenerateContentConfig sent with every call."""
+        # Imported here so that importing the workflow does not load the SDK
+        from google.genai import types
         
-        # Prepare config
-        config_params = {}
+        config_params: Dict[str, Any] = {}
         
         # Note: response_mime_type and tools cannot be used together
         if not self.tools:
@@ -110,40 +147,141 @@ class LlmAgent(Agent):
         # Apply any overrides
         config_params.update(self.config_overrides)
         
+        self.config_params = MappingProxyType(config_params)
+        self.config = types.GenerateContentConfig(**config_params)
+        self._canonical_config = canonical_config(config_params)
+    
+    def with_system_instruction(self, system_instruction: Optional[str]) -> "LlmAgent":
+        """A copy of this agent with another system instruction; this agent is left unchanged."""
+        agent = copy.copy(self)
+        agent.system_instruction = system_instruction
+        agent._build_config()
+        return agent
+    
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute the LLM agent."""
+        with span(f"llm:{self.name}"):
+            return await self._run(state)
+    
+    async def _run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        contents = self._prepare_request(state)
+        cache_key, response_text = await self._cached_response(state, contents)
+        cache_hit = response_text is not None
+        
+        if response_text is None:
+            # Generate content via the async client so the event loop stays free
+            response = await call_gemini(
+                self.model,
+                lambda: self.client.aio.models.generate_content(
+                    model=self.model,
+                    contents=contents,
+                    config=self.config
+                ),
+                semaphore=self.semaphore or get_gemini_semaphore()
+            )
+            response_text = response.text
+        
+        return await self._finish(state, response_text, cache_key, cache_hit)
+    
+    async def stream(self, state: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Execute the LLM agent with a streaming request, yielding text as it arrives.
+        
+        Once the stream ends the full response is parsed, cached and saved to
+        state exactly as `run` would. A cache hit is yielded as one chunk.
+        """
+        # Includes the time the consumer spends between chunks
+        with span(f"llm:{self.name}"):
+            contents = self._prepare_request(state)
+            cache_key, response_text = await self._cached_response(state, contents)
+            cache_hit = response_text is not None
+            
+            if cache_hit:
+                yield response_text
+            else:
+                pieces = []
+                async for chunk in stream_gemini(
+                    self.model,
+                    lambda: self.client.aio.models.generate_content_stream(
+                        model=self.model,
+                        contents=contents,
+                        config=self.config
+                    ),
+                    semaphore=self.semaphore or get_gemini_semaphore()
+                ):
+                    if chunk.text:
+                        pieces.append(chunk.text)
+                        yield chunk.text
+                response_text = "".join(pieces)
+            
+            await self._finish(state, response_text, cache_key, cache_hit)
+    
+    def _prepare_request(self, state: Dict[str, Any]) -> Any:
+        """Build the request contents from state; the config is prebuilt."""
+        # Build prompt from template and state
+        if self.prompt_template:
+            prompt = self.prompt_template.format(**state)
+        else:
+            prompt = state.get("prompt", "")
+        
         # Handle contents (text + images if present)
         contents = state.get("contents", prompt)
         
-        # Log the LLM request
-        logger.debug(f"Sending out request, model: {self.model}, agent: {self.name}")
-        logger.debug(
-            f"\nLLM Request:\n"
-            f"-----------------------------------------------------------\n"
-            f"System Instruction:\n{self.system_instruction or 'None'}\n"
-            f"-----------------------------------------------------------\n"
-            f"Contents:\n{self._format_contents(contents)}\n"
-            f"-----------------------------------------------------------\n"
-        )
-        
-        # Generate content
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=contents,
-            config=types.GenerateContentConfig(**config_params)
-        )
+        # Log the LLM request; payloads only as summaries, and only when DEBUG is on
+        if verbose_enabled(logger):
+            logger.debug(
+                "LLM request",
+                extra={
+                    "agent": self.name,
+                    "model": self.model,
+                    "system_instruction": payload_summary(self.system_instruction),
+                    "contents": self._summarize_contents(contents),
+                }
+            )
+        return contents
+    
+    async def _cached_response(
+        self, state: Dict[str, Any], contents: Any
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache key, cached response text or None)."""
+        # Serve identical requests from the cache unless bypassed
+        if not self.cache:
+            return None, None
+        cache_key = self._cache_key(contents)
+        if state.get("bypass_cache"):
+            self.cache.stats["bypasses"] += 1
+            return cache_key, None
+        response_text = await self.cache.get(cache_key)
+        if response_text is not None:
+            logger.debug("Cache hit, model: %s, agent: %s", self.model, self.name)
+        return cache_key, response_text
+    
+    def _cache_key(self, contents: Any) -> str:
+        return make_cache_key(self.model, self.system_instruction, contents, self._canonical_config)
+    
+    async def _finish(
+        self, state: Dict[str, Any], response_text: str, cache_key: Optional[str], cache_hit: bool
+    ) -> Dict[str, Any]:
+        """Parse the response, cache it and save the output to state."""
+        raw_response_text = response_text
         
         # Log the LLM response
-        logger.debug(
-            f"\nLLM Response:\n"
-            f"-----------------------------------------------------------\n"
-            f"Text:\n{response.text}\n"
-            f"-----------------------------------------------------------\n"
-        )
+        if verbose_enabled(logger):
+            logger.debug(
+                "LLM response",
+                extra={
+                    "agent": self.name,
+                    "model": self.model,
+                    "cache_hit": cache_hit,
+                    "response": payload_summary(response_text),
+                }
+            )
         
         # Parse output
         if self.output_model:
             # When tools are used, the response might not be pure JSON
             # Try to extract JSON from the response
-            response_text = response.text.strip()
+            response_text = response_text.strip()
             
             # First, try to parse as-is
             try:
@@ -151,30 +289,32 @@ class LlmAgent(Agent):
             except Exception:
                 # If that fails and tools were used, try to extract JSON from markdown code blocks
                 if self.tools:
-                    import re
-                    import json
-                    
                     # Try to find JSON in code blocks
-                    # Handle optional json tag, and optional whitespace before/after content
-                    json_match = re.search(r'```(?:json)?\s*(.*?)```', response_text, re.DOTALL)
+                    json_match = _JSON_CODE_BLOCK.search(response_text)
                     if json_match:
                         response_text = json_match.group(1).strip()
                     else:
                         # Try to find JSON object in the text
-                        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+                        json_match = _JSON_OBJECT.search(response_text)
                         if json_match:
                             response_text = json_match.group(0)
                     
                     try:
                         output = self.output_model.model_validate_json(response_text)
                     except Exception as e:
-                        logger.error(f"Failed to parse response as JSON: {e}")
-                        logger.error(f"Response text: {response_text}")
+                        logger.error(
+                            "Failed to parse response as JSON: %s", e,
+                            extra={"agent": self.name, "response": payload_summary(response_text)}
+                        )
                         raise
                 else:
                     raise
         else:
-            output = response.text
+            output = response_text
+        
+        # Only cache responses that parsed successfully
+        if self.cache and not cache_hit and response_text is not None:
+            await self.cache.set(cache_key, raw_response_text)
         
         # Save to state if output_key is specified
         if self.output_key:
@@ -182,21 +322,21 @@ class LlmAgent(Agent):
         
         return state
     
-    def _format_contents(self, contents) -> str:
-        """Format contents for logging, handling text and images."""
-        if isinstance(contents, str):
-            return contents
-        elif isinstance(contents, list):
-            formatted = []
-            for item in contents:
-                if isinstance(item, str):
-                    formatted.append(item)
-                else:
-                    # For images or other objects
-                    formatted.append(f"<{type(item).__name__}>")
-            return "\n".join(formatted)
-        else:
-            return str(contents)
+    def _summarize_contents(self, contents) -> list:
+        """Summaries of the request parts for logging: text as payload summaries, images by type and size."""
+        if not isinstance(contents, list):
+            contents = [contents]
+        summaries = []
+        for item in contents:
+            if isinstance(item, str):
+                summaries.append(payload_summary(item))
+            else:
+                # For images or other objects
+                summary = {"type": type(item).__name__}
+                if hasattr(item, "size"):
+                    summary["size"] = list(item.size)
+                summaries.append(summary)
+        return summaries
 
 
 class SequentialAgent(Agent):
@@ -220,6 +360,93 @@ class SequentialAgent(Agent):
     
     async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Execute all sub-agents in sequence."""
-        for agent in self.sub_agents:
-            state = await agent.run(state)
+        with span(f"agent:{self.name}"):
+            for agent in self.sub_agents:
+                state = await agent.run(state)
+        return state
+
+
+class ParallelAgent(Agent):
+    """
+    Agent that runs multiple sub-agents concurrently.
+    
+    Each sub-agent receives its own shallow copy of the incoming state. When
+    all branches finish, the keys each branch added or replaced are merged
+    back into the shared state. Two branches writing the same key is treated
+    as a pipeline bug and raises a ValueError.
+    """
+    
+    def __init__(self, name: str, sub_agents: list[Agent]):
+        """
+        Initialize a parallel agent.
+        
+        Args:
+            name: Agent name for logging/debugging
+            sub_agents: List of agents to run concurrently
+        """
+        super().__init__(name)
+        self.sub_agents = sub_agents
+    
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute all sub-agents concurrently and merge their outputs."""
+        with span(f"agent:{self.name}"):
+            tasks = [asyncio.create_task(agent.run(dict(state))) for agent in self.sub_agents]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                # Don't leave sibling branches running (and calling Gemini) after a failure
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        
+        merged: Dict[str, Any] = {}
+        written_by: Dict[str, str] = {}
+        for agent, branch_state in zip(self.sub_agents, results):
+            for key, value in branch_state.items():
+                if key in state and state[key] is value:
+                    continue
+                if key in written_by:
+                    raise ValueError(
+                        f"{self.name}: key '{key}' written by both "
+                        f"'{written_by[key]}' and '{agent.name}'"
+                    )
+                written_by[key] = agent.name
+                merged[key] = value
+        
+        state.update(merged)
+        return state
+
+
+class FunctionAgent(Agent):
+    """
+    Agent that wraps a plain coroutine function as a pipeline step.
+    
+    Useful for non-LLM steps (e.g. TTS or post-processing) that still need
+    to take part in Sequential/Parallel pipelines.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Awaitable[Any]],
+        output_key: Optional[str] = None
+    ):
+        """
+        Initialize a function agent.
+        
+        Args:
+            name: Agent name for logging/debugging
+            func: Coroutine function called with the current state
+            output_key: Key to save the return value in state (if None, it is discarded)
+        """
+        super().__init__(name, output_key)
+        self.func = func
+    
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute the wrapped function."""
+        with span(f"agent:{self.name}"):
+            output = await self.func(state)
+        if self.output_key:
+            state[self.output_key] = output
         return state
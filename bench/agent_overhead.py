@@ -0,0 +1,53 @@
+"""
+Microbenchmark of the per-call overhead of the LLM agents, without Gemini.
+
+Times everything a speech or album call does besides the model request:
+getting the agent, rendering the prompt, the request config and the LLM
+cache key. "fresh" builds a new agent for every call (config and output
+schema included); "prebuilt" takes it from the registry in agents.py.
+
+    python bench/agent_overhead.py --number 5000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# No cache files or Gemini client are needed to build requests
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from backend import agents  # noqa: E402
+
+SPEECH_STATE = {"title": "Graduation", "person": "Sam", "emotion": "proud", "notes": "First in the family."}
+ALBUM_STATE = {"contents": ["Title: Graduation\nPerson: Sam\n\nIMAGES PROVIDED: 0 images"]}
+STATES = {"speech": SPEECH_STATE, "album": ALBUM_STATE}
+FACTORIES = {"speech": agents._speech_agent, "album": agents._album_agent}
+
+
+def prepare(agent, state):
+    contents = agent._prepare_request(dict(state))
+    return agent.config, agent._cache_key(contents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=5000, help="Calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs; the fastest is reported")
+    args = parser.parse_args()
+
+    agents.init_agents()
+    print(f"{'agent':<10}{'fresh us':>12}{'prebuilt us':>14}")
+    for key, state in STATES.items():
+        factory = FACTORIES[key]
+        fresh = min(timeit.repeat(lambda: prepare(factory(), state), number=args.number, repeat=args.repeat))
+        prebuilt = min(timeit.repeat(
+            lambda: prepare(agents.get_agent(key), state), number=args.number, repeat=args.repeat
+        ))
+        print(f"{key:<10}{fresh / args.number * 1e6:>12.1f}{prebuilt / args.number * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Offline stand-in for the Gemini API, for benchmarks and load tests.
+
+Serves `generateContent` and `streamGenerateContent` (SSE) in the Gemini
+REST format, so the backend's unmodified `genai.Client` can talk to it:
+
+    python bench/fake_gemini.py --port 8100
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8100 \
+        python -m uvicorn backend.main:app --port 8000
+
+Replies are shaped like the real ones: a JSON speech (emotion + ~100 word
+transcript) for the speech agent, an album layout for the album agent
+(one entry per image sent) and 24 kHz mono 16-bit PCM for TTS, about as
+long as the text would take to read aloud. Latency is drawn from
+configurable distributions (time to first token, then a delay per chunk),
+and errors can be injected: random 500/503s, random 429s, and 429s when a
+per-model request rate is exceeded, with a RetryInfo delay like Gemini's.
+
+`GET /stats` returns request counts per model and status; `DELETE /stats`
+resets them.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PCM_SAMPLE_RATE = 24000
+PCM_MIME_TYPE = f"audio/L16;codec=pcm;rate={PCM_SAMPLE_RATE}"
+
+WORDS = (
+    "today we remember the moments that shaped us the friends who stood beside us the teachers who "
+    "believed in us and the families who carried us through long nights and early mornings every "
+    "challenge taught us something every laugh reminded us why we came and every goodbye promised a "
+    "new beginning as we step forward let us carry courage kindness and curiosity into the world"
+).split()
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution in milliseconds into a sampler returning seconds.
+
+    Forms: "fixed:MS", "uniform:LO,HI", "normal:MEAN,SD",
+    "lognormal:MEDIAN,SIGMA" and "exp:MEAN".
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(",")] if params else []
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid distribution parameters: {spec}")
+
+    samplers = {
+        ("fixed", 1): lambda rng: values[0],
+        ("uniform", 2): lambda rng: rng.uniform(values[0], values[1]),
+        ("normal", 2): lambda rng: rng.gauss(values[0], values[1]),
+        ("lognormal", 2): lambda rng: values[0] * math.exp(rng.gauss(0, values[1])),
+        ("exp", 1): lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0,
+    }
+    sampler = samplers.get((kind, len(values)))
+    if sampler is None:
+        raise argparse.ArgumentTypeError(f"Unknown distribution: {spec}")
+    return lambda rng: max(0.0, sampler(rng)) / 1000
+
+
+class RateLimiter:
+    """Fixed one-minute windows per model; `rpm <= 0` never limits."""
+
+    def __init__(self, rpm: int):
+        self.rpm = rpm
+        self.windows: Dict[str, List[float]] = {}
+
+    def allow(self, model: str) -> bool:
+        if self.rpm <= 0:
+            return True
+        now = time.monotonic()
+        window = self.windows.setdefault(model, [now, 0])
+        if now - window[0] >= 60:
+            window[:] = [now, 0]
+        window[1] += 1
+        return window[1] <= self.rpm
+
+
+def _get(data: Dict[str, Any], *keys: str) -> Any:
+    # The SDK sends camelCase; accept snake_case too for hand-written requests
+    for key in keys:
+        if key in data:
+            return data[key]
+    return None
+
+
+def _request_parts(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    parts = []
+    for content in body.get("contents") or []:
+        parts.extend(content.get("parts") or [])
+    return parts
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    return "\n".join(part["text"] for part in _request_parts(body) if part.get("text"))
+
+
+def _image_count(body: Dict[str, Any]) -> int:
+    count = 0
+    for part in _request_parts(body):
+        inline = _get(part, "inlineData", "inline_data") or {}
+        if str(_get(inline, "mimeType", "mime_type") or "").startswith("image/"):
+            count += 1
+    return count
+
+
+def _tone_second() -> bytes:
+    """One second of a modulated tone with a little noise: compresses like speech, not silence."""
+    rng = random.Random(0)
+    samples = []
+    for i in range(PCM_SAMPLE_RATE):
+        t = i / PCM_SAMPLE_RATE
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 3 * t)
+        value = envelope * (0.4 * math.sin(2 * math.pi * 180 * t) + 0.2 * math.sin(2 * math.pi * 410 * t))
+        samples.append(int(max(-1.0, min(1.0, value + rng.uniform(-0.03, 0.03))) * 32767))
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+class FakeGemini:
+    """Builds replies and applies latency and error injection."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.limiter = RateLimiter(args.rpm)
+        self.stats: Counter = Counter()
+        self.tone = _tone_second()
+
+    # Replies -----------------------------------------------------------
+
+    def speech_json(self, prompt: str) -> str:
+        # Seeded from the prompt plus a counter so repeated prompts still get fresh text
+        rng = random.Random(f"{prompt}:{self.rng.random()}")
+        words = [rng.choice(WORDS) for _ in range(rng.randint(80, 120))]
+        transcript = " ".join(words).capitalize() + "."
+        emotion = rng.choice(["Warm, reflective", "Bright, celebratory", "Gentle, grateful"])
+        return json.dumps({"emotion": f"(Voice: {emotion})", "transcript": transcript})
+
+    def album_json(self, prompt: str, images: int) -> str:
+        title = re.search(r"Title: (.*)", prompt)
+        photos = [
+            {
+                "photo_id": index,
+                "role": "main" if index == 0 else "side",
+                "caption": f"A moment worth keeping, part {index + 1}"
+            }
+            for index in range(images)
+        ]
+        return json.dumps({
+            "page_title": title.group(1).strip() if title else "Memories",
+            "page_description": "A page of shared moments from the year.",
+            "photos": photos
+        })
+
+    def speech_pcm(self, prompt: str) -> bytes:
+        words = max(1, len(prompt.split()))
+        seconds = words / self.args.words_per_second
+        size = int(seconds * PCM_SAMPLE_RATE) * 2
+        repeats = size // len(self.tone) + 1
+        return (self.tone * repeats)[:size]
+
+    def reply_chunks(self, model: str, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The reply as a list of content parts, one per streamed chunk."""
+        config = _get(body, "generationConfig", "generation_config") or {}
+        modalities = [str(m).upper() for m in _get(config, "responseModalities", "response_modalities") or []]
+        prompt = _prompt_text(body)
+
+        if "AUDIO" in modalities:
+            pcm = self.speech_pcm(prompt)
+            step = max(2, int(PCM_SAMPLE_RATE * self.args.audio_chunk_ms / 1000) * 2)
+            return [
+                {"inlineData": {"mimeType": PCM_MIME_TYPE, "data": base64.b64encode(pcm[i:i + step]).decode()}}
+                for i in range(0, len(pcm), step)
+            ]
+
+        schema = _get(config, "responseJsonSchema", "response_json_schema", "responseSchema", "response_schema")
+        if schema and "page_title" in json.dumps(schema):
+            text = self.album_json(prompt, _image_count(body))
+        else:
+            text = self.speech_json(prompt)
+        step = self.args.text_chunk_chars
+        return [{"text": text[i:i + step]} for i in range(0, len(text), step)]
+
+    def response(self, model: str, parts: List[Dict[str, Any]], prompt_tokens: int, last: bool = True) -> Dict[str, Any]:
+        candidate: Dict[str, Any] = {"content": {"role": "model", "parts": parts}, "index": 0}
+        if last:
+            candidate["finishReason"] = "STOP"
+        output_tokens = sum(len(part.get("text", "")) // 4 + 1 for part in parts)
+        return {
+            "candidates": [candidate],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens
+            },
+            "modelVersion": model,
+            "responseId": hashlib.md5(str(self.rng.random()).encode()).hexdigest()[:16]
+        }
+
+    # Latency and errors --------------------------------------------------
+
+    def first_chunk_delay(self, model: str) -> float:
+        latency = self.args.tts_latency if "tts" in model else self.args.text_latency
+        return latency(self.rng)
+
+    def chunk_delay(self) -> float:
+        return self.args.chunk_interval(self.rng)
+
+    def injected_error(self, model: str) -> Optional[JSONResponse]:
+        roll = self.rng.random()
+        if not self.limiter.allow(model) or roll < self.args.rate_limit_rate:
+            return self.error(429, "RESOURCE_EXHAUSTED", "Quota exceeded (injected)", retry_delay=self.args.retry_delay)
+        if roll < self.args.rate_limit_rate + self.args.error_rate:
+            code = self.rng.choice([500, 503])
+            return self.error(code, "INTERNAL" if code == 500 else "UNAVAILABLE", "Server error (injected)")
+        return None
+
+    def error(self, code: int, status: str, message: str, retry_delay: Optional[float] = None) -> JSONResponse:
+        error: Dict[str, Any] = {"code": code, "message": message, "status": status}
+        if retry_delay is not None:
+            error["details"] = [{
+                "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                "retryDelay": f"{retry_delay:g}s"
+            }]
+        return JSONResponse({"error": error}, status_code=code)
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    fake = FakeGemini(args)
+    app = FastAPI(title="Fake Gemini")
+
+    @app.get("/stats")
+    def read_stats():
+        counts: Dict[str, Dict[str, int]] = {}
+        for (model, status), count in fake.stats.items():
+            counts.setdefault(model, {})[str(status)] = count
+        return counts
+
+    @app.delete("/stats")
+    def reset_stats():
+        fake.stats.clear()
+        return {"status": "reset"}
+
+    @app.post("/{version}/models/{model_method}")
+    async def generate(version: str, model_method: str, request: Request):
+        model, _, method = model_method.partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            return fake.error(404, "NOT_FOUND", f"Method {method} is not supported")
+        body = await request.json()
+
+        delay = fake.first_chunk_delay(model)
+        failure = fake.injected_error(model)
+        if failure is not None:
+            # Errors come back quickly, as real 429s do
+            await asyncio.sleep(delay * 0.1)
+            fake.stats[(model, failure.status_code)] += 1
+            return failure
+        fake.stats[(model, 200)] += 1
+
+        chunks = fake.reply_chunks(model, body)
+        prompt_tokens = len(_prompt_text(body)) // 4 + 258 * _image_count(body)
+
+        if method == "generateContent":
+            # Same total time as the streamed reply, delivered at once
+            await asyncio.sleep(delay + sum(fake.chunk_delay() for _ in chunks[1:]))
+            if all("text" in chunk for chunk in chunks):
+                parts = [{"text": "".join(chunk["text"] for chunk in chunks)}]
+            else:
+                pcm = b"".join(base64.b64decode(chunk["inlineData"]["data"]) for chunk in chunks)
+                parts = [{"inlineData": {"mimeType": PCM_MIME_TYPE, "data": base64.b64encode(pcm).decode()}}]
+            return JSONResponse(fake.response(model, parts, prompt_tokens))
+
+        async def events():
+            await asyncio.sleep(delay)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(fake.chunk_delay())
+                payload = fake.response(model, [chunk], prompt_tokens, last=index == len(chunks) - 1)
+                yield f"data: {json.dumps(payload)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--text-latency", type=parse_distribution, default="lognormal:800,0.4",
+                        help="Time to first token for text models, ms (default lognormal:800,0.4)")
+    parser.add_argument("--tts-latency", type=parse_distribution, default="lognormal:1500,0.3",
+                        help="Time to first audio chunk for TTS models, ms (default lognormal:1500,0.3)")
+    parser.add_argument("--chunk-interval", type=parse_distribution, default="uniform:20,60",
+                        help="Delay between chunks, ms; non-streamed replies wait for the sum (default uniform:20,60)")
+    parser.add_argument("--text-chunk-chars", type=int, default=60, help="Characters per streamed text chunk")
+    parser.add_argument("--audio-chunk-ms", type=int, default=500, help="Audio per streamed TTS chunk, ms")
+    parser.add_argument("--words-per-second", type=float, default=2.5, help="Speaking rate for TTS length")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500/503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failing with 429")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute per model before 429s (0 = unlimited)")
+    parser.add_argument("--retry-delay", type=float, default=2.0, help="RetryInfo delay sent with 429s, seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
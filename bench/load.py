@@ -0,0 +1,266 @@
+"""
+Scripted load generator for the backend API.
+
+Runs a weighted mix of scenarios from concurrent virtual users for a fixed
+duration and reports throughput and latency percentiles per scenario:
+
+    python bench/load.py --base-url http://127.0.0.1:8000 --duration 60 --users 16 \
+        --mix list=4,summaries=4,story=4,media=6,create=1,regenerate_transcript=1,regenerate_audio=1
+
+Scenarios:
+  list, summaries, story     GET the full listing, the summaries, one story
+  media                      GET a photo thumbnail or audio file from /media
+  create                     POST a story with a photo, then wait for its job
+  regenerate_transcript      POST a regeneration job and wait for it
+  regenerate_audio           same, with fresh text so TTS really runs
+
+For job scenarios, "latency" is the POST and "job" the time until the job
+is done. Run the backend against bench/fake_gemini.py to measure without a
+Gemini key. `--json-out` saves the results; `--compare` checks them
+against a saved run and exits non-zero when a p95 or the throughput
+regresses by more than `--tolerance`.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ("list", "summaries", "story", "media", "create", "regenerate_transcript", "regenerate_audio")
+DEFAULT_MIX = "list=4,summaries=4,story=4,media=6,create=1,regenerate_transcript=1,regenerate_audio=1"
+JOB_POLL_SECONDS = 0.25
+JOB_TIMEOUT_SECONDS = 300
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _photo_jpeg() -> bytes:
+    """A camera-sized JPEG, so uploads exercise downscaling; empty without Pillow."""
+    try:
+        import PIL.Image
+    except ImportError:
+        return b""
+    buffer = io.BytesIO()
+    PIL.Image.new("RGB", (1600, 1200), (random.randrange(256), 120, 200)).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class Results:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.job: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        scenarios = {}
+        for name in sorted(set(self.latency) | set(self.errors)):
+            latency = self.latency[name]
+            entry = {
+                "count": len(latency),
+                "errors": self.errors[name],
+                "rps": len(latency) / elapsed,
+                "p50_ms": percentile(latency, 0.50) * 1000,
+                "p95_ms": percentile(latency, 0.95) * 1000,
+                "p99_ms": percentile(latency, 0.99) * 1000,
+            }
+            if self.job.get(name):
+                entry["job_p50_ms"] = percentile(self.job[name], 0.50) * 1000
+                entry["job_p95_ms"] = percentile(self.job[name], 0.95) * 1000
+            scenarios[name] = entry
+        total = sum(len(values) for values in self.latency.values())
+        return {"elapsed_s": elapsed, "rps": total / elapsed, "scenarios": scenarios}
+
+
+class LoadRunner:
+    def __init__(self, client: httpx.AsyncClient, results: Results):
+        self.client = client
+        self.results = results
+        self.story_ids: List[int] = []
+        self.media_urls: List[str] = []
+
+    async def refresh_targets(self):
+        """Collect story ids and media URLs to pick from."""
+        response = await self.client.get("/api/stories/")
+        response.raise_for_status()
+        stories = response.json()
+        self.story_ids = [story["id"] for story in stories]
+        self.media_urls = []
+        for story in stories:
+            paths = [photo.get("thumbnail_path") or photo["file_path"] for photo in story.get("photos") or []]
+            if story.get("audio_file_path"):
+                paths.append(story["audio_file_path"])
+            self.media_urls.extend("/" + path.replace("\\", "/") for path in paths)
+
+    async def wait_for_job(self, job_id: str) -> bool:
+        deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            response = await self.client.get(f"/api/jobs/{job_id}")
+            status = response.json().get("status")
+            if status == "done":
+                return True
+            if status == "failed":
+                return False
+            await asyncio.sleep(JOB_POLL_SECONDS)
+        return False
+
+    async def run_job(self, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.results.latency[name].append(time.perf_counter() - started)
+        if response.status_code != 202:
+            self.results.errors[name] += 1
+            return
+        if await self.wait_for_job(response.json()["id"]):
+            self.results.job[name].append(time.perf_counter() - started)
+        else:
+            self.results.errors[name] += 1
+
+    async def get(self, name: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await self.client.get(url, **kwargs)
+        # Read the whole body, as a browser would
+        await response.aread()
+        self.results.latency[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.results.errors[name] += 1
+
+    async def scenario(self, name: str):
+        if name == "list":
+            await self.get(name, "/api/stories/")
+        elif name == "summaries":
+            await self.get(name, "/api/stories/summaries")
+        elif name == "story" and self.story_ids:
+            await self.get(name, f"/api/stories/{random.choice(self.story_ids)}")
+        elif name == "media" and self.media_urls:
+            await self.get(name, random.choice(self.media_urls))
+        elif name == "create":
+            photo = _photo_jpeg()
+            files = [("files", ("photo.jpg", photo, "image/jpeg"))] if photo else None
+            await self.run_job(name, "POST", "/api/stories/", data={
+                # Unique inputs so neither the LLM cache nor the audio store short-circuits the run
+                "title": f"Load test {uuid.uuid4().hex[:8]}",
+                "person": "Load Tester",
+                "emotion": random.choice(["happy", "proud", "nostalgic"]),
+                "notes": f"Generated by bench/load.py ({uuid.uuid4().hex})"
+            }, files=files)
+        elif name == "regenerate_transcript" and self.story_ids:
+            await self.run_job(name, "POST", f"/api/stories/{random.choice(self.story_ids)}/regenerate_transcript")
+        elif name == "regenerate_audio" and self.story_ids:
+            await self.run_job(
+                name, "POST", f"/api/stories/{random.choice(self.story_ids)}/regenerate_audio",
+                data={"speech_text": f"A fresh reading for the load test, number {uuid.uuid4().hex}."}
+            )
+
+    async def user(self, mix: Dict[str, float], deadline: float):
+        names, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            try:
+                await self.scenario(name)
+            except httpx.HTTPError:
+                self.results.errors[name] += 1
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results = Results()
+    limits = httpx.Limits(max_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        runner = LoadRunner(client, results)
+        await runner.refresh_targets()
+        # Scenarios that need existing stories or media are skipped on an empty library
+        mix = {
+            name: weight for name, weight in args.mix.items()
+            if (runner.story_ids or name in ("list", "summaries", "create"))
+            and (runner.media_urls or name != "media")
+        }
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(runner.user(mix, deadline) for _ in range(args.users)))
+        # Job scenarios may finish after the deadline; count the real elapsed time
+        elapsed = time.monotonic() - started
+    return results.summary(elapsed)
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"{'scenario':<24}{'count':>7}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'job p95':>10}")
+    for name, entry in summary["scenarios"].items():
+        job_p95 = f"{entry['job_p95_ms']:.0f}" if "job_p95_ms" in entry else "-"
+        print(
+            f"{name:<24}{entry['count']:>7}{entry['errors']:>6}{entry['rps']:>9.2f}"
+            f"{entry['p50_ms']:>10.1f}{entry['p95_ms']:>10.1f}{entry['p99_ms']:>10.1f}{job_p95:>10}"
+        )
+    print(f"total: {summary['rps']:.2f} req/s over {summary['elapsed_s']:.1f}s")
+
+
+def regressions(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Scenarios whose p95 (or job p95) grew, or overall throughput fell, by more than `tolerance`."""
+    found = []
+    for name, entry in summary["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for key in ("p95_ms", "job_p95_ms"):
+            if key in entry and before.get(key) and entry[key] > before[key] * (1 + tolerance):
+                found.append(f"{name} {key}: {before[key]:.1f} -> {entry[key]:.1f}")
+    if baseline.get("rps") and summary["rps"] < baseline["rps"] * (1 - tolerance):
+        found.append(f"throughput: {baseline['rps']:.2f} -> {summary['rps']:.2f} req/s")
+    return found
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout, seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json-out", help="Write the results to this file")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression vs the baseline (default 0.10)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    summary = asyncio.run(run(args))
+    print_summary(summary)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(summary, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
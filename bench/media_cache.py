@@ -0,0 +1,145 @@
+"""
+Repeat-visit benchmark of /media serving: Starlette's StaticFiles vs MediaFiles.
+
+Builds a throwaway media directory like the one a few stories produce
+(content-addressed model-sized JPEGs and `tts-` WAV audio with its
+precompressed siblings), then loads every file twice through each app
+with a client that honours Cache-Control and ETags the way a browser
+cache does. Reports requests sent and bytes received per visit:
+
+    python bench/media_cache.py --stories 10 --photos-per-story 3 --audio-seconds 30
+
+Runs in-process over httpx's ASGI transport; no server is needed.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import math
+import os
+import random
+import re
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.audio_encoding import save_wave_file  # noqa: E402
+from backend.audio_store import audio_file_name  # noqa: E402
+from backend.media import MediaFiles, precompress  # noqa: E402
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _photo(seed: int) -> bytes:
+    import PIL.Image
+    import PIL.ImageDraw
+
+    rng = random.Random(seed)
+    image = PIL.Image.new("RGB", (1024, 768), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    draw = PIL.ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rng.randrange(1024), rng.randrange(768)
+        draw.ellipse((x, y, x + rng.randrange(10, 120), y + rng.randrange(10, 120)), fill=tuple(
+            rng.randrange(256) for _ in range(3)
+        ))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _speech_pcm(seconds: float, seed: int, rate: int = 24000) -> bytes:
+    """Speech-like 16-bit PCM: a few harmonics under a syllable-rate envelope, with pauses and noise."""
+    rng = random.Random(seed)
+    pitch = rng.uniform(100, 220)
+    samples = []
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        envelope = max(0.0, math.sin(2 * math.pi * 4 * t)) * (0.2 if int(t * 1.5) % 5 == 4 else 1.0)
+        tone = sum(math.sin(2 * math.pi * pitch * k * t) / k for k in (1, 2, 3))
+        samples.append(int(max(-1.0, min(1.0, 0.3 * envelope * tone + rng.gauss(0, 0.01))) * 32767))
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+def build_media(directory: str, args: argparse.Namespace) -> List[str]:
+    names = []
+    for story in range(args.stories):
+        for n in range(args.photos_per_story):
+            data = _photo(story * 100 + n)
+            name = f"{hashlib.sha256(data).hexdigest()[:32]}.model.jpg"
+            with open(os.path.join(directory, name), "wb") as f:
+                f.write(data)
+            names.append(name)
+        name = audio_file_name("bench-tts", "bench-voice", None, f"Story {story}")
+        path = os.path.join(directory, name)
+        save_wave_file(path, _speech_pcm(args.audio_seconds, story))
+        precompress(path)
+        names.append(name)
+    return names
+
+
+class CachingClient:
+    """Fetches URLs like a browser cache: fresh entries are reused, stale ones revalidated."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.cache: Dict[str, Tuple[float, str]] = {}  # url -> (fresh until, etag)
+
+    async def get(self, url: str) -> Tuple[int, int]:
+        """(requests sent, bytes received) for loading `url`."""
+        fresh_until, etag = self.cache.get(url, (0.0, None))
+        if time.time() < fresh_until:
+            return 0, 0
+        headers = {"accept-encoding": "gzip, br"}
+        if etag:
+            headers["if-none-match"] = etag
+        response = await self.client.get(url, headers=headers)
+        await response.aread()
+        cache_control = response.headers.get("cache-control", "")
+        max_age = MAX_AGE.search(cache_control)
+        self.cache[url] = (
+            time.time() + int(max_age.group(1)) if max_age and "no-cache" not in cache_control else 0.0,
+            response.headers.get("etag", etag),
+        )
+        return 1, response.num_bytes_downloaded
+
+
+async def visit(client: CachingClient, names: List[str]) -> Tuple[int, int]:
+    results = await asyncio.gather(*(client.get(f"/media/{name}") for name in names))
+    return sum(r for r, _ in results), sum(b for _, b in results)
+
+
+async def main_async(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as directory:
+        names = build_media(directory, args)
+        print(f"{len(names)} files\n{'server':<14}{'visit':<8}{'requests':>9}{'KB':>10}")
+        for label, files in (("StaticFiles", StaticFiles), ("MediaFiles", MediaFiles)):
+            app = Starlette(routes=[Mount("/media", files(directory=directory))])
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                client = CachingClient(http)
+                for visit_name in ("first", "repeat"):
+                    requests, received = await visit(client, names)
+                    print(f"{label:<14}{visit_name:<8}{requests:>9}{received / 1024:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stories", type=int, default=10)
+    parser.add_argument("--photos-per-story", type=int, default=3)
+    parser.add_argument("--audio-seconds", type=float, default=30, help="Length of each story's WAV")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
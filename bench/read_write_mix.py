@@ -0,0 +1,113 @@
+"""
+Read/write mix benchmark for the database path of the API.
+
+Concurrent clients issue listing reads and story-creating writes (`POST
+/api/stories/`, without waiting for the generation job) for a fixed time
+per phase, and the script reports throughput and latency of each:
+
+    python bench/read_write_mix.py --base-url http://127.0.0.1:8000 --clients 20 --duration 8
+
+Phases: `reads` (reads only), `mixed` (`--write-share` of requests are
+writes, default 0.2) and `writes` (writes only). Run the backend against
+bench/fake_gemini.py so the jobs the writes queue do not need a Gemini key;
+they run in the background and their commits compete with the requests,
+as in production.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+PHASES = ("reads", "mixed", "writes")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def run_phase(client: httpx.AsyncClient, args: argparse.Namespace, write_share: float) -> Dict[str, Dict]:
+    latency: Dict[str, List[float]] = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    deadline = time.monotonic() + args.duration
+
+    async def user():
+        while time.monotonic() < deadline:
+            kind = "write" if random.random() < write_share else "read"
+            started = time.perf_counter()
+            try:
+                if kind == "write":
+                    response = await client.post("/api/stories/", data={
+                        "title": f"Mix {uuid.uuid4().hex[:8]}",
+                        "person": "Bench",
+                        "emotion": "proud",
+                        "notes": uuid.uuid4().hex,
+                    })
+                else:
+                    response = await client.get(args.read_path)
+                    await response.aread()
+            except httpx.HTTPError:
+                errors[kind] += 1
+                continue
+            latency[kind].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[kind] += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(user() for _ in range(args.clients)))
+    elapsed = time.monotonic() - started
+    return {
+        kind: {
+            "count": len(values),
+            "errors": errors[kind],
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+        }
+        for kind, values in latency.items() if values or errors[kind]
+    }
+
+
+async def main_async(args: argparse.Namespace):
+    shares = {"reads": 0.0, "mixed": args.write_share, "writes": 1.0}
+    limits = httpx.Limits(max_connections=args.clients * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        print(f"{'phase':<8}{'kind':<7}{'count':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        for phase in args.phases:
+            results = await run_phase(client, args, shares[phase])
+            for kind, entry in results.items():
+                print(
+                    f"{phase:<8}{kind:<7}{entry['count']:>7}{entry['errors']:>5}{entry['rps']:>9.1f}"
+                    f"{entry['p50_ms']:>9.0f}{entry['p95_ms']:>9.0f}"
+                )
+            # Let the queued jobs drain so phases do not overlap
+            await asyncio.sleep(args.pause)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=8, help="Seconds per phase")
+    parser.add_argument("--write-share", type=float, default=0.2, help="Share of writes in the mixed phase")
+    parser.add_argument("--read-path", default="/api/stories/", help="Listing to read")
+    parser.add_argument("--phases", type=lambda s: s.split(","), default=list(PHASES),
+                        help=f"Comma-separated phases to run (default {','.join(PHASES)})")
+    parser.add_argument("--pause", type=float, default=2, help="Seconds between phases")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    for phase in args.phases:
+        if phase not in PHASES:
+            parser.error(f"Unknown phase: {phase}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Read latency while story generation jobs run.
+
+Readers poll a cheap endpoint for `--baseline` seconds, then the script
+submits `--stories` stories at once (`POST /api/stories/`) and the readers
+keep going until every job has finished. Reads that stay flat in the
+"generating" phase mean generation (Gemini calls, TTS, audio encoding)
+does not block the event loop:
+
+    python bench/reads_during_generation.py --base-url http://127.0.0.1:8000 --stories 20 --readers 4
+
+Run the backend against bench/fake_gemini.py with a realistic latency, e.g.
+`--text-latency fixed:800 --tts-latency fixed:1500`, and
+LLM_CACHE_ENABLED=false so every job calls it.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+JOB_POLL_SECONDS = 0.25
+DONE_STATUSES = ("done", "failed")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def read_until(client: httpx.AsyncClient, path: str, stop: asyncio.Event, latency: List[float], errors: Dict):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            await response.aread()
+        except httpx.HTTPError:
+            errors["read"] += 1
+            continue
+        latency.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors["read"] += 1
+
+
+async def create_and_wait(client: httpx.AsyncClient, index: int, job_seconds: List[float], errors: Dict):
+    started = time.perf_counter()
+    response = await client.post("/api/stories/", data={
+        "title": f"Generation {index} {uuid.uuid4().hex[:6]}",
+        "person": "Bench",
+        "emotion": "proud",
+        "notes": uuid.uuid4().hex,
+    })
+    if response.status_code != 202:
+        errors["create"] += 1
+        return
+    job_id = response.json()["id"]
+    while True:
+        await asyncio.sleep(JOB_POLL_SECONDS)
+        job = (await client.get(f"/api/jobs/{job_id}")).json()
+        if job["status"] in DONE_STATUSES:
+            break
+    if job["status"] == "failed":
+        errors["job"] += 1
+    job_seconds.append(time.perf_counter() - started)
+
+
+async def read_phase(client: httpx.AsyncClient, args: argparse.Namespace, until) -> List[float]:
+    """Run the readers until the awaitable `until` completes; returns their latencies."""
+    latency: List[float] = []
+    stop = asyncio.Event()
+    readers = [
+        asyncio.create_task(read_until(client, args.read_path, stop, latency, args.errors))
+        for _ in range(args.readers)
+    ]
+    await until
+    stop.set()
+    await asyncio.gather(*readers)
+    return latency
+
+
+async def main_async(args: argparse.Namespace):
+    args.errors = {"read": 0, "create": 0, "job": 0}
+    limits = httpx.Limits(max_connections=args.readers + args.stories + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.monotonic()
+        baseline = await read_phase(client, args, asyncio.sleep(args.baseline))
+        baseline_elapsed = time.monotonic() - started
+
+        job_seconds: List[float] = []
+        started = time.monotonic()
+        generating = await read_phase(client, args, asyncio.gather(
+            *(create_and_wait(client, i, job_seconds, args.errors) for i in range(args.stories))
+        ))
+        generating_elapsed = time.monotonic() - started
+
+    print(f"{'phase':<12}{'reads':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for phase, values, elapsed in (
+        ("baseline", baseline, baseline_elapsed),
+        ("generating", generating, generating_elapsed),
+    ):
+        print(
+            f"{phase:<12}{len(values):>7}{len(values) / elapsed:>9.1f}{percentile(values, 0.50) * 1000:>9.0f}"
+            f"{percentile(values, 0.95) * 1000:>9.0f}{max(values, default=0) * 1000:>9.0f}"
+        )
+    print(
+        f"{len(job_seconds)} jobs finished in {generating_elapsed:.1f}s "
+        f"(p50 {percentile(job_seconds, 0.50):.1f}s per story); errors: "
+        + ", ".join(f"{kind} {count}" for kind, count in args.errors.items())
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--stories", type=int, default=20, help="Stories submitted at once")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent readers")
+    parser.add_argument("--read-path", default="/api/stories/summaries?limit=20", help="Endpoint the readers poll")
+    parser.add_argument("--baseline", type=float, default=5, help="Seconds of reads before submitting")
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
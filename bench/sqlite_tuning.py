@@ -0,0 +1,155 @@
+"""
+SQLite tuning benchmark: connection pragmas and lookup indexes.
+
+Builds a throwaway database of `--stories` stories with `--photos-per-story`
+photos each, then runs reader and writer threads against it for a fixed
+time, once per configuration:
+
+  default   SQLite's defaults (rollback journal, synchronous=FULL), no indexes
+  tuned     SQLITE_PRAGMAS from backend/database.py, plus the indexes of the
+            `_add_lookup_indexes` migration
+
+Readers do what a story page and the presentation view do: look up one
+story's photos and count the stories used in the presentation. Writers
+toggle `used_in_presentation` on a random story, one commit each.
+
+    python bench/sqlite_tuning.py --stories 4000 --photos-per-story 3 --duration 5
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.database import SQLITE_PRAGMAS  # noqa: E402
+
+# The columns the queries touch, as in backend/models.py
+SCHEMA = """
+CREATE TABLE stories (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR,
+    person VARCHAR,
+    notes TEXT,
+    used_in_presentation BOOLEAN DEFAULT 0
+);
+CREATE TABLE photos (
+    id INTEGER PRIMARY KEY,
+    story_id INTEGER REFERENCES stories (id),
+    file_path VARCHAR
+);
+"""
+INDEXES = """
+CREATE INDEX ix_photos_story_id ON photos (story_id);
+CREATE INDEX ix_stories_used_in_presentation ON stories (used_in_presentation);
+"""
+# Timeout of SQLAlchemy's pysqlite connections when busy_timeout is not set
+DEFAULT_TIMEOUT_SECONDS = 5.0
+
+
+def build_database(path: str, args: argparse.Namespace, indexed: bool):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO stories (id, title, person, notes, used_in_presentation) VALUES (?, ?, ?, ?, ?)",
+        ((i, f"Story {i}", "Bench", "notes " * 40, i % 5 == 0) for i in range(1, args.stories + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO photos (story_id, file_path) VALUES (?, ?)",
+        (
+            (story_id, f"media/{story_id}-{n}.jpg")
+            for story_id in range(1, args.stories + 1) for n in range(args.photos_per_story)
+        ),
+    )
+    if indexed:
+        conn.executescript(INDEXES)
+    conn.commit()
+    conn.close()
+
+
+def connect(path: str, tuned: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=DEFAULT_TIMEOUT_SECONDS, check_same_thread=False)
+    if tuned:
+        for name, value in SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def reader(path: str, tuned: bool, stories: int, deadline: float, counts: list, index: int):
+    conn = connect(path, tuned)
+    done = 0
+    while time.monotonic() < deadline:
+        story_id = random.randint(1, stories)
+        conn.execute("SELECT id, file_path FROM photos WHERE story_id = ?", (story_id,)).fetchall()
+        conn.execute("SELECT count(*) FROM stories WHERE used_in_presentation = 1").fetchone()
+        done += 1
+    conn.close()
+    counts[index] = done
+
+
+def writer(path: str, tuned: bool, stories: int, deadline: float, counts: list, index: int):
+    conn = connect(path, tuned)
+    done = 0
+    while time.monotonic() < deadline:
+        story_id = random.randint(1, stories)
+        try:
+            conn.execute(
+                "UPDATE stories SET used_in_presentation = NOT used_in_presentation WHERE id = ?", (story_id,)
+            )
+            conn.commit()
+            done += 1
+        except sqlite3.OperationalError:
+            # database is locked: gave up after the timeout
+            conn.rollback()
+    conn.close()
+    counts[index] = done
+
+
+def run(args: argparse.Namespace, tuned: bool) -> tuple:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        build_database(path, args, indexed=tuned)
+        if tuned:
+            # journal_mode=WAL persists in the file; set it before the threads start
+            connect(path, tuned).close()
+
+        reads = [0] * args.readers
+        writes = [0] * args.writers
+        deadline = time.monotonic() + args.duration
+        threads = [
+            threading.Thread(target=reader, args=(path, tuned, args.stories, deadline, reads, i))
+            for i in range(args.readers)
+        ] + [
+            threading.Thread(target=writer, args=(path, tuned, args.stories, deadline, writes, i))
+            for i in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return sum(reads) / args.duration, sum(writes) / args.duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stories", type=int, default=4000)
+    parser.add_argument("--photos-per-story", type=int, default=3)
+    parser.add_argument("--readers", type=int, default=8, help="Reader threads")
+    parser.add_argument("--writers", type=int, default=2, help="Writer threads")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per configuration")
+    args = parser.parse_args()
+
+    print(f"{'config':<10}{'reads/s':>10}{'writes/s':>10}")
+    for name, tuned in (("default", False), ("tuned", True)):
+        reads, writes = run(args, tuned)
+        print(f"{name:<10}{reads:>10.0f}{writes:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import axios from "axios";
-import type { Story, StoryCreate } from "./types";
+import type { Job, Story, StoryChanges, StoryCreate, StorySummary } from "./types";
 
 const API_URL = "http://localhost:8000/api";
 
@@ -7,11 +7,63 @@ export const api = axios.create({
   baseURL: API_URL,
 });
 
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Streams TTS while it is generated when the story has no audio file yet
+export const getStoryAudioUrl = (id: number): string => `${API_URL}/stories/${id}/audio`;
+const SUMMARY_PAGE_SIZE = 200;
+
 export const getStories = async (): Promise<Story[]> => {
   const response = await api.get("/stories");
   return response.data;
 };
 
+// Fetch every story summary, following the X-Next-Cursor pagination header
+export const getStorySummaries = async (): Promise<StorySummary[]> => {
+  const summaries: StorySummary[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await api.get("/stories/summaries", {
+      params: { limit: SUMMARY_PAGE_SIZE, cursor },
+    });
+    summaries.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return summaries;
+};
+
+// Summaries created/updated and ids deleted since `since` (0 returns every story)
+export const getStorySummaryChanges = async (
+  since: number
+): Promise<StoryChanges<StorySummary>> => {
+  const response = await api.get("/stories/changes", {
+    params: { since, summary: true },
+  });
+  return response.data;
+};
+
+export const getStory = async (id: number): Promise<Story> => {
+  const response = await api.get(`/stories/${id}`);
+  return response.data;
+};
+
+export const getJob = async (jobId: string): Promise<Job> => {
+  const response = await api.get(`/jobs/${jobId}`);
+  return response.data;
+};
+
+// Poll a background generation job until it finishes
+export const waitForJob = async (jobId: string): Promise<Job> => {
+  for (;;) {
+    const job = await getJob(jobId);
+    if (job.status === "done") return job;
+    if (job.status === "failed") {
+      throw new Error(job.error || `Job ${jobId} failed`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+};
+
 export const createStory = async (story: StoryCreate): Promise<Story> => {
   const formData = new FormData();
   formData.append("title", story.title);
@@ -24,13 +76,19 @@ export const createStory = async (story: StoryCreate): Promise<Story> => {
   });
 
   const response = await api.post("/stories/", formData);
-  return response.data;
+  const job = await waitForJob(response.data.id);
+  return getStory(job.story_id!);
 };
 
 export const markStoryUsed = async (id: number): Promise<void> => {
   await api.post(`/stories/${id}/mark_used`);
 };
 
+export const markStoriesUsed = async (ids: number[]): Promise<number[]> => {
+  const response = await api.post("/stories/mark_used", { ids });
+  return response.data.updated;
+};
+
 export const resetStories = async (): Promise<void> => {
   await api.post("/stories/reset");
 };
@@ -47,6 +105,11 @@ export const deleteStory = async (id: number): Promise<void> => {
   await api.delete(`/stories/${id}`);
 };
 
+export const deleteStories = async (ids: number[]): Promise<number[]> => {
+  const response = await api.post("/stories/delete", { ids });
+  return response.data.ids;
+};
+
 export const addPhotosToStory = async (
   storyId: number,
   files: File[]
@@ -66,19 +129,58 @@ export const deletePhoto = async (photoId: number): Promise<void> => {
 
 export const regenerateTranscript = async (storyId: number): Promise<{ generated_speech: string; generated_voice_direction: string }> => {
   const response = await api.post(`/stories/${storyId}/regenerate_transcript`);
+  const job = await waitForJob(response.data.id);
   return {
-    generated_speech: response.data.generated_speech,
-    generated_voice_direction: response.data.generated_voice_direction
+    generated_speech: job.result?.generated_speech ?? "",
+    generated_voice_direction: job.result?.generated_voice_direction ?? ""
   };
 };
 
+// POST + Server-Sent Events: EventSource only supports GET, so read the body stream
+export const streamRegenerateTranscript = async (
+  storyId: number,
+  onTranscript: (transcriptSoFar: string) => void
+): Promise<{ generated_speech: string; generated_voice_direction: string }> => {
+  const response = await fetch(`${API_URL}/stories/${storyId}/regenerate_transcript/stream`, { method: "POST" });
+  if (!response.ok || !response.body) {
+    throw new Error(`Transcript stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let transcript = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const message = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = message.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(message.match(/^data: (.*)$/m)?.[1] ?? "{}");
+      if (event === "transcript") {
+        transcript += data.delta;
+        onTranscript(transcript);
+      } else if (event === "done") {
+        return data;
+      } else if (event === "error") {
+        throw new Error(data.detail);
+      }
+    }
+  }
+  throw new Error("Transcript stream ended unexpectedly");
+};
+
 export const regenerateAudio = async (storyId: number, speechText?: string): Promise<string> => {
   const formData = new FormData();
   if (speechText) {
     formData.append("speech_text", speechText);
   }
   const response = await api.post(`/stories/${storyId}/regenerate_audio`, formData);
-  return response.data.audio_file_path;
+  const job = await waitForJob(response.data.id);
+  return job.result?.audio_file_path ?? "";
 };
 
 export const verifyPassword = async (password: string): Promise<{ success: boolean; message?: string }> => {
@@ -3,36 +3,20 @@ import type { Photo, AlbumLayout } from "../types";
 import "./AlbumLayoutPreview.css";
 
 interface AlbumLayoutPreviewProps {
-  layoutJson: string;
+  layout: AlbumLayout;
   photos: Photo[];
 }
 
 export const AlbumLayoutPreview: React.FC<AlbumLayoutPreviewProps> = ({
-  layoutJson,
+  layout,
   photos,
 }) => {
-  let layout: AlbumLayout | null = null;
-
-  try {
-    layout = JSON.parse(layoutJson) as AlbumLayout;
-  } catch (error) {
-    console.error("Failed to parse album layout JSON", error);
-    return (
-      <div className="album-layout-preview">
-        <div className="layout-error">Invalid album layout JSON</div>
-      </div>
-    );
-  }
-
-  if (!layout) {
-    return null;
-  }
-
-  // Map photo_id to actual photo URLs
-  const getPhotoUrl = (photoId: string | number): string | null => {
-    const index = typeof photoId === "string" ? parseInt(photoId, 10) : photoId;
-    if (index >= 0 && index < photos.length) {
-      return `http://localhost:8000/${photos[index].file_path.replace(/\\/g, "/")}`;
+  // Map photo_id (Photo.id) to actual photo URLs
+  const getPhotoUrl = (photoId: number): string | null => {
+    const photo = photos.find((p) => p.id === photoId);
+    if (photo) {
+      const path = photo.model_path ?? photo.file_path;
+      return `http://localhost:8000/${path.replace(/\\/g, "/")}`;
     }
     return null;
   };
@@ -45,12 +29,12 @@ export const AlbumLayoutPreview: React.FC<AlbumLayoutPreviewProps> = ({
       </div>
 
       <div className="layout-grid">
-        {layout.photos.map((photo, idx) => {
+        {layout.photos.map((photo) => {
           const photoUrl = getPhotoUrl(photo.photo_id);
           if (!photoUrl) {
             return (
               <div
-                key={idx}
+                key={photo.id}
                 className={`layout-photo layout-photo-${photo.role}`}
               >
                 <div className="photo-missing">Photo not found</div>
@@ -61,7 +45,7 @@ export const AlbumLayoutPreview: React.FC<AlbumLayoutPreviewProps> = ({
 
           return (
             <div
-              key={idx}
+              key={photo.id}
               className={`layout-photo layout-photo-${photo.role}`}
             >
               <img src={photoUrl} alt={photo.caption} />
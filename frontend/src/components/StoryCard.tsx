@@ -1,11 +1,11 @@
 import React from "react";
-import type { Story } from "../types";
+import type { StorySummary } from "../types";
 import { motion } from "framer-motion";
 import { User, Heart } from "lucide-react";
 import "./StoryCard.css";
 
 interface StoryCardProps {
-  story: Story;
+  story: StorySummary;
   onClick?: () => void;
   compact?: boolean;
 }
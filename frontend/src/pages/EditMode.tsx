@@ -6,7 +6,7 @@ import {
   deleteStory,
   addPhotosToStory,
   deletePhoto,
-  regenerateTranscript,
+  streamRegenerateTranscript,
   regenerateAudio,
 } from "../api";
 import type { Story, StoryCreate } from "../types";
@@ -225,7 +225,11 @@ export const EditMode: React.FC = () => {
     if (!selectedStory) return;
     setRegeneratingTranscript(true);
     try {
-      const { generated_speech, generated_voice_direction } = await regenerateTranscript(selectedStory.id);
+      // Show the transcript as it is generated
+      const { generated_speech, generated_voice_direction } = await streamRegenerateTranscript(
+        selectedStory.id,
+        setSpeech
+      );
       setSpeech(generated_speech);
       setVoiceDirection(generated_voice_direction);
 
@@ -411,7 +415,7 @@ export const EditMode: React.FC = () => {
               )}
 
               {/* Album Layout */}
-              {selectedStory.album_json && (
+              {selectedStory.album && (
                 <div className="album-json-section" style={{ marginTop: "20px" }}>
                   <label>Album Layout</label>
                   <div style={{ marginTop: "10px" }}>
@@ -432,7 +436,7 @@ export const EditMode: React.FC = () => {
                         maxHeight: "200px",
                         margin: 0
                       }}>
-                        {selectedStory.album_json}
+                        {JSON.stringify(selectedStory.album, null, 2)}
                       </pre>
                     </div>
                     <div>
@@ -443,7 +447,7 @@ export const EditMode: React.FC = () => {
                         fontWeight: "500"
                       }}>Visual Preview</h4>
                       <AlbumLayoutPreview
-                        layoutJson={selectedStory.album_json}
+                        layout={selectedStory.album}
                         photos={selectedStory.photos}
                       />
                     </div>
@@ -462,10 +466,9 @@ export const EditMode: React.FC = () => {
                   {selectedStory.photos.map((photo) => (
                     <div key={photo.id} className="photo-item">
                       <img
-                        src={`http://localhost:8000/${photo.file_path.replace(
-                          /\\/g,
-                          "/"
-                        )}`}
+                        src={`http://localhost:8000/${(
+                          photo.thumbnail_path ?? photo.file_path
+                        ).replace(/\\/g, "/")}`}
                         alt="Story photo"
                       />
                       <button
@@ -1,33 +1,51 @@
-import React, { useState, useEffect } from "react";
-import { getStories, markStoryUsed, resetStories } from "../api";
-import type { Story } from "../types";
+import React, { useState, useEffect, useRef } from "react";
+import { getStory, getStoryAudioUrl, getStorySummaryChanges, markStoryUsed, resetStories } from "../api";
+import type { Story, StorySummary } from "../types";
 import { StoryCard } from "../components/StoryCard";
 import { AlbumLayoutPreview } from "../components/AlbumLayoutPreview";
 import { AnimatePresence, motion } from "framer-motion";
 import { X, RefreshCw } from "lucide-react";
 import "./PresentMode.css";
 
+const CHANGES_POLL_INTERVAL_MS = 5000;
+
 export const PresentMode: React.FC = () => {
   useEffect(() => {
     console.log("PresentMode mounted");
   }, []);
-  const [stories, setStories] = useState<Story[]>([]);
+  const [stories, setStories] = useState<StorySummary[]>([]);
   const [selectedStory, setSelectedStory] = useState<Story | null>(null);
   const [isResetting, setIsResetting] = useState(false);
+  // Last revision seen; polling only transfers stories changed after it
+  const revision = useRef(0);
 
   useEffect(() => {
     loadStories();
+    const timer = setInterval(loadStories, CHANGES_POLL_INTERVAL_MS);
+    return () => clearInterval(timer);
   }, []);
 
   const loadStories = async () => {
-    const data = await getStories();
-    setStories(data);
+    try {
+      const changes = await getStorySummaryChanges(revision.current);
+      revision.current = changes.revision;
+      if (changes.stories.length === 0 && changes.deleted.length === 0) return;
+      setStories((prev) => {
+        const byId = new Map(prev.map((s) => [s.id, s]));
+        changes.deleted.forEach((id) => byId.delete(id));
+        changes.stories.forEach((s) => byId.set(s.id, s));
+        return [...byId.values()].sort((a, b) => a.id - b.id);
+      });
+    } catch (err) {
+      console.error("Failed to load story changes", err);
+    }
   };
 
   const hasPresentedStories = () => stories.some((s) => s.used_in_presentation);
 
-  const handleSelectStory = (story: Story) => {
-    setSelectedStory(story);
+  const handleSelectStory = async (story: StorySummary) => {
+    // The grid only holds summaries; load the full story for presenting
+    setSelectedStory(await getStory(story.id));
     // Mark as used
     if (!story.used_in_presentation) {
       markStoryUsed(story.id);
@@ -107,24 +125,28 @@ export const PresentMode: React.FC = () => {
             </button>
 
             {/* Album Layout */}
-            {selectedStory.album_json && (
+            {selectedStory.album && (
               <div className="album-layout">
                 <AlbumLayoutPreview
-                  layoutJson={selectedStory.album_json}
+                  layout={selectedStory.album}
                   photos={selectedStory.photos}
                 />
               </div>
             )}
 
             {/* Audio Player */}
-            {selectedStory.audio_file_path && (
+            {(selectedStory.audio_file_path || selectedStory.generated_speech) && (
               <div className="audio-controls">
                 <audio
                   controls
-                  src={`http://localhost:8000/${selectedStory.audio_file_path.replace(
-                    /\\/g,
-                    "/"
-                  )}`}
+                  src={
+                    selectedStory.audio_file_path
+                      ? `http://localhost:8000/${selectedStory.audio_file_path.replace(
+                          /\\/g,
+                          "/"
+                        )}`
+                      : getStoryAudioUrl(selectedStory.id)
+                  }
                   className="audio-player"
                 >
                   Your browser does not support the audio element.
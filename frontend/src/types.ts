@@ -2,6 +2,8 @@ export type Photo = {
   id: number;
   story_id: number;
   file_path: string;
+  model_path?: string;
+  thumbnail_path?: string;
 };
 
 export type Story = {
@@ -13,13 +15,26 @@ export type Story = {
   notes: string;
   generated_speech?: string;
   generated_voice_direction?: string;
-  album_json?: string;
+  album?: AlbumLayout | null;
   audio_file_path?: string;
   used_in_presentation: boolean;
   created_at: string;
   photos: Photo[];
 };
 
+// Lightweight listing row returned by /stories/summaries
+export type StorySummary = Pick<
+  Story,
+  "id" | "title" | "person" | "emotion" | "used_in_presentation" | "created_at"
+>;
+
+// Response of /stories/changes: what changed after the `since` revision
+export type StoryChanges<T> = {
+  revision: number;
+  stories: T[];
+  deleted: number[];
+};
+
 export type StoryCreate = {
   title: string;
   person: string;
@@ -29,12 +44,34 @@ export type StoryCreate = {
   files: File[];
 };
 
+export type JobStatus = "queued" | "running" | "done" | "failed";
+
+export type Job = {
+  id: string;
+  kind: string;
+  story_id?: number;
+  status: JobStatus;
+  stages: Record<string, "pending" | "running" | "done">;
+  result?: {
+    story_id?: number;
+    generated_speech?: string;
+    generated_voice_direction?: string;
+    audio_file_path?: string;
+  };
+  error?: string;
+  created_at?: string;
+  updated_at?: string;
+};
+
+export type AlbumPhoto = {
+  id: number;
+  photo_id: number; // Photo.id of one of the story's photos
+  role: "main" | "side" | "background";
+  caption: string;
+};
+
 export type AlbumLayout = {
   page_title: string;
   page_description: string;
-  photos: {
-    photo_id: string; // or number, depending on how we map it. The agent might return string indices.
-    role: "main" | "side" | "background";
-    caption: string;
-  }[];
+  photos: AlbumPhoto[];
 };
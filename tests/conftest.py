@@ -0,0 +1,18 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    """The app, with its database and media/ in a temporary working directory."""
+    # The database and media paths are relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        from backend.main import app
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,51 @@
+"""PATCHing an album with explicit nulls is rejected and leaves the story readable."""
+
+import pytest
+
+
+@pytest.fixture
+def story_with_album(client):
+    from backend.database import SessionLocal
+    from backend.models import AlbumPage, AlbumPhoto, Photo, Story
+
+    with SessionLocal() as db:
+        story = Story(title="Title", person="Person", emotion="proud", notes="")
+        photo = Photo(file_path="media/photo.jpg")
+        story.photos.append(photo)
+        db.add(story)
+        db.flush()
+        page = AlbumPage(story_id=story.id, page_title="Page", page_description="Description")
+        page.photos.append(AlbumPhoto(photo_id=photo.id, position=0, role="main", caption="Caption"))
+        db.add(page)
+        db.commit()
+        return story.id, page.photos[0].id
+
+
+@pytest.mark.parametrize("body", [{"page_title": None}, {"page_description": None}])
+def test_album_null_patch_is_rejected(client, story_with_album, body):
+    story_id, _ = story_with_album
+
+    response = client.patch(f"/api/stories/{story_id}/album", json=body)
+
+    assert response.status_code == 422
+    assert client.get(f"/api/stories/{story_id}").json()["album"]["page_title"] == "Page"
+
+
+@pytest.mark.parametrize("body", [{"caption": None}, {"role": None}])
+def test_album_photo_null_patch_is_rejected(client, story_with_album, body):
+    story_id, entry_id = story_with_album
+
+    response = client.patch(f"/api/stories/{story_id}/album/photos/{entry_id}", json=body)
+
+    assert response.status_code == 422
+    assert client.get(f"/api/stories/{story_id}").json()["album"]["photos"][0]["caption"] == "Caption"
+
+
+def test_album_patch_updates_given_fields(client, story_with_album):
+    story_id, _ = story_with_album
+
+    response = client.patch(f"/api/stories/{story_id}/album", json={"page_title": "New"})
+
+    assert response.status_code == 200
+    assert response.json()["page_title"] == "New"
+    assert response.json()["page_description"] == "Description"
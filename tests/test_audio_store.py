@@ -0,0 +1,25 @@
+"""Audio files are released under their speech_audio_lock, after any synthesis or reuse check holding it."""
+
+import asyncio
+import os
+
+
+def test_release_waits_for_the_audio_lock(client):
+    from backend.audio_store import speech_audio_lock
+    from backend.bulk_ops import release_media_files
+
+    os.makedirs("media", exist_ok=True)
+    path = os.path.join("media", "tts-released-under-lock.wav")
+    with open(path, "wb") as f:
+        f.write(b"RIFF")
+
+    async def scenario():
+        async with speech_audio_lock(path):
+            release = asyncio.create_task(release_media_files(audio_paths=[path]))
+            await asyncio.sleep(0.1)
+            assert not release.done()
+            assert os.path.exists(path)
+        await release
+
+    asyncio.run(scenario())
+    assert not os.path.exists(path)
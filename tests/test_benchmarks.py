@@ -0,0 +1,102 @@
+"""
+Micro-benchmarks of per-request hot paths: LLM cache keys, listing
+serialization and metrics recording.
+
+Run only these, with timings, via
+
+    python -m pytest tests/test_benchmarks.py --benchmark-only
+
+In a normal test run each benchmark also checks its result, and the module
+is skipped when pytest-benchmark is not installed.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+STORIES = 200
+PHOTOS_PER_STORY = 3
+
+CONFIG = {
+    "temperature": 0.7,
+    "response_mime_type": "application/json",
+    "response_schema": {"type": "object", "properties": {"transcript": {"type": "string"}}},
+}
+PROMPT = "Title: Summer at the lake\nPerson: Grandma\nEmotion: nostalgic\nNotes: " + "We swam every morning. " * 40
+
+
+@pytest.fixture(scope="module")
+def stories():
+    from backend.models import Photo, Story
+
+    created = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    stories = []
+    for story_id in range(1, STORIES + 1):
+        story = Story(
+            id=story_id, title=f"Story {story_id}", person="Grandma", emotion="nostalgic",
+            notes="We swam every morning. " * 10, generated_speech="Once upon a time. " * 30,
+            generated_voice_direction="Warm and slow.", audio_file_path=f"media/tts-{story_id:032x}.wav",
+            used_in_presentation=story_id % 5 == 0, created_at=created, updated_at=created,
+        )
+        story.photos = [
+            Photo(id=story_id * 10 + n, story_id=story_id, file_path=f"media/{story_id:016x}{n:016x}.jpg")
+            for n in range(PHOTOS_PER_STORY)
+        ]
+        stories.append(story)
+    return stories
+
+
+@pytest.mark.benchmark(group="llm_cache")
+def test_cache_key(benchmark):
+    from backend.llm_cache import canonical_config, make_cache_key
+
+    config_json = canonical_config(CONFIG)
+    key = benchmark(make_cache_key, "gemini-2.5-flash", "You write spoken stories.", [PROMPT], config_json)
+    assert key == make_cache_key("gemini-2.5-flash", "You write spoken stories.", [PROMPT], CONFIG)
+
+
+@pytest.mark.benchmark(group="llm_cache")
+def test_cache_key_uncached_config(benchmark):
+    from backend.llm_cache import make_cache_key
+
+    key = benchmark(make_cache_key, "gemini-2.5-flash", "You write spoken stories.", [PROMPT], CONFIG)
+    assert len(key) == 64
+
+
+@pytest.mark.benchmark(group="serialization")
+def test_story_listing(benchmark, stories):
+    from backend.responses import FastJSONResponse, story_payload
+
+    def render():
+        return FastJSONResponse([story_payload(story) for story in stories]).body
+
+    body = benchmark(render)
+    assert body.count(b'"file_path"') == STORIES * PHOTOS_PER_STORY
+
+
+@pytest.mark.benchmark(group="serialization")
+def test_summary_listing(benchmark, stories):
+    from backend.responses import FastJSONResponse, summary_payloads
+
+    body = benchmark(lambda: FastJSONResponse(summary_payloads(stories)).body)
+    assert body.startswith(b'[{"id":1,')
+
+
+@pytest.mark.benchmark(group="metrics")
+def test_counter_inc(benchmark):
+    from backend.metrics import Counter
+
+    counter = Counter("bench_requests_total", "Benchmark counter.", ("method", "route", "status"))
+    benchmark(counter.inc, method="GET", route="/api/stories/{story_id}", status="200")
+    assert "bench_requests_total" in counter.render()
+
+
+@pytest.mark.benchmark(group="metrics")
+def test_histogram_observe(benchmark):
+    from backend.metrics import Histogram
+
+    histogram = Histogram("bench_request_seconds", "Benchmark histogram.", ("method", "route"))
+    benchmark(histogram.observe, 0.042, method="GET", route="/api/stories/{story_id}")
+    assert "bench_request_seconds_count" in histogram.render()
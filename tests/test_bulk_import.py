@@ -0,0 +1,66 @@
+"""Bad manifest values and unreadable zip members are reported per item, not as a 500."""
+
+import io
+import json
+import os
+import zipfile
+
+
+def _photo_zip(**members: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _mark_encrypted(data: bytes, name: str) -> bytes:
+    """Set the "encrypted" flag of a member in its local and central directory headers."""
+    data = bytearray(data)
+    info = zipfile.ZipFile(io.BytesIO(bytes(data))).getinfo(name)
+    data[info.header_offset + 6] |= 0x1
+    central = data.find(b"PK\x01\x02")
+    while central != -1:
+        name_length = int.from_bytes(data[central + 28:central + 30], "little")
+        if data[central + 46:central + 46 + name_length].decode() == name:
+            data[central + 8] |= 0x1
+        central = data.find(b"PK\x01\x02", central + 1)
+    return bytes(data)
+
+
+def _post_bulk(client, entries, photos: bytes):
+    return client.post("/api/stories/bulk", files={
+        "manifest": ("stories.json", json.dumps(entries), "application/json"),
+        "photos": ("photos.zip", photos, "application/zip"),
+    })
+
+
+def test_non_string_title_is_an_invalid_item(client):
+    entries = [
+        {"title": 5, "person": "P", "emotion": "proud", "notes": ""},
+        {"title": ["t"], "person": "P", "emotion": "proud", "notes": ""},
+    ]
+
+    response = _post_bulk(client, entries, _photo_zip())
+
+    assert response.status_code == 202
+    items = response.json()["items"]
+    assert [item["status"] for item in items] == ["invalid", "invalid"]
+    assert all(item["title"] is None and item["error"] for item in items)
+
+
+def test_encrypted_member_is_an_item_error(client):
+    photos = _mark_encrypted(_photo_zip(**{"a.jpg": b"first photo", "locked.jpg": b"secret"}), "locked.jpg")
+    entries = [{"title": "Locked", "person": "P", "emotion": "proud", "notes": "", "photos": ["a.jpg", "locked.jpg"]}]
+
+    response = _post_bulk(client, entries, photos)
+
+    assert response.status_code == 202
+    item = response.json()["items"][0]
+    assert item["status"] == "invalid"
+    assert "locked.jpg" in item["error"] and "encrypted" in item["error"]
+    # a.jpg was extracted for the rejected entry and is removed again
+    assert not any(
+        open(os.path.join("media", name), "rb").read() == b"first photo"
+        for name in os.listdir("media") if os.path.isfile(os.path.join("media", name))
+    )
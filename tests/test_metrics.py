@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.mark.parametrize("path, label", [
+    # Same value in both parameters: each must keep its own name
+    ("/api/stories/5/album/photos/5", "/api/stories/{story_id}/album/photos/{entry_id}"),
+    ("/api/jobs/abc", "/api/jobs/{job_id}"),
+    ("/api/stories/5/no-such-route", "unmatched"),
+])
+def test_requests_are_labelled_with_the_route_template(client, path, label):
+    client.get(path)
+
+    metrics = client.get("/metrics").text
+    assert f'route="{label}"' in metrics
+    assert f'route="{path}"' not in metrics
@@ -0,0 +1,67 @@
+"""Stored uploads survive concurrent releases, and client filenames cannot pick where they land."""
+
+import hashlib
+import os
+
+
+def _store(data: bytes) -> str:
+    from backend import uploads
+
+    tmp_path = uploads.temp_upload_path()
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    return uploads.store_content_addressed(tmp_path, hashlib.sha256(data).hexdigest(), "photo.jpg")
+
+
+def test_release_keeps_unsettled_upload(client):
+    from backend import uploads
+    from backend.database import SessionLocal
+
+    path = _store(b"unsettled upload")
+    with SessionLocal() as db:
+        assert uploads.release_photo_files(db, [path]) == []
+        assert os.path.exists(path)
+        uploads.settle_uploads([path])
+        assert uploads.release_photo_files(db, [path]) == [path]
+    assert not os.path.exists(path)
+
+
+def test_reuse_during_release_keeps_file(client, monkeypatch):
+    from backend import uploads
+    from backend.database import SessionLocal
+
+    data = b"reused while released"
+    path = _store(data)
+    uploads.settle_uploads([path])
+
+    reused = []
+    referenced_photo_paths = uploads.referenced_photo_paths
+
+    def reuse_while_checking(db, file_paths):
+        # An identical upload arrives after the release found no references
+        referenced = referenced_photo_paths(db, file_paths)
+        reused.append(_store(data))
+        return referenced
+
+    monkeypatch.setattr(uploads, "referenced_photo_paths", reuse_while_checking)
+    with SessionLocal() as db:
+        assert uploads.release_photo_files(db, [path]) == []
+    assert reused == [path]
+    assert os.path.exists(path)
+    uploads.settle_uploads(reused)
+
+
+def test_unsafe_extension_is_replaced(client):
+    from backend import uploads
+    from backend.database import SessionLocal
+    from backend.models import Story
+
+    with SessionLocal() as db:
+        story = Story(title="Title", person="Person", emotion="proud", notes="")
+        db.add(story)
+        db.commit()
+        story_id = story.id
+    response = client.post(f"/api/stories/{story_id}/photos", files={"files": ("a./x", b"odd filename", "image/jpeg")})
+    assert response.status_code == 200
+    assert response.json()["photos"][0]["file_path"].endswith(".bin")
+    assert not [name for name in os.listdir(uploads.MEDIA_DIR) if name.startswith(".upload-")]